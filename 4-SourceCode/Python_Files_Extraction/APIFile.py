@@ -1,72 +1,176 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Query
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
 import os
-from Extractors.content_extractor_all import extract_file_text
-from content_creation_json import generate_mcq_quiz_from_text, generate_tf_quiz_from_text
-import requests
+from Extractors.segments import join_segments, segments_from_json, segments_to_json
+from content_creation_json import CHUNK_PARSE_RETRIES, chunk_summary, document_deadline, generate_quiz_from_chunks, llm_usage, stream_quiz_from_chunks
+from chunker import chunk_document, chunk_segments, chunk_weights, get_token_counter
 import httpx
 import asyncio
-from docx import Document
+from contextlib import asynccontextmanager
+from llm_clients import llm_clients_lifespan, LM_TIMEOUT
+from llm_router import Backend, BackendError, LLMUnavailable, create_router, router_backends, router_stats, start_routers, stop_routers
+from llm_scheduler import scheduler
+from extraction_cache import extraction_cache
+from quiz_cache import quiz_cache
+from uploads import SavedUpload, saved_upload
+from extraction_pool import extraction_pool
+from quiz_jobs import Job, job_manager
+from question_stream import QuestionStreamParser, merge_streams
+from question_parser import NORMALIZERS, merge_reports, parse_questions, parse_stats, question_type_of, scanner_report, split_by_type
+from question_planner import fill_budget, plan_questions, stream_budget
+from question_dedup import QUESTION_DEDUP, dedup_stats, duplicate_positions
+from chunk_requeue import chunk_requeue
+from search_index import SEARCH_DEFAULT_K, SEARCH_MAX_K, search_index
+from embedding_index import embedding_index, top_chunks
+from text_normalizer import normalization_stats, normalize_segments
+from telemetry import count_chunks, metrics_payload, register_stats, set_attributes, setup_tracing, shutdown_tracing, span, stage, timed_iter
+
+LM_STUDIO_BACKEND = "lm_studio"
+LM_STUDIO_URL = os.getenv("LM_STUDIO_URL", "http://26.152.59.249:1234/v1/chat/completions")
+# More LM Studio machines (or any OpenAI-compatible server) can join this pool
+# through LLM_BACKENDS with "pool": "lm_studio"; see llm_router.py
+lm_studio_router = create_router(LM_STUDIO_BACKEND, [
+    Backend(LM_STUDIO_BACKEND, LM_STUDIO_URL.removesuffix("/chat/completions"), timeout=LM_TIMEOUT),
+])
+# Time a document's LM Studio calls (retries included) may take; a local model is
+# much slower than OpenRouter, so this follows LM_TIMEOUT, not QUIZ_DOCUMENT_DEADLINE
+LM_STUDIO_DEADLINE_SECONDS = float(os.getenv("LM_STUDIO_DEADLINE_SECONDS", str(LM_TIMEOUT.read)))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Spans go to the collector set by OTEL_TRACES_EXPORTER (see telemetry.py)
+    setup_tracing()
+    # Warm extraction workers so the first upload does not pay the parser imports
+    extraction_pool.start()
+    # Open the BM25 index now (if one was built) instead of on the first /search
+    if search_index.available:
+        await asyncio.to_thread(search_index.load)
+    try:
+        # One pooled keep-alive client per LLM backend for the whole app lifetime
+        async with llm_clients_lifespan(router_backends()):
+            # Health probes keep dead backends out of rotation
+            start_routers()
+            # Background quiz jobs; unfinished ones from a previous run are resumed here
+            await job_manager.start()
+            # Chunks that failed past their document's deadline are retried here
+            await chunk_requeue.start()
+            try:
+                yield
+            finally:
+                await chunk_requeue.stop()
+                await job_manager.stop()
+                await stop_routers()
+    finally:
+        extraction_pool.shutdown()
+        shutdown_tracing()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def extract_upload_segments(upload: SavedUpload) -> list:
+    """Extract page/slide segments from a saved upload, skipping the extractors when the same bytes were seen before."""
+    key = extraction_cache.make_key(upload.sha256, upload.filename)
+    # Disk reads and writes of the cache stay off the event loop as well
+    cached = await asyncio.to_thread(extraction_cache.get, key, upload.size)
+    if cached is not None:
+        return segments_from_json(cached)
+
+    # Parsing runs in a worker process so it never blocks the event loop
+    with stage("extraction", "extract_file_text", filename=upload.filename, size=upload.size) as current:
+        segments = await extraction_pool.extract(upload.path, upload.filename)
+        set_attributes(current, segments=len(segments))
+
+    # Extractors report failures as an "Error: ..." segment; never cache those
+    if not any(segment.kind == "error" for segment in segments):
+        await asyncio.to_thread(extraction_cache.put, key, segments_to_json(segments))
+    return segments
+
 
-app = FastAPI()
+async def extract_upload_text(upload: SavedUpload) -> str:
+    return join_segments(await extract_upload_segments(upload))
+
+
+def prompt_segments(segments: list) -> list:
+    """The segments as the LLM gets them: repeated headers / footers removed, text normalized."""
+    with stage("normalize"):
+        return normalize_segments(segments)
+
+
+async def extract_upload_prompt_text(upload: SavedUpload) -> str:
+    return join_segments(prompt_segments(await extract_upload_segments(upload)))
 
 @app.post("/generate_quiz")
 async def generate_quiz(
     file: UploadFile = File(...),
-    quiz_type: str = Query("mcq", regex="^(mcq|tf)$", description="Type of quiz: mcq or tf")
+    quiz_type: str = Query("mcq", regex="^(mcq|tf|mixed)$", description="Type of quiz: mcq, tf or mixed (both from one pass per chunk)"),
+    fresh: bool = Query(False, description="Skip the question cache and generate new questions"),
+    batch: bool = Query(False, description="Pack several chunks into each model call (fewer, larger requests)"),
+    count: int | None = Query(None, ge=1, description="Total questions wanted; only the chunks needed for them are sent (batch is ignored)"),
+    topic: str | None = Query(None, min_length=1, description="Only generate from the chunks closest to this topic (embedding search)"),
+    top_k: int = Query(5, ge=1, description="How many chunks to keep when a topic is given")
 ):
-    file_ext = os.path.splitext(file.filename)[1].lower()
-    temp_path = f"temp{file_ext}"
-
-    # Save uploaded file temporarily
-    with open(temp_path, "wb") as f:
-        f.write(await file.read())
-
-    try:
+    # Stream the upload to its own temp file (removed as soon as the text is extracted)
+    async with saved_upload(file) as upload:
         try:
-            extracted_text = extract_file_text(temp_path, file.filename)
+            segments = await extract_upload_segments(upload)
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
 
 
-        if quiz_type == "mcq":
-            try:
-                quiz_json_list = await generate_mcq_quiz_from_text(file.filename, extracted_text)
-            except Exception as e:
-                quiz_json_list = [{"error": f"⚠️ DeepSeek API error: {e}"}]
-        else:  # quiz_type == "tf"
-            try:
-                quiz_json_list = await generate_tf_quiz_from_text(file.filename, extracted_text)
-            except Exception as e:
-                quiz_json_list = [{"error": f"⚠️ DeepSeek API error: {e}"}]
+    return await build_quiz_response(file.filename, segments, quiz_type, fresh, batch=batch, count=count, topic=topic, top_k=top_k)
+
 
+async def select_topic_chunks(chunks: list, topic: str, top_k: int) -> tuple[list, dict]:
+    """The `top_k` chunks closest to `topic` (document order), and what was picked."""
+    try:
+        # Embedding is CPU-bound; new chunks are added to the index for next time
+        with stage("embedding", "select_topic_chunks", topic=topic, chunks=len(chunks), top_k=top_k):
+            best = await asyncio.to_thread(top_chunks, embedding_index, chunks, topic, top_k)
+    except (ImportError, OSError) as e:
+        raise HTTPException(status_code=503, detail=f"Embedding model unavailable ({embedding_index.model}): {e}")
+    selected = [{"chunk": number, "score": round(score, 4)} for number, score in best]
+    return [chunks[number] for number, _ in best], {"query": topic, "chunks": len(chunks), "selected": selected}
+
+
+async def build_quiz_response(filename: str, segments: list, quiz_type: str, fresh: bool = False, on_chunk=None, batch: bool = False, count: int | None = None,
+                              topic: str | None = None, top_k: int = 5) -> dict:
+    # Chunk per page / slide so chunks never straddle unrelated slides
+    segments = prompt_segments(segments)
+    chunks = timed_iter("chunking", chunk_segments(segments))
+    topic_report = weights = None
+    if topic:
+        chunks, topic_report = await select_topic_chunks(list(chunks), topic, top_k)
+    if count:
+        # The planner needs every chunk anyway; typed blocks (speaker notes) weigh less
+        chunks = list(chunks)
+        weights = chunk_weights(chunks, segments)
+    try:
+        quiz_json_list = await generate_quiz_from_chunks(filename, chunks, quiz_type, use_cache=not fresh, on_chunk=on_chunk, batch=batch,
+                                                         count=count, weights=weights)
+    except Exception as e:
+        quiz_json_list = [{"error": f"⚠️ DeepSeek API error: {e}"}]
 
 
 
-        response_data = {
-            "document": file.filename,
-            "question_type": quiz_type,
-            "output": quiz_json_list
-        }
 
-        return response_data
+    response_data = {
+        "document": filename,
+        "question_type": quiz_type,
+        "output": quiz_json_list
+    }
+    if topic_report is not None:
+        response_data["topic"] = topic_report
 
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+    return response_data
 
 
 @app.post("/extract_text")
 async def extract_text_endpoint(file: UploadFile = File(...)):
-    file_ext = os.path.splitext(file.filename)[1].lower()
-    temp_path = f"temp{file_ext}"
-
-    # Save uploaded file temporarily
-    with open(temp_path, "wb") as f:
-        f.write(await file.read())
-
-    try:
+    async with saved_upload(file) as upload:
         try:
-            text = extract_file_text(temp_path, file.filename)
+            text = await extract_upload_text(upload)
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
 
@@ -78,10 +182,6 @@ async def extract_text_endpoint(file: UploadFile = File(...)):
             "text": text
         }
 
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-
 
 
 
@@ -123,27 +223,37 @@ async def extract_text_endpoint(file: UploadFile = File(...)):
 #         return data["choices"][0]["message"]["content"]
 
 
-LM_STUDIO_URL = "http://26.152.59.249:1234/v1/chat/completions"
-LM_TIMEOUT = httpx.Timeout(300.0)
-
-async def send_to_lm_studio(prompt: str) -> str:
-    payload = {
+def lm_studio_payload(prompt: str) -> dict:
+    return {
         "model": "local-model",
         "messages": [{"role": "user", "content": prompt}],
         "temperature": 0.5,
         "max_tokens": 1200
     }
 
-    async with httpx.AsyncClient(timeout=LM_TIMEOUT) as client:
-        try:
-            resp = await client.post(LM_STUDIO_URL, json=payload)
-            resp.raise_for_status()
-            data = resp.json()
-            return data["choices"][0]["message"]["content"]
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"LM Studio unreachable: {e}")
-        except KeyError:
-            raise HTTPException(status_code=500, detail="Invalid response from AI model")
+
+async def send_to_lm_studio(prompt: str, document_id: str = "lm_studio", deadline: float | None = None) -> str:
+    payload = lm_studio_payload(prompt)
+
+    try:
+        with span("send_to_lm_studio", document_id=document_id, prompt_chars=len(prompt)):
+            async with scheduler.slot(document_id, LM_STUDIO_BACKEND):
+                data = await lm_studio_router.chat_completion(payload, deadline)
+        return data["choices"][0]["message"]["content"]
+    except LLMUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"LM Studio unreachable: {e}")
+    except (KeyError, IndexError, TypeError):
+        raise HTTPException(status_code=500, detail="Invalid response from AI model")
+
+
+async def stream_lm_studio(prompt: str, document_id: str = "lm_studio"):
+    """Streaming counterpart of send_to_lm_studio: yield the completion text as it is generated."""
+    try:
+        async with scheduler.slot(document_id, LM_STUDIO_BACKEND):
+            async for delta in lm_studio_router.stream(lm_studio_payload(prompt)):
+                yield delta
+    except (LLMUnavailable, BackendError) as e:
+        raise HTTPException(status_code=503, detail=f"LM Studio unreachable: {e}")
 
 
 
@@ -226,6 +336,56 @@ Content:
 
 
 
+def build_mixed_prompt(text: str, mcq_count: int, tf_count: int, filename: str) -> str:
+    return f"""
+Generate exactly {mcq_count} Multiple Choice Questions and exactly {tf_count} True or False Questions.
+Return JSON ONLY. No explanations. No markdown.
+
+Rules:
+- Put all questions in ONE "questions" list
+- Multiple Choice questions have "question", "options" and "answer" fields
+- Answer must contain the FULL correct option text
+- True or False questions have only "question" and "answer" fields
+
+Expected JSON format (example with 1 question of each type):
+
+{{
+  "file_name": "{filename}",
+  "question_type": "Mixed",
+  "questions": [
+    {{
+      "question": "What is the main goal of Data Mining?",
+      "options": [
+        "A) Extracting useful knowledge from data",
+        "B) Storing large datasets",
+        "C) Designing databases",
+        "D) Visualizing data only"
+      ],
+      "answer": "A) Extracting useful knowledge from data"
+    }},
+    {{
+      "question": "Clustering groups data without predefined labels.",
+      "answer": "True"
+    }}
+  ]
+}}
+
+Content:
+{text}
+"""
+
+
+def typed_prompt(chunk: str, quotas: dict, filename: str) -> tuple[str, str]:
+    """(prompt, quiz_type) asking one chunk for {"multiple_choice": n, "true_false": m} questions."""
+    mcq, tf = quotas.get("multiple_choice", 0), quotas.get("true_false", 0)
+    if mcq and tf:
+        return build_mixed_prompt(chunk, mcq, tf, filename), "mixed"
+    if mcq:
+        return build_mcq_prompt(chunk, mcq, filename), "mcq"
+    return build_tf_prompt(chunk, tf, filename), "tf"
+
+
+
 # @app.post("/ask_ai_model")
 # async def ask_ai_model(file: UploadFile = File(...), mcq_count: int = 20, tf_count: int = 20):
 #     temp_path = f"temp{os.path.splitext(file.filename)[1]}"
@@ -400,91 +560,500 @@ Content:
 
 
 
-import os
 import json
-import asyncio
-from fastapi import FastAPI, UploadFile, File, HTTPException
-
-app = FastAPI()
+import time
+import uuid
 
 @app.post("/ask_ai_model")
 async def ask_ai_model(
     file: UploadFile = File(...),
     mcq_count: int = 20,
-    tf_count: int = 20
+    tf_count: int = 20,
+    mixed: bool = Query(False, description="Ask for both question types in one completion (document text sent once)")
 ):
-    temp_path = f"temp_{file.filename}"
-
     try:
-        # Save uploaded file
-        with open(temp_path, "wb") as f:
-            f.write(await file.read())
+        # Extract text from file (cached by upload hash)
+        async with saved_upload(file) as upload:
+            text = await extract_upload_prompt_text(upload)
+        return await ask_ai_model_from_text(file.filename, text, mcq_count, tf_count, mixed=mixed)
 
-        # Extract text from file
-        text = extract_file_text(temp_path, file.filename)
-        if not text.strip():
-            raise HTTPException(status_code=400, detail="No text found in file")
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"SERVER ERROR: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
 
-        tasks = []
-        task_keys = []
 
+async def ask_ai_model_from_text(filename: str, text: str, mcq_count: int, tf_count: int, on_part=None, mixed: bool = False) -> dict:
+    """LM Studio MCQ + TF generation; `on_part(key, questions)` is awaited as soon as each part is parsed.
+
+    The requested counts are spread over the document's chunks by question_planner,
+    so a long document only sends the chunks those questions need. With `mixed`,
+    both types come from a single completion per chunk instead of one per type.
+    """
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="No text found in file")
+
+    document_id = f"{filename}:{uuid.uuid4().hex[:8]}"
+    deadline = document_deadline(LM_STUDIO_DEADLINE_SECONDS)
+    with stage("chunking"):
+        chunks = list(chunk_document(text))
+        count_tokens = get_token_counter()
+        weights = [count_tokens(chunk) for chunk in chunks]
+    chunk_reports = []
+
+    async def ask(key: str, prompt: str):
+        with span("chunk", document_id=document_id, quiz_type=key) as current:
+            questions, report = await ask_chunk(key, prompt)
+            set_attributes(current, questions=len(questions), attempts=report["attempts"], error=report.get("error"))
+        return questions, report
+
+    async def ask_chunk(key: str, prompt: str):
+        # Keep every valid question the model wrote; ask again only if nothing was usable
+        for attempt in range(1 + CHUNK_PARSE_RETRIES):
+            try:
+                response = await send_to_lm_studio(prompt, document_id, deadline)
+            except HTTPException as e:
+                if e.status_code != 503:
+                    raise
+                # LM Studio stayed down for this chunk: the planner tops up from other chunks
+                return [], {"error": e.detail, "unrecoverable": False, "attempts": attempt + 1}
+            questions, report = parse_questions(response, key)
+            report["attempts"] = attempt + 1
+            if not report["unrecoverable"]:
+                break
+            print(f"AI returned unusable output for {key}: {response[:500]}")
+        return questions, report
+
+    def part_prompt(key: str, chunk: str, quota) -> str:
+        if key == "mcq":
+            return build_mcq_prompt(chunk, quota, filename)
+        if key == "tf":
+            return build_tf_prompt(chunk, quota, filename)
+        # Mixed quotas are {"multiple_choice": n, "true_false": m} per chunk
+        return typed_prompt(chunk, quota, filename)[0]
+
+    async def run_part(key: str, count: int):
+        plan = plan_questions(weights, count)
+        # Mixed: MCQ and TF keep budgets of their own, so a short type is topped up itself
+        counts = {"multiple_choice": mcq_count, "true_false": tf_count} if key == "mixed" else None
+
+        async def generate(index: int, quota):
+            return await ask(key, part_prompt(key, chunks[index], quota))
+
+        found, reports = await fill_budget(plan, generate, duplicate_positions if QUESTION_DEDUP else None, counts)
+        chunk_reports.extend(reports.values())
+        questions = [question for index in sorted(found) for question in found[index]]
+        report = merge_reports([reports[index] for index in sorted(reports)])
+        if on_part is not None:
+            if key == "mixed":
+                split = split_by_type(questions)
+                await on_part("mcq", split["multiple_choice"])
+                await on_part("tf", split["true_false"])
+            else:
+                await on_part(key, questions)
+        return key, questions, report
+
+    tasks = []
+
+    if mixed and mcq_count > 0 and tf_count > 0:
+        tasks.append(run_part("mixed", mcq_count + tf_count))
+
+    else:
         if mcq_count > 0:
-            tasks.append(send_to_lm_studio(build_mcq_prompt(text, mcq_count, file.filename)))
-            task_keys.append("mcq")
+            tasks.append(run_part("mcq", mcq_count))
 
         if tf_count > 0:
-            tasks.append(send_to_lm_studio(build_tf_prompt(text, tf_count, file.filename)))
-            task_keys.append("tf")
+            tasks.append(run_part("tf", tf_count))
+
+    # Run AI calls concurrently
+    responses = await asyncio.gather(*tasks)
+    chunks_done = chunk_summary(chunk_reports)
+    count_chunks(chunks_done)
+    if chunk_reports and all("error" in report for report in chunk_reports):
+        raise HTTPException(status_code=503, detail=chunk_reports[-1]["error"])
+
+    # Merge into one JSON
+    final_json = {
+        "filename": filename,
+        "questions": {
+            "multiple_choice": [],
+            "true_false": []
+        },
+        "summary": {
+            "mcq_count": mcq_count,
+            "tf_count": tf_count,
+            "total_questions": mcq_count + tf_count
+        },
+        "parse_reports": {},
+        "chunks": chunks_done
+    }
 
-        # Run AI calls concurrently
-        responses = await asyncio.gather(*tasks)
+    for key, questions, report in responses:
+        if key == "mcq":
+            final_json["questions"]["multiple_choice"] = questions
+        elif key == "tf":
+            final_json["questions"]["true_false"] = questions
+        elif key == "mixed":
+            final_json["questions"] = split_by_type(questions)
+        final_json["parse_reports"][key] = report
 
-        # Parse and merge into one JSON
-        final_json = {
-            "filename": file.filename,
-            "questions": {
-                "multiple_choice": [],
-                "true_false": []
-            },
-            "summary": {
-                "mcq_count": mcq_count,
-                "tf_count": tf_count,
-                "total_questions": mcq_count + tf_count
-            }
-        }
+    print(final_json)
+    return final_json
 
-        for key, response in zip(task_keys, responses):
-            try:
-                parsed = json.loads(response)
-            except json.JSONDecodeError:
-                raise HTTPException(status_code=500, detail=f"AI returned invalid JSON for {key}")
 
-            if key == "mcq":
-                final_json["questions"]["multiple_choice"] = parsed.get("questions", [])
-            elif key == "tf":
-                final_json["questions"]["true_false"] = parsed.get("questions", [])
 
-        print(final_json)
-        return final_json
 
-    except HTTPException:
-        raise
+
+
+
+
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "llm_scheduler": scheduler.stats(),
+        "extraction_cache": extraction_cache.stats(),
+        "quiz_cache": quiz_cache.stats(),
+        "extraction_pool": extraction_pool.stats(),
+        "question_parser": parse_stats.stats(),
+        "llm_usage": dict(llm_usage),
+        "question_dedup": dedup_stats.stats(),
+        "llm_router": router_stats(),
+        "chunk_requeue": chunk_requeue.stats(),
+        "search_index": search_index.stats(),
+        "embedding_index": embedding_index.stats(),
+        "text_normalizer": normalization_stats(),
+        "jobs": job_manager.stats()
+    }
+
+
+# ---------------- METRICS ---------------- #
+# Prometheus scrape endpoint: per-stage latency histograms, per-backend call
+# latency and tokens, chunk outcomes (telemetry.py), plus the flat numbers
+# of the /stats sections below as gauges.
+register_stats("llm_scheduler", scheduler.stats)
+register_stats("extraction_cache", extraction_cache.stats)
+register_stats("quiz_cache", quiz_cache.stats)
+register_stats("extraction_pool", extraction_pool.stats)
+register_stats("question_parser", parse_stats.stats)
+register_stats("llm_usage", lambda: llm_usage)
+register_stats("question_dedup", dedup_stats.stats)
+register_stats("chunk_requeue", chunk_requeue.stats)
+register_stats("search_index", search_index.stats)
+register_stats("embedding_index", embedding_index.stats)
+register_stats("text_normalizer", normalization_stats)
+register_stats("jobs", job_manager.stats)
+
+
+@app.get("/metrics")
+async def metrics():
+    payload = metrics_payload()
+    if payload is None:
+        raise HTTPException(status_code=503, detail="Metrics need prometheus-client (pip install prometheus-client)")
+    body, content_type = payload
+    return Response(content=body, media_type=content_type)
+
+
+# ---------------- SEARCH ---------------- #
+# BM25 over the whole extracted corpus (ingest.py + search_index.py), so a
+# quiz can be made from the passages about one topic across a course.
+
+def search_passages(q: str, k: int, course: str | None) -> list:
+    try:
+        with span("search", query=q, k=k, course=course):
+            return search_index.search(q, k, course)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@app.get("/search")
+async def search(
+    q: str = Query(..., min_length=1, description="Topic or keywords (Arabic or English)"),
+    k: int = Query(SEARCH_DEFAULT_K, ge=1, le=SEARCH_MAX_K, description="Passages to return"),
+    course: str | None = Query(None, description="Only passages from files under this corpus folder")
+):
+    start = time.perf_counter()
+    results = search_passages(q, k, course)
+    return {"query": q, "took_ms": round((time.perf_counter() - start) * 1000, 2), "results": results}
+
+
+@app.post("/search/generate_quiz")
+async def generate_quiz_from_search(
+    q: str = Query(..., min_length=1, description="Topic or keywords (Arabic or English)"),
+    k: int = Query(5, ge=1, le=SEARCH_MAX_K, description="Passages to generate from"),
+    course: str | None = Query(None, description="Only passages from files under this corpus folder"),
+    quiz_type: str = Query("mcq", regex="^(mcq|tf|mixed)$", description="Type of quiz: mcq, tf or mixed (both from one pass per chunk)"),
+    fresh: bool = Query(False, description="Skip the question cache and generate new questions"),
+    count: int | None = Query(None, ge=1, description="Total questions wanted, spread over the passages")
+):
+    results = search_passages(q, k, course)
+    if not results:
+        raise HTTPException(status_code=404, detail="No passage matches the query")
+
+    # Passages are already prompt-sized chunks; they go to the chunk prompts as they are
+    passages = [result["text"] for result in results]
+    try:
+        output = await generate_quiz_from_chunks(f"search:{q}", passages, quiz_type, use_cache=not fresh, count=count)
     except Exception as e:
-        print(f"SERVER ERROR: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+        output = [{"error": f"⚠️ DeepSeek API error: {e}"}]
+    return {
+        "query": q,
+        "question_type": quiz_type,
+        "sources": [{key: result[key] for key in ("path", "chunk", "score")} for result in results],
+        "output": output
+    }
 
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
 
+# ---------------- STREAMING ---------------- #
+# Questions are sent as Server-Sent Events the moment the model finishes
+# writing each one, instead of after the whole completion.
 
+def sse_event(event: str, data: dict, event_id: int | None = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 
+def sse_response(stream) -> StreamingResponse:
+    # X-Accel-Buffering stops nginx-style proxies from holding events back
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
+@app.post("/generate_quiz/stream")
+async def generate_quiz_stream(
+    file: UploadFile = File(...),
+    quiz_type: str = Query("mcq", regex="^(mcq|tf|mixed)$", description="Type of quiz: mcq, tf or mixed (both from one pass per chunk)"),
+    fresh: bool = Query(False, description="Skip the question cache and generate new questions")
+):
+    async with saved_upload(file) as upload:
+        try:
+            segments = await extract_upload_segments(upload)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    with stage("chunking"):
+        chunks = list(chunk_segments(prompt_segments(segments)))
+
+    async def stream():
+        yield sse_event("start", {"document": file.filename, "question_type": quiz_type, "chunks": len(chunks)})
+        count = 0
+        async for index, key, item in stream_quiz_from_chunks(file.filename, chunks, quiz_type, use_cache=not fresh):
+            if key == "error":
+                yield sse_event("error", {"chunk": index, "detail": item})
+                continue
+            count += 1
+            event = {"chunk": index, "question": item}
+            if quiz_type == "mixed":
+                event["question_type"] = key
+            yield sse_event("question", event)
+        yield sse_event("done", {"questions": count})
+
+    return sse_response(stream())
+
+
+async def stream_lm_studio_questions(prompt: str, document_id: str, quiz_type: str):
+    """Yield (question_type, question) as the completion streams in, or ("error", detail) if LM Studio fails.
+
+    The error is yielded rather than raised so the questions already sent are
+    kept and the other chunks carry on; anything else is a bug and propagates.
+    """
+    parser = QuestionStreamParser()
+    normalize = NORMALIZERS[quiz_type]
+    found = valid = 0
+    try:
+        async for delta in stream_lm_studio(prompt, document_id):
+            for obj in parser.feed(delta):
+                found += 1
+                question = normalize(obj)
+                if question is not None:
+                    valid += 1
+                    yield question_type_of(question), question
+    except (LLMUnavailable, HTTPException) as e:
+        print(f"LM Studio stream failed: {getattr(e, 'detail', e)}")
+        yield "error", str(getattr(e, "detail", e))
+        return
+    scanner_report(parser, found, valid)
+
+
+@app.post("/ask_ai_model/stream")
+async def ask_ai_model_stream(
+    file: UploadFile = File(...),
+    mcq_count: int = 20,
+    tf_count: int = 20,
+    mixed: bool = Query(False, description="Ask for both question types in one completion (document text sent once)")
+):
+    async with saved_upload(file) as upload:
+        try:
+            segments = prompt_segments(await extract_upload_segments(upload))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    with stage("chunking"):
+        chunks = list(chunk_segments(segments))
+        weights = chunk_weights(chunks, segments)
+    if not chunks:
+        raise HTTPException(status_code=400, detail="No text found in file")
+
+    # Same planning as ask_ai_model_from_text: only the chunks the counts need,
+    # and each type stops as soon as its count is met
+    document_id = f"{file.filename}:{uuid.uuid4().hex[:8]}"
+    wanted = {"multiple_choice": max(0, mcq_count), "true_false": max(0, tf_count)}
+    if mixed:
+        parts = {"mixed": wanted}
+    else:
+        parts = {key: {key: count} for key, count in wanted.items()}
+    parts = {key: counts for key, counts in parts.items() if sum(counts.values())}
+
+    def stream_chunk(index: int, quotas: dict):
+        prompt, quiz_type = typed_prompt(chunks[index], quotas, file.filename)
+        return stream_lm_studio_questions(prompt, document_id, quiz_type)
+
+    streams = {
+        key: stream_budget(plan_questions(weights, sum(counts.values())), counts, stream_chunk)
+        for key, counts in parts.items()
+    }
+
+    async def stream():
+        counts = {"multiple_choice": 0, "true_false": 0}
+        yield sse_event("start", {"filename": file.filename, "mcq_count": mcq_count, "tf_count": tf_count, "chunks": len(chunks)})
+        async for _, (index, key, item) in merge_streams(streams):
+            if key == "error":
+                yield sse_event("error", {"chunk": index, "detail": item})
+                continue
+            counts[key] += 1
+            yield sse_event("question", {"chunk": index, "question_type": key, "question": item})
+        yield sse_event("done", {"questions": counts})
+
+    return sse_response(stream())
+
+
+# ---------------- BACKGROUND JOBS ---------------- #
+# POST returns a job id at once; the work runs on job_manager's workers and
+# clients poll GET /jobs/{id} or follow /jobs/{id}/events (SSE) or /jobs/{id}/ws.
+
+async def run_generate_quiz_job(job: Job, emit) -> dict:
+    try:
+        segments = await extract_upload_segments(job.upload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await emit("extracted", {"segments": len(segments)})
 
+    async def on_chunk(index: int, total: int, questions: list):
+        await emit("chunk", {"chunk": index, "total": total, "questions": questions})
+
+    return await build_quiz_response(
+        job.filename, segments, job.params["quiz_type"], job.params["fresh"], on_chunk,
+        # .get: jobs queued before these options existed
+        batch=job.params.get("batch", False), count=job.params.get("count"),
+        topic=job.params.get("topic"), top_k=job.params.get("top_k", 5)
+    )
+
+
+async def run_ask_ai_model_job(job: Job, emit) -> dict:
+    text = await extract_upload_prompt_text(job.upload)
+    await emit("extracted", {"characters": len(text)})
+
+    async def on_part(key: str, questions: list):
+        await emit("part", {"question_type": key, "questions": questions})
+
+    return await ask_ai_model_from_text(
+        job.filename, text, job.params["mcq_count"], job.params["tf_count"], on_part,
+        mixed=job.params.get("mixed", False)
+    )
+
+
+job_manager.register("generate_quiz", run_generate_quiz_job)
+job_manager.register("ask_ai_model", run_ask_ai_model_job)
+
+
+def job_links(job: Job) -> dict:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+        "websocket_url": f"/jobs/{job.id}/ws",
+    }
 
 
+@app.post("/jobs/generate_quiz", status_code=202)
+async def submit_generate_quiz_job(
+    file: UploadFile = File(...),
+    quiz_type: str = Query("mcq", regex="^(mcq|tf|mixed)$", description="Type of quiz: mcq, tf or mixed (both from one pass per chunk)"),
+    fresh: bool = Query(False, description="Skip the question cache and generate new questions"),
+    batch: bool = Query(False, description="Pack several chunks into each model call (fewer, larger requests)"),
+    count: int | None = Query(None, ge=1, description="Total questions wanted; only the chunks needed for them are sent (batch is ignored)"),
+    topic: str | None = Query(None, min_length=1, description="Only generate from the chunks closest to this topic (embedding search)"),
+    top_k: int = Query(5, ge=1, description="How many chunks to keep when a topic is given")
+):
+    async with saved_upload(file) as upload:
+        job = await job_manager.submit("generate_quiz", upload, {"quiz_type": quiz_type, "fresh": fresh, "batch": batch, "count": count,
+                                                                 "topic": topic, "top_k": top_k})
+    return job_links(job)
+
+
+@app.post("/jobs/ask_ai_model", status_code=202)
+async def submit_ask_ai_model_job(
+    file: UploadFile = File(...),
+    mcq_count: int = 20,
+    tf_count: int = 20,
+    mixed: bool = Query(False, description="Ask for both question types in one completion (document text sent once)")
+):
+    async with saved_upload(file) as upload:
+        job = await job_manager.submit("ask_ai_model", upload, {"mcq_count": mcq_count, "tf_count": tf_count, "mixed": mixed})
+    return job_links(job)
+
+
+def get_job_or_404(job_id: str) -> Job:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    return get_job_or_404(job_id).public()
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request, after: int = 0):
+    """Server-Sent Events: every event since `after` (or the Last-Event-ID header), then live ones."""
+    get_job_or_404(job_id)
+    last_event_id = request.headers.get("last-event-id", "")
+    if last_event_id.isdigit():
+        after = int(last_event_id)
+
+    async def stream():
+        async for item in job_manager.subscribe(job_id, after):
+            if item is None:
+                yield ": keep-alive\n\n"
+                continue
+            seq, event, data = item
+            yield sse_event(event, data, seq)
+
+    return sse_response(stream())
+
+
+@app.websocket("/jobs/{job_id}/ws")
+async def job_events_ws(websocket: WebSocket, job_id: str, after: int = 0):
+    await websocket.accept()
+    if job_manager.get(job_id) is None:
+        await websocket.close(code=4404, reason="Job not found")
+        return
+    try:
+        async for item in job_manager.subscribe(job_id, after):
+            if item is None:
+                continue
+            seq, event, data = item
+            await websocket.send_json({"id": seq, "event": event, "data": data})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
 
 # Run with:
 # uvicorn APIFile:app --port 8001
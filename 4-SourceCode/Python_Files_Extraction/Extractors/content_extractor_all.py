@@ -1,27 +1,49 @@
 import os
-from Extractors.docx_extractor import extract_text_from_docx
-from Extractors.pptx_extractor import extract_text_from_pptx
+from Extractors.docx_extractor import extract_segments_from_docx, iter_docx_segments
+from Extractors.pptx_extractor import extract_segments_from_pptx, iter_pptx_segments
 # from Extractors.audio_extractor import extract_text_from_audio
-from Extractors.doc_extractor import extract_text_from_doc
-from Extractors.pdf_extractor import extract_text_from_pdf
-from Extractors.ppt_extractor import extract_text_from_ppt
+from Extractors.doc_extractor import extract_segments_from_doc
+from Extractors.pdf_extractor import extract_segments_from_pdf, iter_pdf_segments
+from Extractors.ppt_extractor import extract_segments_from_ppt
+from Extractors.segments import join_segments
 
-def extract_file_text(file_path: str, filename: str) -> str:
+def extract_file_segments(file_path: str, filename: str) -> list:
+    """Extract a file as a list of TextSegment (page / slide / paragraph pieces)."""
     file_ext = os.path.splitext(filename)[1].lower()
 
     if file_ext == ".pdf":
-        text = extract_text_from_pdf(file_path)
+        segments = extract_segments_from_pdf(file_path)
     elif file_ext == ".docx":
-        text = extract_text_from_docx(file_path)
+        segments = extract_segments_from_docx(file_path)
     elif file_ext == ".doc":
-        text = extract_text_from_doc(file_path)
+        segments = extract_segments_from_doc(file_path)
     elif file_ext == ".pptx":
-        text = extract_text_from_pptx(file_path)
+        segments = extract_segments_from_pptx(file_path)
     elif file_ext == ".ppt":
-        text = extract_text_from_ppt(file_path)
+        segments = extract_segments_from_ppt(file_path)
     # elif file_ext in [".mp3", ".wav", ".m4a", ".mp4"]:
     #     text = extract_text_from_audio(file_path)
     else:
         raise ValueError("Unsupported file type")
 
-    return text
+    return segments
+
+def iter_file_segments(file_path: str, filename: str):
+    """Streaming variant: yields segments while the file is still being read.
+
+    Unlike extract_file_segments, parser errors are raised instead of being
+    turned into an "Error: ..." segment.
+    """
+    file_ext = os.path.splitext(filename)[1].lower()
+
+    if file_ext == ".pdf":
+        yield from iter_pdf_segments(file_path)
+    elif file_ext == ".docx":
+        yield from iter_docx_segments(file_path)
+    elif file_ext == ".pptx":
+        yield from iter_pptx_segments(file_path)
+    else:
+        yield from extract_file_segments(file_path, filename)
+
+def extract_file_text(file_path: str, filename: str) -> str:
+    return join_segments(extract_file_segments(file_path, filename))
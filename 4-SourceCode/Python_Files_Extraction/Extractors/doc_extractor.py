@@ -1,11 +1,112 @@
 import os
-import win32com.client
-from .docx_extractor import extract_text_from_docx
+import re
+import struct
+from .docx_extractor import extract_segments_from_docx
+from .ole_reader import open_ole_file
+from .segments import TextSegment, join_segments
+
+# Native reader for Word 97-2003 .doc files: the text is read straight from
+# the WordDocument stream through the piece table, no Word process needed.
+
+FIB_ENCRYPTED = 0x0100
+FIB_WHICH_TABLE = 0x0200
+FC_CLX_INDEX = 33       # fcClx/lcbClx pair in FibRgFcLcb97
+CCP_TEXT_INDEX = 3      # ccpText in FibRgLw97 (length of the main document text)
+
+# Field codes: keep the displayed result (after \x14), drop the instruction text
+FIELD_BEGIN, FIELD_SEPARATOR, FIELD_END = "\x13", "\x14", "\x15"
+PARAGRAPH_MARKS = re.compile("[\r\x07\x0c]")  # paragraph end, table cell end, page/section break
+CHAR_REPLACEMENTS = str.maketrans({"\x0b": "\n", "\x1e": "-", "\x1f": None, "\x01": None, "\x08": None})
+
+
+def _read_piece_table(table: bytes, fc_clx: int, lcb_clx: int):
+    """Return (cp_starts, pieces) from the Clx; a piece is (file offset, compressed)."""
+    pos, end = fc_clx, fc_clx + lcb_clx
+    while pos < end and table[pos] == 0x01:  # skip Prc (property modifiers)
+        pos += 3 + struct.unpack_from("<h", table, pos + 1)[0]
+    if pos >= end or table[pos] != 0x02:
+        raise ValueError("DOC piece table not found")
+    lcb = struct.unpack_from("<I", table, pos + 1)[0]
+    count = (lcb - 4) // 12
+    cps = struct.unpack_from(f"<{count + 1}I", table, pos + 5)
+    pieces = []
+    for i in range(count):
+        fc = struct.unpack_from("<I", table, pos + 5 + (count + 1) * 4 + i * 8 + 2)[0]
+        compressed = bool(fc & 0x40000000)
+        pieces.append(((fc & 0x3FFFFFFF) // 2 if compressed else fc, compressed))
+    return cps, pieces
+
+
+def _strip_fields(text):
+    """Remove field instructions ({ PAGE }, { HYPERLINK "..." }), keep field results."""
+    if FIELD_BEGIN not in text:
+        return text
+    out, stack = [], []  # stack holds True while inside a field's instruction part
+    for char in text:
+        if char == FIELD_BEGIN:
+            stack.append(True)
+        elif char == FIELD_SEPARATOR:
+            if stack:
+                stack[-1] = False
+        elif char == FIELD_END:
+            if stack:
+                stack.pop()
+        elif not any(stack):
+            out.append(char)
+    return "".join(out)
+
+
+def read_doc_text(file_path):
+    """Main document text of a .doc file (Word 97 and later)."""
+    ole = open_ole_file(file_path)
+    word = ole.read_stream("WordDocument")
+    ident, n_fib = struct.unpack_from("<HH", word, 0)
+    flags = struct.unpack_from("<H", word, 0x0A)[0]
+    if ident != 0xA5EC or n_fib < 101:
+        raise ValueError("Unsupported .doc version (Word 6/95 or older)")
+    if flags & FIB_ENCRYPTED:
+        raise ValueError("Encrypted .doc files are not supported")
+
+    # FIB layout: FibBase (32 bytes), then variable-length fibRgW, fibRgLw and fibRgFcLcb
+    csw = struct.unpack_from("<H", word, 32)[0]
+    lw_start = 32 + 2 + csw * 2 + 2
+    cslw = struct.unpack_from("<H", word, lw_start - 2)[0]
+    ccp_text = struct.unpack_from("<i", word, lw_start + CCP_TEXT_INDEX * 4)[0]
+    fc_lcb_start = lw_start + cslw * 4 + 2
+    fc_clx, lcb_clx = struct.unpack_from("<II", word, fc_lcb_start + FC_CLX_INDEX * 8)
+
+    table = ole.read_stream("1Table" if flags & FIB_WHICH_TABLE else "0Table")
+    cps, pieces = _read_piece_table(table, fc_clx, lcb_clx)
+
+    parts = []
+    for i, (offset, compressed) in enumerate(pieces):
+        start, stop = cps[i], min(cps[i + 1], ccp_text)
+        if start >= stop:
+            break
+        if compressed:
+            parts.append(word[offset:offset + stop - start].decode("cp1252", "replace"))
+        else:
+            parts.append(word[offset:offset + (stop - start) * 2].decode("utf-16-le", "replace"))
+    return "".join(parts)
+
+
+def iter_doc_segments(file_path):
+    """Yield each .doc paragraph, same shape as iter_docx_segments."""
+    text = _strip_fields(read_doc_text(file_path)).translate(CHAR_REPLACEMENTS)
+    paragraphs = PARAGRAPH_MARKS.split(text)
+    if paragraphs and paragraphs[-1] == "":
+        paragraphs.pop()  # the text ends with a paragraph mark
+    for paragraph in paragraphs:
+        yield TextSegment(paragraph + "\n", kind="paragraph")
+
+
+def extract_segments_from_doc_com(file_path):
+    """Old path through Word automation (Windows + Office only)."""
+    import win32com.client  # if this isn't working, run: pip install pywin32
 
-def extract_text_from_doc(file_path):
     word = win32com.client.Dispatch("Word.Application")
     #word.Visible = False
-    doc = word.Documents.Open(file_path)
+    doc = word.Documents.Open(os.path.abspath(file_path))
 
     temp_docx = file_path + "_temp.docx"
     doc.SaveAs(temp_docx, FileFormat=16)  # save as docx
@@ -13,8 +114,23 @@ def extract_text_from_doc(file_path):
     word.Quit()
 
     # Use your existing function
-    text = extract_text_from_docx(temp_docx)
+    segments = extract_segments_from_docx(temp_docx)
 
     # Delete temporary file
     os.remove(temp_docx)
-    return text
\ No newline at end of file
+    return segments
+
+
+def extract_segments_from_doc(file_path):
+    try:
+        return list(iter_doc_segments(file_path))
+    except Exception as e:
+        if os.name == "nt":
+            # Files the native reader can't handle (Word 95, encrypted) still work through Word
+            print(f"Native .doc reader failed ({e}), falling back to Word")
+            return extract_segments_from_doc_com(file_path)
+        return [TextSegment(f"Error: {e}", kind="error")]
+
+
+def extract_text_from_doc(file_path):
+    return join_segments(extract_segments_from_doc(file_path))
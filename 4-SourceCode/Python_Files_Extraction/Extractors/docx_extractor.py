@@ -1,11 +1,42 @@
 from docx import Document
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+from .segments import EXTRACT_STRUCTURED, TextSegment, join_segments, table_text
 
-def extract_text_from_docx(file_path):
-    text = ""
-    try:
-        doc = Document(file_path)
+def _row_cells(row):
+    # A merged cell is returned once per grid column it spans: keep it once
+    cells, seen = [], set()
+    for cell in row.cells:
+        if id(cell._tc) not in seen:
+            seen.add(id(cell._tc))
+            cells.append(cell.text)
+    return cells
+
+def iter_docx_segments(file_path, structured=EXTRACT_STRUCTURED):
+    """Yield each DOCX paragraph as it is read.
+
+    `structured` walks the body in document order instead, so tables
+    ("table", one row per line) come out between the paragraphs around them.
+    """
+    doc = Document(file_path)
+    if not structured:
         for para in doc.paragraphs:
-            text += para.text + "\n"
+            yield TextSegment(para.text + "\n", kind="paragraph")
+        return
+    for child in doc.element.body.iterchildren():
+        tag = child.tag.rsplit("}", 1)[-1]
+        if tag == "p":
+            yield TextSegment(Paragraph(child, doc).text + "\n", kind="paragraph")
+        elif tag == "tbl":
+            text = table_text(_row_cells(row) for row in Table(child, doc).rows)
+            if text:
+                yield TextSegment(text + "\n", kind="table")
+
+def extract_segments_from_docx(file_path):
+    try:
+        return list(iter_docx_segments(file_path))
     except Exception as e:
-        return f"Error: {e}"
-    return text
+        return [TextSegment(f"Error: {e}", kind="error")]
+
+def extract_text_from_docx(file_path):
+    return join_segments(extract_segments_from_docx(file_path))
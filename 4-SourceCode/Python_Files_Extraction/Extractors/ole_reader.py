@@ -0,0 +1,136 @@
+import struct
+
+# Minimal reader for OLE2 / Compound File Binary (CFB) containers, the format
+# behind legacy .doc and .ppt files. Pure Python and read-only, so it is safe
+# to use from parallel worker processes on any OS.
+
+CFB_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+ENDOFCHAIN = 0xFFFFFFFE
+FREESECT = 0xFFFFFFFF
+NOSTREAM = 0xFFFFFFFF
+
+STORAGE = 1
+STREAM = 2
+ROOT = 5
+
+
+class OleFileError(ValueError):
+    pass
+
+
+class OleFile:
+    """Read the streams of a CFB file given its raw bytes."""
+
+    def __init__(self, data: bytes):
+        if len(data) < 512 or data[:8] != CFB_SIGNATURE:
+            raise OleFileError("Not an OLE2 compound file")
+        self.data = data
+
+        (sector_shift, mini_sector_shift) = struct.unpack_from("<HH", data, 0x1E)
+        (self.num_fat_sectors, first_dir_sector, _, self.mini_cutoff,
+         first_mini_fat_sector, num_mini_fat_sectors,
+         first_difat_sector, num_difat_sectors) = struct.unpack_from("<IIIIIIII", data, 0x2C)
+
+        self.sector_size = 1 << sector_shift
+        self.mini_sector_size = 1 << mini_sector_shift
+
+        self.fat = self._read_fat(first_difat_sector, num_difat_sectors)
+        self.entries = self._read_directory(first_dir_sector)
+        root = self.entries[0]
+        self.mini_stream = self._read_chain(root["start"], root["size"]) if root["size"] else b""
+        self.mini_fat = []
+        if num_mini_fat_sectors and first_mini_fat_sector != ENDOFCHAIN:
+            raw = self._read_chain(first_mini_fat_sector)
+            self.mini_fat = list(struct.unpack_from(f"<{len(raw) // 4}I", raw))
+
+    # ---- sectors and chains ---- #
+    def _sector(self, index: int) -> bytes:
+        offset = (index + 1) * self.sector_size
+        return self.data[offset:offset + self.sector_size]
+
+    def _read_fat(self, first_difat_sector: int, num_difat_sectors: int) -> list:
+        fat_sectors = list(struct.unpack_from("<109I", self.data, 0x4C))
+        next_sector = first_difat_sector
+        per_sector = self.sector_size // 4 - 1
+        for _ in range(num_difat_sectors):
+            if next_sector in (ENDOFCHAIN, FREESECT):
+                break
+            values = struct.unpack_from(f"<{per_sector + 1}I", self._sector(next_sector))
+            fat_sectors.extend(values[:per_sector])
+            next_sector = values[per_sector]
+
+        fat_sectors = [s for s in fat_sectors if s not in (ENDOFCHAIN, FREESECT)][:self.num_fat_sectors]
+        raw = b"".join(self._sector(s) for s in fat_sectors)
+        return list(struct.unpack_from(f"<{len(raw) // 4}I", raw))
+
+    def _chain(self, start: int, table: list) -> list:
+        chain, seen = [], set()
+        sector = start
+        while sector not in (ENDOFCHAIN, FREESECT) and sector < len(table):
+            if sector in seen:
+                raise OleFileError("Loop in sector chain")
+            seen.add(sector)
+            chain.append(sector)
+            sector = table[sector]
+        return chain
+
+    def _read_chain(self, start: int, size: int | None = None) -> bytes:
+        raw = b"".join(self._sector(s) for s in self._chain(start, self.fat))
+        return raw if size is None else raw[:size]
+
+    def _read_mini_chain(self, start: int, size: int) -> bytes:
+        step = self.mini_sector_size
+        raw = b"".join(self.mini_stream[s * step:(s + 1) * step] for s in self._chain(start, self.mini_fat))
+        return raw[:size]
+
+    # ---- directory ---- #
+    def _read_directory(self, first_dir_sector: int) -> list:
+        raw = self._read_chain(first_dir_sector)
+        entries = []
+        for offset in range(0, len(raw) - 127, 128):
+            name_length, entry_type = struct.unpack_from("<HB", raw, offset + 64)
+            left, right, child = struct.unpack_from("<III", raw, offset + 68)
+            start, size = struct.unpack_from("<IQ", raw, offset + 116)
+            name = raw[offset:offset + max(0, name_length - 2)].decode("utf-16-le", "replace")
+            if self.sector_size == 512:
+                size &= 0xFFFFFFFF  # version 3 files only use the low 32 bits
+            entries.append({
+                "name": name, "type": entry_type, "left": left, "right": right,
+                "child": child, "start": start, "size": size,
+            })
+        if not entries or entries[0]["type"] != ROOT:
+            raise OleFileError("Missing root directory entry")
+        return entries
+
+    def _children(self, index: int) -> list:
+        """Direct children of a storage (its red-black tree flattened)."""
+        children, stack, seen = [], [self.entries[index]["child"]], set()
+        while stack:
+            current = stack.pop()
+            if current == NOSTREAM or current >= len(self.entries) or current in seen:
+                continue
+            seen.add(current)
+            entry = self.entries[current]
+            children.append(entry)
+            stack.extend((entry["left"], entry["right"]))
+        return children
+
+    # ---- public API ---- #
+    def list_streams(self) -> list:
+        return [entry["name"] for entry in self._children(0) if entry["type"] == STREAM]
+
+    def exists(self, name: str) -> bool:
+        return name in self.list_streams()
+
+    def read_stream(self, name: str) -> bytes:
+        for entry in self._children(0):
+            if entry["type"] == STREAM and entry["name"] == name:
+                if entry["size"] < self.mini_cutoff:
+                    return self._read_mini_chain(entry["start"], entry["size"])
+                return self._read_chain(entry["start"], entry["size"])
+        raise OleFileError(f"Stream not found: {name}")
+
+
+def open_ole_file(file_path) -> OleFile:
+    with open(file_path, "rb") as f:
+        return OleFile(f.read())
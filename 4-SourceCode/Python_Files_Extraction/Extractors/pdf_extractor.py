@@ -1,12 +1,69 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 import fitz  # PyMuPDF
+from .segments import TextSegment, join_segments
 
-def extract_text_from_pdf(file_path):
-    text = ""
+# Above this many pages a PDF is split into page ranges extracted in parallel
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+PDF_MIN_PAGES_PER_RANGE = int(os.getenv("PDF_MIN_PAGES_PER_RANGE", "16"))
+
+def iter_pdf_segments(file_path):
+    """Yield the text of each PDF page as it is read."""
+    doc = fitz.open(file_path)
     try:
-        doc = fitz.open(file_path)
-        for page in doc:
-            text += page.get_text()
+        for page_number, page in enumerate(doc, start=1):
+            yield TextSegment(page.get_text(), page=page_number, kind="page")
+    finally:
         doc.close()
+
+def extract_segments_from_pdf(file_path):
+    segments = []
+    try:
+        for segment in iter_pdf_segments(file_path):
+            segments.append(segment)
     except Exception as e:
         print(f"Error reading PDF: {e}")
-    return text
\ No newline at end of file
+    return segments
+
+def extract_text_from_pdf(file_path):
+    return join_segments(extract_segments_from_pdf(file_path))
+
+# ---------------- PAGE-PARALLEL MODE ---------------- #
+def pdf_page_count(file_path):
+    """Opening a PDF only reads its xref, so this is cheap even for huge files."""
+    try:
+        with fitz.open(file_path) as doc:
+            return doc.page_count
+    except Exception:
+        return 0
+
+def plan_page_ranges(page_count, workers):
+    """Split [0, page_count) into about two ranges per worker for load balancing."""
+    ranges_wanted = max(1, min(workers * 2, page_count // PDF_MIN_PAGES_PER_RANGE))
+    step = -(-page_count // ranges_wanted)  # ceiling division
+    return [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+
+def extract_pdf_page_range(file_path, start, stop):
+    """Worker job: open the PDF with its own PyMuPDF handle and read pages [start, stop)."""
+    segments = []
+    try:
+        with fitz.open(file_path) as doc:
+            for index in range(start, stop):
+                segments.append(TextSegment(doc[index].get_text(), page=index + 1, kind="page"))
+    except Exception as e:
+        print(f"Error reading PDF pages {start + 1}-{stop}: {e}")
+    return segments
+
+def extract_segments_from_pdf_parallel(file_path, workers=None):
+    """Page-parallel extraction for standalone use; small files take the serial fast path."""
+    workers = workers or os.cpu_count() or 1
+    page_count = pdf_page_count(file_path)
+    if workers < 2 or page_count < PDF_PARALLEL_MIN_PAGES:
+        return extract_segments_from_pdf(file_path)
+
+    ranges = plan_page_ranges(page_count, workers)
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(extract_pdf_page_range, file_path, start, stop) for start, stop in ranges]
+        # Reassemble in page order
+        return [segment for future in futures for segment in future.result()]
@@ -1,22 +1,151 @@
 import os
-import comtypes.client
-from pptx import Presentation
+import struct
+from .ole_reader import open_ole_file
+from .pptx_extractor import extract_segments_from_pptx
+from .segments import TextSegment, join_segments
 
-def extract_text_from_pptx(file_path):
-    """Extract all text from a PPTX file."""
-    text = ""
+# Native reader for PowerPoint 97-2003 .ppt files. The "PowerPoint Document"
+# stream is a tree of records; the persist directory (found through the
+# "Current User" stream) maps slide ids to the offsets of their records.
+
+RT_DOCUMENT = 0x03E8
+RT_SLIDE = 0x03EE
+RT_SLIDE_PERSIST_ATOM = 0x03F3
+RT_TEXT_HEADER_ATOM = 0x0F9F
+RT_OUTLINE_TEXT_REF_ATOM = 0x0F9E
+RT_TEXT_CHARS_ATOM = 0x0FA0
+RT_TEXT_BYTES_ATOM = 0x0FA8
+RT_SLIDE_LIST_WITH_TEXT = 0x0FF0
+RT_USER_EDIT_ATOM = 0x0FF5
+RT_PERSIST_DIRECTORY_ATOM = 0x1772
+
+# TextHeaderAtom text types, named like the pptx placeholder kinds
+TEXT_KINDS = {0: "title", 1: "body", 2: "notes", 4: "text_box", 5: "center_body", 6: "center_title", 7: "half_body", 8: "quarter_body"}
+
+
+def _record_header(data, offset):
+    ver_instance, rec_type, length = struct.unpack_from("<HHI", data, offset)
+    return ver_instance & 0x000F, ver_instance >> 4, rec_type, length
+
+
+def _iter_records(data, start, end):
+    """Yield (rec_type, instance, body_start, body_end, is_container) for one record level."""
+    pos = start
+    while pos + 8 <= end:
+        version, instance, rec_type, length = _record_header(data, pos)
+        body_end = min(pos + 8 + length, end)
+        yield rec_type, instance, pos + 8, body_end, version == 0x0F
+        pos = body_end
+
+
+def _decode_text(data, rec_type, start, end):
+    if rec_type == RT_TEXT_CHARS_ATOM:
+        text = data[start:end].decode("utf-16-le", "replace")
+    else:
+        text = data[start:end].decode("latin-1")  # TextBytesAtom: UTF-16 with the high bytes dropped
+    # \r ends a paragraph, \x0b is a line break inside one
+    return text.replace("\r", "\n").replace("\x0b", "\n")
+
+
+def _read_persist_directory(ole, data):
+    """Map persist id -> stream offset, following the chain of incremental saves."""
+    current_user = ole.read_stream("Current User")
+    edit_offset = struct.unpack_from("<I", current_user, 16)[0]
+    persist, doc_persist_id, seen = {}, None, set()
+    while edit_offset and edit_offset not in seen and edit_offset + 8 <= len(data):
+        seen.add(edit_offset)
+        _, _, rec_type, _ = _record_header(data, edit_offset)
+        if rec_type != RT_USER_EDIT_ATOM:
+            break
+        last_edit, directory_offset, persist_id = struct.unpack_from("<III", data, edit_offset + 16)
+        if doc_persist_id is None:
+            doc_persist_id = persist_id
+
+        _, _, _, length = _record_header(data, directory_offset)
+        pos, end = directory_offset + 8, directory_offset + 8 + length
+        while pos + 4 <= end:
+            entry = struct.unpack_from("<I", data, pos)[0]
+            first_id, count = entry & 0xFFFFF, entry >> 20
+            for i in range(count):
+                # Newest edit is read first, so older offsets never overwrite it
+                persist.setdefault(first_id + i, struct.unpack_from("<I", data, pos + 4 + i * 4)[0])
+            pos += 4 + count * 4
+        edit_offset = last_edit
+    return persist, doc_persist_id
+
+
+def _slide_list(data, document_offset):
+    """[(slide persist id, [(kind, text), ...])] from the slides' SlideListWithText."""
+    _, _, rec_type, length = _record_header(data, document_offset)
+    if rec_type != RT_DOCUMENT:
+        raise ValueError("DocumentContainer not found")
+    slides = []
+    for rec_type, instance, start, end, _ in _iter_records(data, document_offset + 8, document_offset + 8 + length):
+        if rec_type != RT_SLIDE_LIST_WITH_TEXT or instance != 0:  # 1 = masters, 2 = notes
+            continue
+        kind = "text"
+        for child_type, _, child_start, child_end, _ in _iter_records(data, start, end):
+            if child_type == RT_SLIDE_PERSIST_ATOM:
+                slides.append((struct.unpack_from("<I", data, child_start)[0], []))
+            elif child_type == RT_TEXT_HEADER_ATOM:
+                kind = TEXT_KINDS.get(struct.unpack_from("<I", data, child_start)[0], "text")
+            elif child_type in (RT_TEXT_CHARS_ATOM, RT_TEXT_BYTES_ATOM) and slides:
+                slides[-1][1].append((kind, _decode_text(data, child_type, child_start, child_end)))
+    return slides
+
+
+def _shape_texts(data, start, end):
+    """Text atoms stored in a slide's drawing (text boxes that are not placeholders)."""
+    texts, kind = [], "text_box"
+    for rec_type, _, child_start, child_end, is_container in _iter_records(data, start, end):
+        if is_container:
+            texts.extend(_shape_texts(data, child_start, child_end))
+        elif rec_type == RT_TEXT_HEADER_ATOM:
+            kind = TEXT_KINDS.get(struct.unpack_from("<I", data, child_start)[0], "text_box")
+        elif rec_type in (RT_TEXT_CHARS_ATOM, RT_TEXT_BYTES_ATOM):
+            texts.append((kind, _decode_text(data, rec_type, child_start, child_end)))
+    return texts
+
+
+def _iter_all_text_atoms(data):
+    """Fallback when the persist directory is unusable: every text atom in stream order."""
+    def walk(start, end):
+        for rec_type, _, child_start, child_end, is_container in _iter_records(data, start, end):
+            if is_container:
+                yield from walk(child_start, child_end)
+            elif rec_type in (RT_TEXT_CHARS_ATOM, RT_TEXT_BYTES_ATOM):
+                yield _decode_text(data, rec_type, child_start, child_end)
+    for text in walk(0, len(data)):
+        yield TextSegment(text + "\n", kind="text")
+
+
+def iter_ppt_segments(file_path):
+    """Yield the text of each slide's text blocks, same shape as iter_pptx_segments."""
+    ole = open_ole_file(file_path)
+    data = ole.read_stream("PowerPoint Document")
     try:
-        prs = Presentation(file_path)
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    text += shape.text + "\n"
-    except Exception as e:
-        return f"Error: {e}"
-    return text
+        persist, doc_persist_id = _read_persist_directory(ole, data)
+        slides = _slide_list(data, persist[doc_persist_id])
+    except (ValueError, KeyError, struct.error) as e:
+        print(f"PPT persist directory unreadable ({e}), scanning all text records")
+        yield from _iter_all_text_atoms(data)
+        return
+
+    for slide_number, (persist_id, outline_texts) in enumerate(slides, start=1):
+        texts = list(outline_texts)  # placeholder text (title, body) lives in the slide list
+        slide_offset = persist.get(persist_id)
+        if slide_offset is not None and slide_offset + 8 <= len(data):
+            _, _, rec_type, length = _record_header(data, slide_offset)
+            if rec_type == RT_SLIDE:
+                texts.extend(_shape_texts(data, slide_offset + 8, slide_offset + 8 + length))
+        for kind, text in texts:
+            yield TextSegment(text + "\n", slide=slide_number, kind=kind)
+
+
+def extract_segments_from_ppt_com(file_path):
+    """Old path: convert PPT to temporary PPTX through PowerPoint (Windows + Office only)."""
+    import comtypes.client  # if this isn't working, run: pip install comtypes
 
-def extract_text_from_ppt(file_path):
-    """Convert PPT to temporary PPTX, extract text, then delete temp file."""
     powerpoint = comtypes.client.CreateObject("PowerPoint.Application")
     #powerpoint.Visible = 0
 
@@ -27,6 +156,20 @@ def extract_text_from_ppt(file_path):
     presentation.Close()
     powerpoint.Quit()
 
-    text = extract_text_from_pptx(temp_pptx)
+    segments = extract_segments_from_pptx(temp_pptx)
     os.remove(temp_pptx)
-    return text
\ No newline at end of file
+    return segments
+
+
+def extract_segments_from_ppt(file_path):
+    try:
+        return list(iter_ppt_segments(file_path))
+    except Exception as e:
+        if os.name == "nt":
+            print(f"Native .ppt reader failed ({e}), falling back to PowerPoint")
+            return extract_segments_from_ppt_com(file_path)
+        return [TextSegment(f"Error: {e}", kind="error")]
+
+
+def extract_text_from_ppt(file_path):
+    return join_segments(extract_segments_from_ppt(file_path))
@@ -1,14 +1,66 @@
 from pptx import Presentation
+from pptx.shapes.group import GroupShape
+from .segments import EXTRACT_STRUCTURED, TextSegment, join_segments, table_text
 
-def extract_text_from_pptx(file_path):
-    """Extract all text from a PPTX file."""
-    text = ""
+def _shape_kind(shape):
+    """Placeholder type ("title", "body", ...) or shape type ("text_box", ...)."""
     try:
-        prs = Presentation(file_path)
-        for slide in prs.slides:
+        if shape.is_placeholder:
+            return shape.placeholder_format.type.name.lower()
+        return shape.shape_type.name.lower()
+    except (AttributeError, NotImplementedError, ValueError):
+        return "shape"
+
+def _iter_shape_blocks(shapes):
+    """(kind, text) of each shape, descending into groups and reading table cells."""
+    for shape in shapes:
+        if isinstance(shape, GroupShape):
+            yield from _iter_shape_blocks(shape.shapes)
+        elif getattr(shape, "has_table", False):
+            # Merged cells repeat their text in every cell they cover: keep the origin only
+            yield "table", table_text(
+                [cell.text for cell in row.cells if not cell.is_spanned] for row in shape.table.rows
+            )
+        else:
+            text = getattr(shape, "text", None)
+            if text is not None:
+                yield _shape_kind(shape), text
+
+def _notes_text(slide):
+    # has_notes_slide first: reading notes_slide would create an empty one
+    if not slide.has_notes_slide:
+        return ""
+    frame = slide.notes_slide.notes_text_frame
+    return frame.text if frame is not None else ""
+
+def iter_pptx_segments(file_path, structured=EXTRACT_STRUCTURED):
+    """Yield the text of each slide shape as it is read.
+
+    `structured` also yields grouped shapes, tables ("table", one row per
+    line) and the speaker notes ("notes") of each slide, from the same pass.
+    """
+    prs = Presentation(file_path)
+    for slide_number, slide in enumerate(prs.slides, start=1):
+        if not structured:
             for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    text += shape.text + "\n"
+                # getattr instead of hasattr + shape.text: the text property walks the XML each time
+                text = getattr(shape, "text", None)
+                if text is not None:
+                    yield TextSegment(text + "\n", slide=slide_number, kind=_shape_kind(shape))
+            continue
+        for kind, text in _iter_shape_blocks(slide.shapes):
+            if kind != "table" or text:
+                yield TextSegment(text + "\n", slide=slide_number, kind=kind)
+        notes = _notes_text(slide)
+        if notes.strip():
+            yield TextSegment(notes + "\n", slide=slide_number, kind="notes")
+
+def extract_segments_from_pptx(file_path):
+    try:
+        return list(iter_pptx_segments(file_path))
     except Exception as e:
-        return f"Error: {e}"
-    return text
+        return [TextSegment(f"Error: {e}", kind="error")]
+
+def extract_text_from_pptx(file_path):
+    """Extract all text from a PPTX file."""
+    return join_segments(extract_segments_from_pptx(file_path))
@@ -0,0 +1,58 @@
+import json
+import os
+from dataclasses import dataclass, asdict
+from typing import Iterable
+
+# Structured PPTX / DOCX extraction: tables, grouped shapes and speaker notes
+# become their own typed segments ("table", "notes"). "0" gives the old
+# shape.text / doc.paragraphs output.
+EXTRACT_STRUCTURED = os.getenv("EXTRACT_STRUCTURED", "1") == "1"
+
+
+@dataclass
+class TextSegment:
+    """One piece of extracted text with where it came from.
+
+    `text` keeps the exact characters the old string extractors produced, so
+    joining the segments of a file gives back the same text (structured
+    PPTX / DOCX extraction adds the table and notes segments on top).
+    """
+    text: str
+    page: int | None = None   # PDF page number (1-based)
+    slide: int | None = None  # PPTX/PPT slide number (1-based)
+    kind: str = "text"        # "page", "paragraph", "table", "notes", or the slide shape kind ("title", "body", "text_box", ...)
+
+
+# A cell with more lines than this is a text box laid out with a table (code,
+# a two-column handout), not a data cell
+TABLE_CELL_MAX_LINES = 4
+
+
+def table_text(rows: Iterable[list[str]]) -> str:
+    """One line per table row, cells separated by " | "; empty rows are left out.
+
+    Layout tables (see TABLE_CELL_MAX_LINES) keep each cell's own lines
+    instead, one cell after the other.
+    """
+    rows = [[cell.strip() for cell in cells] for cells in rows]
+    if any(cell.count("\n") >= TABLE_CELL_MAX_LINES for cells in rows for cell in cells):
+        return "\n\n".join(cell for cells in rows for cell in cells if cell)
+    lines = []
+    for cells in rows:
+        cells = [" ".join(cell.split()) for cell in cells]
+        if any(cells):
+            lines.append(" | ".join(cells))
+    return "\n".join(lines)
+
+
+def join_segments(segments: Iterable[TextSegment]) -> str:
+    # One join instead of `text += ...` keeps assembly linear in the output size
+    return "".join(segment.text for segment in segments)
+
+
+def segments_to_json(segments: list[TextSegment]) -> str:
+    return json.dumps([asdict(segment) for segment in segments], ensure_ascii=False)
+
+
+def segments_from_json(data: str) -> list[TextSegment]:
+    return [TextSegment(**item) for item in json.loads(data)]
@@ -0,0 +1,89 @@
+# Benchmark: one completion per chunk vs several chunks packed into one completion.
+# Chunks the 8-CollectedData corpus, generates MCQs for every document both ways
+# against the mock server and reports calls, prompt/completion tokens and wall time.
+# Token counts come from the mock's length-based "usage", so compare the two
+# paths with each other rather than with a real model's bill.
+# Run from 4-SourceCode/Python_Files_Extraction:
+#   python benchmarks/bench_batching.py [--corpus ../../8-CollectedData] [--limit 20]
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_llm_server import MockLLMServer
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "8-CollectedData")
+
+
+def load_documents(corpus: str, limit: int) -> list:
+    from chunker import chunk_segments
+    from Extractors.content_extractor_all import extract_file_segments
+
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(corpus)
+        for name in names
+        if name.lower().endswith((".pdf", ".pptx", ".docx", ".ppt", ".doc"))
+    )
+    documents = []
+    for path in paths:
+        segments = extract_file_segments(path, os.path.basename(path))
+        if any(segment.kind == "error" for segment in segments):
+            continue
+        chunks = list(chunk_segments(segments))
+        if chunks:
+            documents.append((os.path.basename(path), chunks))
+        if limit and len(documents) >= limit:
+            break
+    return documents
+
+
+async def bench(documents):
+    import content_creation_json
+    from llm_clients import close_llm_clients
+
+    for label, batch in (("per chunk", False), ("batched", True)):
+        usage = content_creation_json.llm_usage
+        before = dict(usage)
+        questions = 0
+        start = time.perf_counter()
+        for name, chunks in documents:
+            result = await content_creation_json.generate_quiz_from_chunks(name, chunks, "mcq", use_cache=False, batch=batch)
+            questions += len(result["questions"])
+        wall = time.perf_counter() - start
+        print(
+            f"{label:<10} calls={usage['calls'] - before['calls']:<6} "
+            f"prompt tokens={usage['prompt_tokens'] - before['prompt_tokens']:<9} "
+            f"completion tokens={usage['completion_tokens'] - before['completion_tokens']:<9} "
+            f"questions={questions:<6} completion tokens/question={(usage['completion_tokens'] - before['completion_tokens']) / max(questions, 1):5.1f} "
+            f"wall={wall:6.2f} s"
+        )
+
+    await close_llm_clients()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--limit", type=int, default=20, help="documents to use (0 = all)")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds of fixed overhead per call")
+    parser.add_argument("--token-delay", type=float, default=0.0005, help="seconds per generated token")
+    args = parser.parse_args()
+
+    documents = load_documents(args.corpus, args.limit)
+    print(f"{len(documents)} documents, {sum(len(chunks) for _, chunks in documents)} chunks")
+
+    # Single-chunk prompts get as many questions as a full-size chunk in a batch
+    from content_creation_json import QUESTIONS_PER_CHUNK
+    with MockLLMServer(latency=args.latency, token_delay=args.token_delay, questions=QUESTIONS_PER_CHUNK) as server:
+        import content_creation_json
+        content_creation_json.BASE_URL = content_creation_json.openrouter_backend.base_url = server.base_url
+        asyncio.run(bench(documents))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Benchmark: token-aware paragraph chunker vs the old fixed 500-character slicing.
+# Reports LLM calls per document and total prompt tokens over the 8-CollectedData corpus.
+# Run from 4-SourceCode/Python_Files_Extraction:
+#   python benchmarks/bench_chunker.py [--corpus ../../8-CollectedData] [--max-tokens 800]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chunker import get_token_counter, iter_chunks, split_paragraphs
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "8-CollectedData")
+SYSTEM_PROMPT_TOKENS = 150  # the MCQ/TF system prompt sent with every chunk
+
+
+def fixed_chunks(text: str, max_chars: int = 500):
+    """The previous content_creation_json.chunk_text."""
+    return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+
+def extract(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pdf":
+        from Extractors.pdf_extractor import extract_text_from_pdf
+        return extract_text_from_pdf(path)
+    if ext == ".pptx":
+        from Extractors.pptx_extractor import extract_text_from_pptx
+        return extract_text_from_pptx(path)
+    if ext == ".docx":
+        from Extractors.docx_extractor import extract_text_from_docx
+        return extract_text_from_docx(path)
+    return ""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--max-tokens", type=int, default=800)
+    parser.add_argument("--overlap", type=int, default=0)
+    parser.add_argument("--limit", type=int, default=0, help="stop after N documents (0 = all)")
+    args = parser.parse_args()
+
+    count_tokens = get_token_counter()
+    totals = {"docs": 0, "old_calls": 0, "new_calls": 0, "old_tokens": 0, "new_tokens": 0, "new_seconds": 0.0}
+
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(args.corpus)
+        for name in names
+        if name.lower().endswith((".pdf", ".pptx", ".docx"))
+    )
+    if args.limit:
+        paths = paths[:args.limit]
+
+    print(f"{'document':<60} {'old calls':>9} {'new calls':>9} {'old tokens':>10} {'new tokens':>10}")
+    for path in paths:
+        text = extract(path)
+        if not text.strip():
+            continue
+
+        old = fixed_chunks(text)
+        start = time.perf_counter()
+        new = list(iter_chunks(split_paragraphs(text), args.max_tokens, args.overlap, count_tokens))
+        totals["new_seconds"] += time.perf_counter() - start
+
+        old_tokens = sum(count_tokens(chunk) for chunk in old) + SYSTEM_PROMPT_TOKENS * len(old)
+        new_tokens = sum(count_tokens(chunk) for chunk in new) + SYSTEM_PROMPT_TOKENS * len(new)
+
+        totals["docs"] += 1
+        totals["old_calls"] += len(old)
+        totals["new_calls"] += len(new)
+        totals["old_tokens"] += old_tokens
+        totals["new_tokens"] += new_tokens
+        name = os.path.relpath(path, args.corpus)[-60:]
+        print(f"{name:<60} {len(old):>9} {len(new):>9} {old_tokens:>10} {new_tokens:>10}")
+
+    docs = max(1, totals["docs"])
+    print()
+    print(f"documents:               {totals['docs']}")
+    print(f"LLM calls per document:  old {totals['old_calls'] / docs:.1f}  new {totals['new_calls'] / docs:.1f}")
+    print(f"total prompt tokens:     old {totals['old_tokens']}  new {totals['new_tokens']}"
+          f"  ({100 * (1 - totals['new_tokens'] / max(1, totals['old_tokens'])):.1f}% fewer)")
+    print(f"chunking time:           {totals['new_seconds']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
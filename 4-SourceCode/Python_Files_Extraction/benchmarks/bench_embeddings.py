@@ -0,0 +1,76 @@
+# Benchmark: embedding throughput of the topic index on CPU.
+# Every chunk of the corpus is embedded into a fresh index at each batch size
+# and the throughput is reported in chunks per second and per core (the model
+# is pinned to --threads threads). Adding the same chunks again only hashes
+# them, and top-k search latency is measured over the full matrix and over
+# one document's rows (what /generate_quiz?topic= does).
+# Run from 4-SourceCode/Python_Files_Extraction:
+#   python benchmarks/bench_embeddings.py [--limit 20] [--model hash:384] [--threads 1] [--batch-sizes 8,32,128]
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_batching import DEFAULT_CORPUS, load_documents
+
+QUERIES = ("linear regression", "neural networks", "sorting algorithms", "قواعد البيانات", "operating system scheduling")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--limit", type=int, default=20, help="documents to use (0 = all)")
+    parser.add_argument("--model", default=None, help="default: EMBEDDING_MODEL")
+    parser.add_argument("--threads", type=int, default=1, help="CPU threads for the model")
+    parser.add_argument("--batch-sizes", default="8,32,128")
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    # Pin the thread pools before numpy / torch start theirs
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(args.threads)
+    os.environ["EMBEDDING_THREADS"] = str(args.threads)
+    import embedding_index
+    model = args.model or embedding_index.EMBEDDING_MODEL
+
+    documents = load_documents(args.corpus, args.limit)
+    chunks = [chunk for _, document in documents for chunk in document]
+    print(f"{len(documents)} documents, {len(chunks)} chunks, model {model}, {args.threads} thread(s)")
+
+    start = time.perf_counter()
+    embedder = embedding_index.load_embedder(model)
+    print(f"model load       {time.perf_counter() - start:6.2f} s ({embedder.dimensions} dimensions)")
+
+    index = None
+    for batch_size in (int(size) for size in args.batch_sizes.split(",")):
+        embedding_index.EMBEDDING_BATCH_SIZE = batch_size
+        index = embedding_index.EmbeddingIndex(tempfile.mkdtemp(), model)
+        index._embedder = embedder
+        start = time.perf_counter()
+        index.add(chunks)
+        wall = time.perf_counter() - start
+        print(f"batch {batch_size:<4}       {wall:6.2f} s  {len(chunks) / wall:8.1f} chunks/s  "
+              f"{len(chunks) / wall / args.threads:8.1f} chunks/s/core")
+
+    start = time.perf_counter()
+    index.add(chunks)
+    print(f"re-add           {time.perf_counter() - start:6.2f} s  (0 embedded, {len(chunks)} reused)")
+
+    for label, rows in (("search all", None), ("search 1 doc", index.add(documents[0][1]))):
+        timings = []
+        for query in QUERIES * 5:
+            start = time.perf_counter()
+            index.search(query, args.k, rows)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(f"{label:<16} p50={statistics.median(timings):6.2f} ms  p95={timings[int(len(timings) * 0.95)]:6.2f} ms "
+              f"over {len(rows) if rows is not None else len(chunks)} rows")
+
+
+if __name__ == "__main__":
+    main()
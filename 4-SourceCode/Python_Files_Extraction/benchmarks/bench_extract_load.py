@@ -0,0 +1,83 @@
+# Load test: /extract_text throughput as the extraction process pool grows.
+# Each worker count runs in its own process with the extraction cache disabled.
+# Run from 4-SourceCode/Python_Files_Extraction:
+#   python benchmarks/bench_extract_load.py [--corpus ../../8-CollectedData] [--files 48]
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "8-CollectedData")
+
+
+def corpus_files(corpus: str, limit: int) -> list[str]:
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(corpus)
+        for name in names
+        if name.lower().endswith((".pdf", ".pptx", ".docx"))
+    )
+    return paths[:limit]
+
+
+async def run_load(paths: list[str], concurrency: int):
+    import httpx
+    import APIFile
+
+    payloads = [(os.path.basename(path), open(path, "rb").read()) for path in paths]
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=APIFile.app)
+
+    async with APIFile.lifespan(APIFile.app):
+        # Let the warm-up jobs finish before timing
+        await asyncio.sleep(3)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api", timeout=None) as client:
+            async def send(name, data):
+                async with semaphore:
+                    await client.post("/extract_text", files={"file": (name, data)})
+
+            start = time.perf_counter()
+            await asyncio.gather(*(send(name, data) for name, data in payloads))
+            wall = time.perf_counter() - start
+
+    megabytes = sum(len(data) for _, data in payloads) / 1024 / 1024
+    workers = os.environ["EXTRACTION_WORKERS"]
+    print(f"workers={workers:<3} files={len(payloads):<4} wall={wall:6.2f} s  "
+          f"{len(payloads) / wall:6.2f} files/s  {megabytes / wall:6.2f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--files", type=int, default=48)
+    parser.add_argument("--workers", type=int, nargs="*")
+    parser.add_argument("--child", action="store_true")
+    args = parser.parse_args()
+
+    paths = corpus_files(args.corpus, args.files)
+    if args.child:
+        asyncio.run(run_load(paths, concurrency=2 * int(os.environ["EXTRACTION_WORKERS"])))
+        return
+
+    cores = os.cpu_count() or 1
+    counts = args.workers or sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1)))
+    for workers in counts:
+        env = dict(
+            os.environ,
+            EXTRACTION_WORKERS=str(workers),
+            EXTRACTION_CACHE_MAX_BYTES="0",
+            EXTRACTION_MEMORY_CACHE_MAX_BYTES="0",
+        )
+        subprocess.run(
+            [sys.executable, __file__, "--child", "--corpus", args.corpus, "--files", str(args.files)],
+            env=env,
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
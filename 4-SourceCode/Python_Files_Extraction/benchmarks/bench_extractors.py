@@ -0,0 +1,88 @@
+# Micro-benchmark: `text += ...` extractors vs the segment generators joined once.
+# Runs over the PDF and PPTX files of 8-CollectedData and checks both produce the same text.
+# Run from 4-SourceCode/Python_Files_Extraction:
+#   python benchmarks/bench_extractors.py [--corpus ../../8-CollectedData] [--repeat 3]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The old extractors only read shape.text: compare against the flat mode
+# (bench_structured.py covers the structured one)
+os.environ["EXTRACT_STRUCTURED"] = "0"
+
+import fitz  # PyMuPDF
+from pptx import Presentation
+from Extractors.pdf_extractor import extract_text_from_pdf
+from Extractors.pptx_extractor import extract_text_from_pptx
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "8-CollectedData")
+
+
+# ---------------- PREVIOUS IMPLEMENTATIONS ---------------- #
+def old_extract_text_from_pdf(file_path):
+    text = ""
+    doc = fitz.open(file_path)
+    for page in doc:
+        text += page.get_text()
+    doc.close()
+    return text
+
+
+def old_extract_text_from_pptx(file_path):
+    text = ""
+    prs = Presentation(file_path)
+    for slide in prs.slides:
+        for shape in slide.shapes:
+            if hasattr(shape, "text"):
+                text += shape.text + "\n"
+    return text
+
+
+def time_extractor(extract, paths, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            extract(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    files = {".pdf": [], ".pptx": []}
+    for root, _, names in os.walk(args.corpus):
+        for name in names:
+            ext = os.path.splitext(name)[1].lower()
+            if ext in files:
+                files[ext].append(os.path.join(root, name))
+
+    cases = [
+        (".pdf", old_extract_text_from_pdf, extract_text_from_pdf),
+        (".pptx", old_extract_text_from_pptx, extract_text_from_pptx),
+    ]
+    for ext, old, new in cases:
+        paths = []
+        for path in sorted(files[ext]):
+            try:
+                if old(path) != new(path):
+                    print(f"  output differs: {path}")
+                paths.append(path)
+            except Exception as e:
+                print(f"  skipped {path}: {e}")
+
+        characters = sum(len(new(path)) for path in paths)
+        old_time = time_extractor(old, paths, args.repeat)
+        new_time = time_extractor(new, paths, args.repeat)
+        print(f"{ext:<6} files={len(paths):<4} chars={characters:<10} "
+              f"old={old_time:7.2f} s  new={new_time:7.2f} s  speedup={old_time / new_time:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Benchmark: native OLE2 readers for .doc/.ppt vs the old Office COM round trip.
+# Runs over the .doc and .ppt files of 8-CollectedData. The native readers are timed
+# serially and in a process pool; the COM path only runs on Windows with Office
+# installed (--com), where it also reports how much of its text the native reader finds.
+# Run from 4-SourceCode/Python_Files_Extraction:
+#   python benchmarks/bench_legacy_office.py [--corpus ../../8-CollectedData] [--workers 4] [--com]
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Extractors.doc_extractor import extract_segments_from_doc_com, extract_text_from_doc
+from Extractors.ppt_extractor import extract_segments_from_ppt_com, extract_text_from_ppt
+from Extractors.segments import join_segments
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "8-CollectedData")
+
+NATIVE = {".doc": extract_text_from_doc, ".ppt": extract_text_from_ppt}
+COM = {".doc": extract_segments_from_doc_com, ".ppt": extract_segments_from_ppt_com}
+
+
+def word_recall(reference, text):
+    """Share of the reference's words that also appear in text (order-insensitive)."""
+    reference_words = set(reference.split())
+    if not reference_words:
+        return 1.0
+    return len(reference_words & set(text.split())) / len(reference_words)
+
+
+def time_serial(extract, paths):
+    start = time.perf_counter()
+    results = [extract(path) for path in paths]
+    return time.perf_counter() - start, results
+
+
+def time_pool(extract, paths, workers):
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        list(executor.map(len, [""] * workers))  # start the workers outside the timing
+        start = time.perf_counter()
+        list(executor.map(extract, paths))
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--com", action="store_true", help="also time the Word/PowerPoint COM path (Windows only)")
+    args = parser.parse_args()
+
+    files = {".doc": [], ".ppt": []}
+    for root, _, names in os.walk(args.corpus):
+        for name in names:
+            ext = os.path.splitext(name)[1].lower()
+            if ext in files:
+                files[ext].append(os.path.abspath(os.path.join(root, name)))
+
+    for ext, paths in files.items():
+        paths.sort()
+        if not paths:
+            continue
+        native_time, texts = time_serial(NATIVE[ext], paths)
+        errors = sum(text.startswith("Error:") for text in texts)
+        characters = sum(len(text) for text in texts)
+        pool_time = time_pool(NATIVE[ext], paths, args.workers)
+        print(f"{ext:<5} files={len(paths):<4} chars={characters:<9} errors={errors:<3} "
+              f"native={native_time:6.2f} s ({native_time / len(paths) * 1000:6.1f} ms/file)  "
+              f"pool[{args.workers}]={pool_time:6.2f} s")
+
+        if args.com:
+            com_time, com_segments = time_serial(COM[ext], paths)
+            recall = [word_recall(join_segments(segments), text) for segments, text in zip(com_segments, texts)]
+            print(f"      com={com_time:6.2f} s ({com_time / len(paths) * 1000:6.1f} ms/file)  "
+                  f"speedup={com_time / native_time:6.1f}x  "
+                  f"word recall vs COM: mean={sum(recall) / len(recall):.3f} min={min(recall):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# Benchmark: pooled keep-alive LLM client vs a fresh client per request.
+# Run from 4-SourceCode/Python_Files_Extraction:
+#   python benchmarks/bench_llm_pool.py --concurrency 100 --rounds 5
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_llm_server import MockLLMServer
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def report(label, latencies, wall, stats):
+    print(
+        f"{label:<28} calls={len(latencies):<5} connections={stats['connections']:<5} "
+        f"p50={percentile(latencies, 50) * 1000:7.1f} ms  p99={percentile(latencies, 99) * 1000:7.1f} ms  "
+        f"wall={wall:6.2f} s"
+    )
+
+
+async def timed(coro, latencies):
+    start = time.perf_counter()
+    result = await coro
+    latencies.append(time.perf_counter() - start)
+    return result
+
+
+async def bench_chunk_calls(server, concurrency, rounds):
+    import httpx
+    import content_creation_json
+    from llm_clients import close_llm_clients
+
+    # Old behaviour: a new client (new TCP connection) for every chunk call
+    server.reset_stats()
+    latencies = []
+    start = time.perf_counter()
+
+    async def fresh_client_call():
+        async with httpx.AsyncClient() as client:
+            return await content_creation_json.get_mcq_questions(client, "sample chunk")
+
+    for _ in range(rounds):
+        await asyncio.gather(*(timed(fresh_client_call(), latencies) for _ in range(concurrency)))
+    report("chunk calls, fresh client", latencies, time.perf_counter() - start, server.stats())
+
+    # New behaviour: the shared pooled client
+    server.reset_stats()
+    latencies = []
+    start = time.perf_counter()
+    client = content_creation_json.get_openrouter_client()
+    for _ in range(rounds):
+        await asyncio.gather(*(
+            timed(content_creation_json.get_mcq_questions(client, "sample chunk"), latencies)
+            for _ in range(concurrency)
+        ))
+    report("chunk calls, pooled client", latencies, time.perf_counter() - start, server.stats())
+    await close_llm_clients()
+
+
+def build_upload() -> bytes:
+    from docx import Document
+
+    doc = Document()
+    for i in range(12):
+        doc.add_paragraph(
+            f"Paragraph {i}: Data mining extracts useful knowledge from large datasets "
+            "using classification, clustering, regression and association rules."
+        )
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+async def bench_generate_quiz(server, concurrency, rounds):
+    import httpx
+    import APIFile
+
+    upload = build_upload()
+    server.reset_stats()
+    latencies = []
+    transport = httpx.ASGITransport(app=APIFile.app)
+
+    async with APIFile.lifespan(APIFile.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://api", timeout=None) as api:
+            async def call():
+                files = {"file": ("lecture.docx", upload)}
+                resp = await api.post("/generate_quiz", params={"quiz_type": "mcq"}, files=files)
+                resp.raise_for_status()
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                await asyncio.gather(*(timed(call(), latencies) for _ in range(concurrency)))
+            wall = time.perf_counter() - start
+
+    stats = server.stats()
+    report("/generate_quiz, pooled", latencies, wall, stats)
+    print(f"{'':<28} LLM requests={stats['requests']} over {stats['connections']} connections")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="mock completion latency in seconds")
+    args = parser.parse_args()
+
+    with MockLLMServer(latency=args.latency) as server:
+        # Point both backends at the mock before the app modules are imported
+        os.environ["OPENROUTER_BASE_URL"] = server.base_url
+        os.environ["LM_STUDIO_URL"] = f"{server.base_url}/chat/completions"
+
+        asyncio.run(bench_chunk_calls(server, args.concurrency, args.rounds))
+        asyncio.run(bench_generate_quiz(server, args.concurrency, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
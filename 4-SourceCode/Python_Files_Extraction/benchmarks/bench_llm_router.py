@@ -0,0 +1,155 @@
+# Benchmark: the LLM router (llm_router.py) against several local mock backends.
+# Scenarios, each on fresh mock servers:
+#   outage     one backend goes down mid-run: single backend vs a routed pool
+#   weighting  fast / medium / slow backends: where the requests go
+#   hedging    5% of calls stall: p50 / p99 with and without hedged requests
+#   breaker    a backend that always errors: calls it still receives
+#   cap        max_concurrency=4 on a backend: peak in-flight seen by the server
+# Run from 4-SourceCode/Python_Files_Extraction:
+#   python benchmarks/bench_llm_router.py [--requests 400] [--concurrency 20]
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_llm_server import MockLLMServer
+from llm_clients import close_llm_clients
+from llm_router import Backend, CircuitBreaker, LLMRouter, LLMUnavailable
+
+PAYLOAD = {"model": "local-model", "messages": [{"role": "user", "content": "Generate MCQs."}], "max_tokens": 200}
+
+
+def make_backend(name, server, **options):
+    return Backend(name, server.base_url, **options)
+
+
+async def run_load(router, requests, concurrency, during=None):
+    """Send `requests` completions, `concurrency` at a time -> (latencies of successes, failures)."""
+    latencies, failures = [], 0
+    queue = iter(range(requests))
+
+    async def worker():
+        nonlocal failures
+        for number in queue:
+            if during is not None:
+                during(number)
+            start = time.perf_counter()
+            try:
+                await router.chat_completion(PAYLOAD)
+                latencies.append(time.perf_counter() - start)
+            except LLMUnavailable:
+                failures += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return sorted(latencies), failures
+
+
+def percentile(latencies, share):
+    return latencies[min(len(latencies) - 1, int(share * len(latencies)))] if latencies else float("nan")
+
+
+def report(label, latencies, failures, extra=""):
+    print(f"  {label:<26} ok={len(latencies):<5} failed={failures:<5} "
+          f"p50={percentile(latencies, 0.5) * 1000:7.1f} ms  p99={percentile(latencies, 0.99) * 1000:7.1f} ms  {extra}")
+
+
+def served(servers):
+    return " ".join(f"{name}={server.stats()['requests']}" for name, server in servers.items())
+
+
+# ---------------- SCENARIOS ---------------- #
+async def outage(requests, concurrency):
+    print("outage: backend 'a' goes down after 25% of the requests")
+    for label, pool in (("single backend", ["a"]), ("routed pool (a, b, c)", ["a", "b", "c"])):
+        servers = {name: MockLLMServer(latency=0.05, jitter=0.02).start() for name in pool}
+        router = LLMRouter("outage", [make_backend(name, server) for name, server in servers.items()], hedge=False)
+        fail_at = requests // 4
+        latencies, failures = await run_load(
+            router, requests, concurrency, during=lambda n: n == fail_at and servers["a"].set_down())
+        report(label, latencies, failures, served(servers))
+        await close_llm_clients()
+        for server in servers.values():
+            server.stop()
+
+
+async def weighting(requests, concurrency):
+    print("weighting: backends at 20 / 80 / 300 ms")
+    servers = {
+        "fast": MockLLMServer(latency=0.02),
+        "medium": MockLLMServer(latency=0.08),
+        "slow": MockLLMServer(latency=0.3),
+    }
+    for server in servers.values():
+        server.start()
+    router = LLMRouter("weighting", [make_backend(name, server) for name, server in servers.items()], hedge=False)
+    latencies, failures = await run_load(router, requests, concurrency)
+    report("latency-weighted", latencies, failures, served(servers))
+    await close_llm_clients()
+    for server in servers.values():
+        server.stop()
+
+
+async def hedging(requests, concurrency):
+    print("hedging: 5% of calls on every backend stall for 1.5 s")
+    for hedge in (False, True):
+        servers = {name: MockLLMServer(latency=0.05, jitter=0.02, slow_rate=0.05, slow_latency=1.5).start() for name in "ab"}
+        backends = [make_backend(name, server) for name, server in servers.items()]
+        router = LLMRouter("hedging", backends, hedge=hedge, hedge_min=0.2)
+        latencies, failures = await run_load(router, requests, concurrency)
+        report("hedged" if hedge else "not hedged", latencies, failures,
+               f"hedges={router.metrics['hedged']} calls={sum(s.stats()['requests'] for s in servers.values())}")
+        await close_llm_clients()
+        for server in servers.values():
+            server.stop()
+
+
+async def breaker(requests, concurrency):
+    print("breaker: backend 'bad' answers every call with an error")
+    for label, threshold in (("no circuit breaker", 10 ** 9), ("circuit breaker (5 failures)", 5)):
+        servers = {"good": MockLLMServer(latency=0.05).start(), "bad": MockLLMServer(latency=0.05, failure_rate=1.0).start()}
+        backends = [make_backend(name, server, breaker=CircuitBreaker(failures=threshold, cooldown=60))
+                    for name, server in servers.items()]
+        router = LLMRouter("breaker", backends, hedge=False)
+        start = time.perf_counter()
+        latencies, failures = await run_load(router, requests, concurrency)
+        report(label, latencies, failures,
+               f"{served(servers)} failovers={router.metrics['failovers']} wall={time.perf_counter() - start:5.2f} s")
+        await close_llm_clients()
+        for server in servers.values():
+            server.stop()
+
+
+async def cap(requests, concurrency):
+    print("cap: backend 'small' takes at most 4 calls at a time, 'big' is uncapped")
+    servers = {"small": MockLLMServer(latency=0.05).start(), "big": MockLLMServer(latency=0.1).start()}
+    router = LLMRouter("cap", [
+        make_backend("small", servers["small"], max_concurrency=4),
+        make_backend("big", servers["big"]),
+    ], hedge=False)
+    latencies, failures = await run_load(router, requests, concurrency)
+    peaks = " ".join(f"{name} peak={server.stats()['max_in_flight']}" for name, server in servers.items())
+    report("capped", latencies, failures, f"{served(servers)} {peaks}")
+    await close_llm_clients()
+    for server in servers.values():
+        server.stop()
+
+
+SCENARIOS = {"outage": outage, "weighting": weighting, "hedging": hedging, "breaker": breaker, "cap": cap}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    args = parser.parse_args()
+    for name in args.scenarios:
+        asyncio.run(SCENARIOS[name](args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Benchmark: tokens sent to the LLM with and without text_normalizer.
+# Extracts every document of the corpus (or reads an ingest.py store), chunks
+# it raw and normalized, and reports per document the prompt tokens, chunks
+# (= completions) and the time the normalization took, then corpus totals.
+# Token counts use CHUNK_TOKENIZER (approximate when tiktoken is missing).
+# Run from 4-SourceCode/Python_Files_Extraction:
+#   python benchmarks/bench_normalize.py [--corpus ../../8-CollectedData | --store .cache/corpus] [--limit 0] [--top 0]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_batching import DEFAULT_CORPUS
+
+
+def corpus_documents(corpus: str):
+    from Extractors.content_extractor_all import extract_file_segments
+
+    for root, _, names in sorted(os.walk(corpus)):
+        for name in sorted(names):
+            if name.lower().endswith((".pdf", ".pptx", ".docx", ".ppt", ".doc")):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, corpus), extract_file_segments(path, name)
+
+
+def store_documents(store: str):
+    from ingest import read_store, record_segments
+
+    for path, record in read_store(store):
+        yield path, record_segments(record)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--store", help="read an ingest.py store instead of extracting the corpus")
+    parser.add_argument("--limit", type=int, default=0, help="documents to use (0 = all)")
+    parser.add_argument("--top", type=int, default=0, help="only list the N documents with the largest reduction (0 = all)")
+    args = parser.parse_args()
+
+    from chunker import chunk_segments, get_token_counter
+    from text_normalizer import normalize_segments
+    count_tokens = get_token_counter()
+
+    rows = []
+    documents = store_documents(args.store) if args.store else corpus_documents(args.corpus)
+    for path, segments in documents:
+        if any(segment.kind == "error" for segment in segments):
+            continue
+        raw = list(chunk_segments(segments))
+        if not raw:
+            continue
+        start = time.perf_counter()
+        normalized = normalize_segments(segments)
+        took = time.perf_counter() - start
+        clean = list(chunk_segments(normalized))
+        rows.append((path, sum(map(count_tokens, raw)), sum(map(count_tokens, clean)), len(raw), len(clean), took))
+        if args.limit and len(rows) >= args.limit:
+            break
+
+    listed = sorted(rows, key=lambda row: row[2] / row[1])
+    print(f"{'tokens':>8} {'->':>8} {'saved':>6} {'chunks':>7} {'->':>4} {'ms':>6}  document")
+    for path, before, after, chunks_before, chunks_after, took in listed[:args.top or None]:
+        print(f"{before:8d} {after:8d} {1 - after / before:6.1%} {chunks_before:7d} {chunks_after:4d} {took * 1000:6.1f}  {path}")
+
+    before, after = sum(row[1] for row in rows), sum(row[2] for row in rows)
+    chunks_before, chunks_after = sum(row[3] for row in rows), sum(row[4] for row in rows)
+    took = sum(row[5] for row in rows)
+    reductions = sorted(1 - row[2] / row[1] for row in rows)
+    print(f"\n{len(rows)} documents: {before} -> {after} tokens ({1 - after / before:.1%} fewer), "
+          f"{chunks_before} -> {chunks_after} chunks, median per document {reductions[len(reductions) // 2]:.1%}, "
+          f"normalization {took:.2f} s ({took / len(rows) * 1000:.1f} ms/document)")
+
+
+if __name__ == "__main__":
+    main()
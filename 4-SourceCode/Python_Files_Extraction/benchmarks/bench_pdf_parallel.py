@@ -0,0 +1,71 @@
+# Benchmark: serial vs page-parallel PDF extraction on a large textbook-sized PDF.
+# Builds a --pages page PDF by concatenating corpus PDFs (or use --pdf for a real one).
+# Run from 4-SourceCode/Python_Files_Extraction:
+#   python benchmarks/bench_pdf_parallel.py --pages 500 --workers 8
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from Extractors.pdf_extractor import extract_segments_from_pdf, extract_segments_from_pdf_parallel
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "8-CollectedData")
+
+
+def build_pdf(corpus: str, pages: int) -> str:
+    sources = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(corpus)
+        for name in names
+        if name.lower().endswith(".pdf")
+    )
+    out = fitz.open()
+    while out.page_count < pages and sources:
+        for path in sources:
+            try:
+                with fitz.open(path) as src:
+                    out.insert_pdf(src, to_page=min(src.page_count, pages - out.page_count) - 1)
+            except Exception:
+                continue
+            if out.page_count >= pages:
+                break
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    out.save(path)
+    out.close()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--pdf", help="use an existing PDF instead of building one")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    path = args.pdf or build_pdf(args.corpus, args.pages)
+    try:
+        start = time.perf_counter()
+        serial = extract_segments_from_pdf(path)
+        serial_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parallel = extract_segments_from_pdf_parallel(path, args.workers)
+        parallel_time = time.perf_counter() - start
+
+        same = [s.text for s in serial] == [s.text for s in parallel]
+        print(f"pages={len(serial)} workers={args.workers} identical={same}")
+        print(f"serial   {serial_time:6.2f} s")
+        print(f"parallel {parallel_time:6.2f} s  ({serial_time / parallel_time:.2f}x, includes worker start-up)")
+    finally:
+        if not args.pdf:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Benchmark: every chunk of every document vs a planned question budget.
+# For each document, generates MCQs from all chunks (the old behaviour) and
+# then with ?count=N (question_planner.py), and reports LLM calls, prompt
+# tokens and questions returned against the mock server.
+# Run from 4-SourceCode/Python_Files_Extraction:
+#   python benchmarks/bench_question_budget.py [--limit 40] [--counts 10 20 50]
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_llm_server import MockLLMServer
+from bench_batching import DEFAULT_CORPUS, load_documents
+
+
+async def bench(documents, counts):
+    import content_creation_json
+    from llm_clients import close_llm_clients
+
+    usage = content_creation_json.llm_usage
+    for count in [None] + counts:
+        before = dict(usage)
+        questions = exact = 0
+        start = time.perf_counter()
+        for name, chunks in documents:
+            result = await content_creation_json.generate_quiz_from_chunks(name, chunks, "mcq", use_cache=False, count=count)
+            questions += len(result["questions"])
+            exact += count is not None and len(result["questions"]) == count
+        label = "all chunks" if count is None else f"count={count}"
+        print(
+            f"{label:<10} calls={usage['calls'] - before['calls']:<6} "
+            f"prompt tokens={usage['prompt_tokens'] - before['prompt_tokens']:<9} "
+            f"questions={questions:<6} "
+            + (f"exact={exact}/{len(documents)} " if count is not None else "")
+            + f"wall={time.perf_counter() - start:6.2f} s"
+        )
+
+    await close_llm_clients()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--limit", type=int, default=40, help="documents to use (0 = all)")
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 20, 50])
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    documents = load_documents(args.corpus, args.limit)
+    print(f"{len(documents)} documents, {sum(len(chunks) for _, chunks in documents)} chunks")
+
+    from content_creation_json import QUESTIONS_PER_CHUNK
+    with MockLLMServer(latency=args.latency, questions=QUESTIONS_PER_CHUNK) as server:
+        import content_creation_json
+        content_creation_json.BASE_URL = content_creation_json.openrouter_backend.base_url = server.base_url
+        asyncio.run(bench(documents, args.counts))
+
+
+if __name__ == "__main__":
+    main()
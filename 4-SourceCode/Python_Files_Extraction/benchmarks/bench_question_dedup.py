@@ -0,0 +1,172 @@
+# Benchmark: near-duplicate removal with MinHash + LSH on 10k generated questions.
+# Builds unique English and Arabic questions, adds the kinds of repeats
+# overlapping chunks and repeated slides produce (case, punctuation, Arabic
+# diacritics and letter variants, reordered options, one changed word), then
+# compares exact-string dedup, brute-force pairwise Jaccard and question_dedup.
+# Run from 4-SourceCode/Python_Files_Extraction:
+#   python benchmarks/bench_question_dedup.py [--questions 10000] [--brute-force 2000]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from question_dedup import (
+    DEDUP_SHINGLE, DEDUP_THRESHOLD, duplicate_positions, question_quality, question_signature_text
+)
+
+ENGLISH = "abcdefghijklmnopqrstuvwxyz"
+ARABIC = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+DIACRITICS = "َُِّْ"
+ALEF_VARIANTS = {"ا": "أ", "ي": "ى", "ه": "ة"}
+
+
+# ---------------- SYNTHETIC QUESTIONS ---------------- #
+def make_vocabulary(rng, alphabet, size=3000):
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(3, 9))) for _ in range(size)]
+
+
+def make_base(rng, words, arabic):
+    stem = " ".join(rng.choice(words) for _ in range(rng.randint(7, 12)))
+    mark = "؟" if arabic else "?"
+    if rng.random() < 0.5:
+        return {"question": stem + mark, "answer": rng.choice(["True", "False"])}
+    options = [f"{letter}) {rng.choice(words)} {rng.choice(words)}" for letter in "ABCD"]
+    return {"question": stem + mark, "options": options, "answer": rng.choice(options)}
+
+
+def make_variant(rng, base, words, arabic):
+    variant = dict(base)
+    text = base["question"]
+    change = rng.choice(["case", "punctuation", "marks", "options", "word"])
+    if change == "case":
+        text = text.upper() if not arabic else text.replace(" ", "  ")
+    elif change == "punctuation":
+        text = text.rstrip("?؟") + " ."
+    elif change == "marks" and arabic:
+        text = "".join(c + rng.choice(DIACRITICS) if rng.random() < 0.3 else ALEF_VARIANTS.get(c, c) for c in text)
+    elif change == "options" and "options" in base:
+        # Same question, options reordered and the letters dropped (fewer options: worse-formed)
+        options = [option[3:] for option in base["options"]][:3]
+        rng.shuffle(options)
+        variant["options"] = options
+        variant["answer"] = base["answer"][3:]
+    else:
+        tokens = text.split()
+        tokens[rng.randrange(len(tokens))] = rng.choice(words)
+        text = " ".join(tokens)
+    variant["question"] = text
+    return variant
+
+
+def make_dataset(count, rng):
+    english, arabic = make_vocabulary(rng, ENGLISH), make_vocabulary(rng, ARABIC)
+    questions, groups = [], []
+    group = 0
+    while len(questions) < count:
+        is_arabic = rng.random() < 0.5
+        words = arabic if is_arabic else english
+        base = make_base(rng, words, is_arabic)
+        for item in [base] + [make_variant(rng, base, words, is_arabic) for _ in range(rng.choice([0, 0, 1, 2, 3]))]:
+            questions.append(item)
+            groups.append(group)
+        group += 1
+    return questions[:count], groups[:count]
+
+
+# ---------------- BASELINES ---------------- #
+def exact_duplicates(questions):
+    seen, dropped = set(), set()
+    for i, question in enumerate(questions):
+        key = (question["question"], question["answer"])
+        if key in seen:
+            dropped.add(i)
+        seen.add(key)
+    return dropped
+
+
+def brute_force_duplicates(questions):
+    """Every pair compared on exact shingle Jaccard: the O(n^2) reference."""
+    texts = [question_signature_text(q) for q in questions]
+    sets = [{t[i:i + DEDUP_SHINGLE] for i in range(max(1, len(t) - DEDUP_SHINGLE + 1))} for t in texts]
+    dropped = set()
+    for i in range(len(sets)):
+        if i in dropped:
+            continue
+        for j in range(i + 1, len(sets)):
+            if j not in dropped and len(sets[i] & sets[j]) / len(sets[i] | sets[j]) >= DEDUP_THRESHOLD:
+                dropped.add(j)
+    return dropped
+
+
+def score(dropped, groups):
+    """Removed duplicates / all duplicates, and wrongly removed uniques."""
+    duplicates = len(groups) - len(set(groups))
+    kept_groups = {groups[i] for i in range(len(groups)) if i not in dropped}
+    lost_groups = len(set(groups)) - len(kept_groups)
+    return len(dropped) - lost_groups, duplicates, lost_groups
+
+
+def best_kept(questions, groups, dropped):
+    """Share of duplicate groups whose surviving question is one of the best-formed members."""
+    members = {}
+    for i, group in enumerate(groups):
+        members.setdefault(group, []).append(i)
+    checked = best = 0
+    for indexes in members.values():
+        kept = [i for i in indexes if i not in dropped]
+        if len(indexes) < 2 or len(kept) != 1:
+            continue
+        checked += 1
+        best += question_quality(questions[kept[0]]) == max(question_quality(questions[i]) for i in indexes)
+    return best / max(checked, 1)
+
+
+def report(label, dropped, groups, seconds):
+    removed, duplicates, lost = score(dropped, groups)
+    print(f"{label:<22} removed={len(dropped):<6} duplicates caught={removed / max(duplicates, 1):6.1%} "
+          f"questions lost={lost:<4} time={seconds * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=10000)
+    parser.add_argument("--brute-force", type=int, default=2000, help="subset size for the O(n^2) reference")
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    questions, groups = make_dataset(args.questions, rng)
+    print(f"{len(questions)} questions, {len(questions) - len(set(groups))} near-duplicates")
+
+    start = time.perf_counter()
+    dropped = exact_duplicates(questions)
+    report("exact string", dropped, groups, time.perf_counter() - start)
+
+    duplicate_positions(questions[:100])  # warm up numpy
+    start = time.perf_counter()
+    dropped = duplicate_positions(questions)
+    report("minhash + lsh", dropped, groups, time.perf_counter() - start)
+    print(f"{'':<22} best-formed variant kept in {best_kept(questions, groups, dropped):.1%} of duplicate groups")
+
+    subset, subset_groups = questions[:args.brute_force], groups[:args.brute_force]
+    start = time.perf_counter()
+    dropped = brute_force_duplicates(subset)
+    brute_seconds = time.perf_counter() - start
+    report(f"brute force ({len(subset)})", dropped, subset_groups, brute_seconds)
+    start = time.perf_counter()
+    dropped = duplicate_positions(subset)
+    report(f"minhash + lsh ({len(subset)})", dropped, subset_groups, time.perf_counter() - start)
+    print(f"brute force extrapolated to {len(questions)}: {brute_seconds * (len(questions) / len(subset)) ** 2:.1f} s")
+
+    print("scaling:")
+    for size in (1000, 5000, 10000, 20000):
+        sample, _ = make_dataset(size, random.Random(size))
+        start = time.perf_counter()
+        duplicate_positions(sample)
+        print(f"  {size:>6} questions  {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
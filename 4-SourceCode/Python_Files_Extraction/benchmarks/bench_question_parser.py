@@ -0,0 +1,90 @@
+# Benchmark: old regex cleanup + json.loads vs the tolerant single-pass parser.
+# Builds synthetic completions in the shapes models actually return (clean,
+# fenced, prose-wrapped, wrapper object, trailing commas, truncated) and
+# reports questions recovered and parse time for each.
+# Run from 4-SourceCode/Python_Files_Extraction:
+#   python benchmarks/bench_question_parser.py [--outputs 2000] [--questions 8]
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from question_parser import parse_questions
+
+
+# ---------------- PREVIOUS IMPLEMENTATION ---------------- #
+def clean_json_like_text(text: str) -> str:
+    text = re.sub(r"```json|```", "", text).strip()
+    text = re.sub(r",\s*([}\]])", r"\1", text)
+    return text
+
+
+def old_parse(raw):
+    try:
+        parsed = json.loads(clean_json_like_text(raw))
+    except Exception:
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+# ---------------- SYNTHETIC OUTPUTS ---------------- #
+def make_questions(count, rng):
+    return [
+        {
+            "question": f"Question {i}: which statement about topic {rng.randint(1, 999)} is correct?",
+            "options": [f"{letter}) option {letter} of {i}" for letter in "ABCD"],
+            "answer": f"{rng.choice('ABCD')}) option",
+        }
+        for i in range(count)
+    ]
+
+
+def fix_answers(questions):
+    for q in questions:
+        q["answer"] = next(o for o in q["options"] if o.startswith(q["answer"][0]))
+    return questions
+
+
+SHAPES = {
+    "clean": lambda text, body: text,
+    "fenced": lambda text, body: f"```json\n{text}\n```",
+    "prose": lambda text, body: f"Sure! Here are the questions you asked for:\n{text}\nLet me know if you need more.",
+    "wrapper": lambda text, body: json.dumps({"file_name": "lecture.pdf", "questions": body}),
+    "trailing_commas": lambda text, body: text.replace("}", ",}").replace("]", ",]"),
+    "truncated": lambda text, body: text[: int(len(text) * 0.8)],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--outputs", type=int, default=2000, help="completions per shape")
+    parser.add_argument("--questions", type=int, default=8, help="questions per completion")
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    for shape, render in SHAPES.items():
+        outputs = []
+        for _ in range(args.outputs):
+            body = fix_answers(make_questions(args.questions, rng))
+            outputs.append(render(json.dumps(body, ensure_ascii=False), body))
+        total = args.outputs * args.questions
+
+        start = time.perf_counter()
+        old_count = sum(len(old_parse(raw)) for raw in outputs)
+        old_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        new_count = sum(len(parse_questions(raw, "mcq")[0]) for raw in outputs)
+        new_time = time.perf_counter() - start
+
+        print(f"{shape:<16} recovered old={old_count / total:6.1%} new={new_count / total:6.1%}  "
+              f"old={old_time / args.outputs * 1e6:7.1f} us/output  new={new_time / args.outputs * 1e6:7.1f} us/output")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# Benchmark: chunk calls under provider throttling, with and without retries.
+# The mock server allows --rate requests per second (429 + Retry-After beyond
+# that) and fails --failure-rate of the rest with a 5xx error body. Every
+# document of the corpus is generated three ways:
+#   no retries        one pass over the pool, like before: failed chunks give []
+#   immediate retry   four passes, no backoff, Retry-After ignored
+#   backoff           jittered exponential backoff that honours Retry-After
+# and reports chunks that succeeded, questions, requests sent, 429s received
+# and useful questions per billed completion. Chunks that failed without
+# retries are then recovered by the background requeue into the quiz cache.
+# Run from 4-SourceCode/Python_Files_Extraction:
+#   python benchmarks/bench_retry.py [--limit 10] [--rate 20] [--failure-rate 0.05]
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_llm_server import MockLLMServer
+from bench_batching import DEFAULT_CORPUS, load_documents
+
+
+async def generate_all(documents, use_cache):
+    import content_creation_json
+
+    totals = {"chunks": 0, "succeeded": 0, "requeued": 0, "questions": 0}
+    await asyncio.gather(*(
+        count_into(totals, content_creation_json.generate_quiz_from_chunks(name, chunks, "mcq", use_cache=use_cache))
+        for name, chunks in documents
+    ))
+    return totals
+
+
+async def count_into(totals, generation):
+    result = await generation
+    totals["chunks"] += result["chunks"]["total"]
+    totals["succeeded"] += result["chunks"]["succeeded"]
+    totals["requeued"] += result["chunks"]["requeued"]
+    totals["questions"] += len(result["questions"])
+
+
+async def bench(server, documents, deadline):
+    import llm_router
+    import content_creation_json
+    from chunk_requeue import chunk_requeue
+    from llm_clients import close_llm_clients
+    from llm_router import RetryPolicy
+
+    router = content_creation_json.quiz_router
+    content_creation_json.QUIZ_DOCUMENT_DEADLINE = deadline
+    retry_after_max = llm_router.LLM_RETRY_AFTER_MAX_SECONDS
+    usage = content_creation_json.llm_usage
+
+    scenarios = (
+        ("no retries", RetryPolicy(attempts=1), retry_after_max),
+        ("immediate retry", RetryPolicy(attempts=4, base=0), 0),
+        ("backoff", RetryPolicy(), retry_after_max),
+    )
+    for label, policy, honour_retry_after in scenarios:
+        router.retry = policy
+        llm_router.LLM_RETRY_AFTER_MAX_SECONDS = honour_retry_after
+        for backend in router.backends:
+            backend.paused_until = 0.0
+            backend.breaker = llm_router.CircuitBreaker()
+        server.reset_stats()
+        billed = usage["calls"]
+        start = time.perf_counter()
+        totals = await generate_all(documents, use_cache=False)
+        wall = time.perf_counter() - start
+        stats = server.stats()
+        billed = usage["calls"] - billed
+        print(
+            f"{label:<16} chunks ok={totals['succeeded']}/{totals['chunks']:<5} questions={totals['questions']:<5} "
+            f"requests={stats['requests']:<5} 429s={stats['throttled']:<5} billed={billed:<5} "
+            f"questions/billed call={totals['questions'] / max(billed, 1):4.2f} wall={wall:6.2f} s"
+        )
+        if label == "no retries":
+            await recover_in_background(server, documents, chunk_requeue)
+    await close_llm_clients()
+
+
+async def recover_in_background(server, documents, chunk_requeue):
+    """Drain the requeue filled by the run without retries, then ask for the documents again."""
+    chunk_requeue.delay = 0.5
+    await chunk_requeue.start()
+    start = time.perf_counter()
+    while chunk_requeue.stats()["pending"]:
+        await asyncio.sleep(0.1)
+    await chunk_requeue.stop()
+    print(f"  requeue        {chunk_requeue.stats()} in {time.perf_counter() - start:5.2f} s")
+    server.reset_stats()
+    totals = await generate_all(documents, use_cache=True)
+    print(f"  cached rerun   chunks ok={totals['succeeded']}/{totals['chunks']} requests={server.stats()['requests']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--limit", type=int, default=10, help="documents to use (0 = all)")
+    parser.add_argument("--rate", type=float, default=20, help="requests per second the mock accepts")
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--deadline", type=float, default=60, help="per-document deadline in seconds")
+    args = parser.parse_args()
+
+    # A fresh quiz cache, so the cached rerun only sees what this run generated
+    os.environ["QUIZ_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "quiz.sqlite3")
+    documents = load_documents(args.corpus, args.limit)
+    print(f"{len(documents)} documents, {sum(len(chunks) for _, chunks in documents)} chunks")
+
+    from content_creation_json import QUESTIONS_PER_CHUNK
+    with MockLLMServer(latency=0.05, questions=QUESTIONS_PER_CHUNK, failure_rate=args.failure_rate,
+                       rate_limit=args.rate, rate_burst=int(args.rate)) as server:
+        import content_creation_json
+        content_creation_json.BASE_URL = content_creation_json.openrouter_backend.base_url = server.base_url
+        asyncio.run(bench(server, documents, args.deadline))
+
+
+if __name__ == "__main__":
+    main()
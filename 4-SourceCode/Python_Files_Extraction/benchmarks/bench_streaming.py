@@ -0,0 +1,72 @@
+# Benchmark: time-to-first-question with blocking completions vs stream=True.
+# The mock server writes `--questions` questions at `--token-delay` seconds per
+# token after `--latency` seconds, like a model generating its answer.
+# Run from 4-SourceCode/Python_Files_Extraction:
+#   python benchmarks/bench_streaming.py --calls 10 --questions 8 --token-delay 0.01
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_llm_server import MockLLMServer
+from bench_llm_pool import percentile
+
+
+def report(label, first, total, questions):
+    print(
+        f"{label:<10} questions/call={questions:<4} "
+        f"first question p50={percentile(first, 50) * 1000:7.1f} ms p99={percentile(first, 99) * 1000:7.1f} ms  "
+        f"all questions p50={percentile(total, 50) * 1000:7.1f} ms"
+    )
+
+
+async def bench(calls):
+    import content_creation_json
+    from llm_clients import close_llm_clients
+
+    client = content_creation_json.get_openrouter_client()
+    payload = content_creation_json.build_mcq_payload("Data mining extracts knowledge from data.")
+
+    async def blocking_call():
+        start = time.perf_counter()
+        questions = await content_creation_json.get_chunk_questions(client, payload)
+        # Nothing can be shown before the whole completion is parsed
+        elapsed = time.perf_counter() - start
+        return elapsed, elapsed, len(questions)
+
+    async def streaming_call():
+        start = time.perf_counter()
+        first, count = None, 0
+        async for _ in content_creation_json.stream_chunk_questions(client, payload):
+            count += 1
+            if first is None:
+                first = time.perf_counter() - start
+        return first, time.perf_counter() - start, count
+
+    for label, call in (("blocking", blocking_call), ("streaming", streaming_call)):
+        results = await asyncio.gather(*(call() for _ in range(calls)))
+        report(label, [r[0] for r in results], [r[1] for r in results], results[0][2])
+
+    await close_llm_clients()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--questions", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds to the first token")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds per generated token")
+    args = parser.parse_args()
+
+    with MockLLMServer(latency=args.latency, questions=args.questions, token_delay=args.token_delay) as server:
+        import content_creation_json
+        content_creation_json.BASE_URL = content_creation_json.openrouter_backend.base_url = server.base_url
+        asyncio.run(bench(args.calls))
+
+
+if __name__ == "__main__":
+    main()
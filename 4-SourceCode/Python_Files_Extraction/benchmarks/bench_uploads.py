@@ -0,0 +1,92 @@
+# Benchmark: peak RSS while receiving many large uploads concurrently.
+# Compares uploads.saved_upload (streamed, per-request temp file) with the old
+# `await file.read()` into memory. Each mode runs in its own process because
+# peak RSS is a process-wide high-water mark.
+# Run from 4-SourceCode/Python_Files_Extraction (Linux/macOS):
+#   python benchmarks/bench_uploads.py --uploads 50 --size-mb 100
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def build_app(mode: str):
+    from fastapi import FastAPI, File, UploadFile
+    from uploads import saved_upload
+
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        if mode == "streamed":
+            async with saved_upload(file, max_bytes=1 << 40) as saved:
+                return {"size": saved.size}
+        # Old behaviour: whole upload in RAM, then written to disk
+        content = await file.read()
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.remove(path)
+        return {"size": len(content)}
+
+    return app
+
+
+async def run_mode(mode: str, uploads: int, payload_path: str):
+    import httpx
+
+    app = build_app(mode)
+    baseline = peak_rss_mb()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api", timeout=None) as client:
+        async def send():
+            with open(payload_path, "rb") as f:
+                resp = await client.post("/upload", files={"file": ("big.pdf", f)})
+                resp.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send() for _ in range(uploads)))
+        wall = time.perf_counter() - start
+    print(f"{mode:<9} uploads={uploads:<4} wall={wall:6.1f} s  peak RSS={peak_rss_mb():8.1f} MB (start {baseline:.1f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=50)
+    parser.add_argument("--size-mb", type=int, default=100)
+    parser.add_argument("--mode", choices=["streamed", "buffered"])
+    parser.add_argument("--payload")
+    args = parser.parse_args()
+
+    if args.mode:
+        asyncio.run(run_mode(args.mode, args.uploads, args.payload))
+        return
+
+    fd, payload = tempfile.mkstemp(suffix=".bin")
+    with os.fdopen(fd, "wb") as f:
+        for _ in range(args.size_mb):
+            f.write(os.urandom(1024 * 1024))
+    try:
+        for mode in ("streamed", "buffered"):
+            subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--uploads", str(args.uploads), "--payload", payload],
+                check=True,
+            )
+    finally:
+        os.remove(payload)
+
+
+if __name__ == "__main__":
+    main()
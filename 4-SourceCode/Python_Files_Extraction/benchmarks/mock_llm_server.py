@@ -0,0 +1,235 @@
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+import uvicorn  # if this isn't working, run: pip install uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# ---------------- MOCK OPENAI-COMPATIBLE COMPLETION SERVER ---------------- #
+# Local stand-in for LM Studio / OpenRouter used by the benchmarks.
+# Every response is a fixed JSON array of `questions` questions. Without
+# streaming it arrives after `latency` + one `token_delay` per 4-character
+# token; with "stream": true the first token comes after `latency` and the
+# rest follow as SSE deltas, one every `token_delay` seconds. Batched prompts
+# ("### Chunk n (k questions)" sections) get k questions tagged "chunk": n per
+# section. True/False and mixed prompts get answers of that type (streamed
+# or not), "exactly n" prompts get n questions, and
+# "usage" is estimated from the prompt and answer lengths. A `slow_rate`
+# share of requests takes `slow_latency` instead (tail latency), and a server
+# set down with set_down(True) answers 503 to everything, /models included;
+# set_reject(400) refuses completions the way a provider rejects a bad request.
+# With `rate_limit` (requests per second, bursts of up to `rate_burst`) extra
+# requests get a 429 with a Retry-After header, like a throttling provider.
+
+MOCK_MCQ = [
+    {
+        "question": "What is the main goal of Data Mining?",
+        "options": [
+            "A) Extracting useful knowledge from data",
+            "B) Storing large datasets",
+            "C) Designing databases",
+            "D) Visualizing data only"
+        ],
+        "answer": "A) Extracting useful knowledge from data"
+    }
+]
+
+
+MOCK_TF = {"question": "Clustering groups data without predefined labels.", "answer": "True"}
+
+
+_topics = random.Random(0)
+_topics_lock = threading.Lock()
+
+
+def mock_topic() -> str:
+    """A few made-up words, so questions from different calls are not near-duplicates."""
+    with _topics_lock:
+        return " ".join("".join(_topics.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(7)) for _ in range(3))
+
+
+def mock_questions(count: int, kind: str = "mcq") -> list:
+    questions = []
+    for i in range(count):
+        # Mixed prompts get MCQ and True/False alternately
+        template = MOCK_TF if kind == "tf" or (kind == "mixed" and i % 2) else MOCK_MCQ[0]
+        questions.append(dict(template, question=f"{template['question']} ({mock_topic()})"))
+    return questions
+
+
+def prompt_kind(prompt: str) -> str:
+    """Which question type the prompt asks for: "mcq", "tf" or "mixed"."""
+    if "MCQ and True/False" in prompt or "Multiple Choice Questions and" in prompt:
+        return "mixed"
+    if "True/False objects" in prompt or "True or False Questions" in prompt:
+        return "tf"
+    return "mcq"
+
+
+# Batched prompts head each chunk with "### Chunk 3 (4 questions)"
+BATCH_CHUNK = re.compile(r"^### Chunk (\d+) \((\d+) questions\)", re.MULTILINE)
+
+
+EXACT_COUNT = re.compile(r"\bexactly (\d+) ")
+
+
+def batch_questions(prompt: str) -> list | None:
+    """Questions attributed to each chunk of a batched prompt, or None for a single-chunk prompt."""
+    quotas = BATCH_CHUNK.findall(prompt)
+    if not quotas:
+        return None
+    kind = prompt_kind(prompt)
+    return [dict(question, chunk=int(number))
+            for number, quota in quotas for question in mock_questions(int(quota), kind)]
+
+
+def token_count(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def create_mock_app(latency: float = 0.05, jitter: float = 0.0, failure_rate: float = 0.0,
+                    questions: int = 1, token_delay: float = 0.0,
+                    slow_rate: float = 0.0, slow_latency: float = 1.0,
+                    rate_limit: float = 0.0, rate_burst: int = 1):
+    app = FastAPI()
+    # The plain answer; prompts that name a type or count get their own (see below)
+    content = json.dumps(MOCK_MCQ if questions == 1 else mock_questions(questions))
+    app.state.stats = {"requests": 0, "connections": set(), "in_flight": 0, "max_in_flight": 0}
+    app.state.down = False
+    app.state.reject = None
+    app.state.bucket = {"tokens": float(rate_burst), "updated": time.monotonic()}
+
+    @app.post("/chat/completions")
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        stats = app.state.stats
+        stats["requests"] += 1
+        # Each (host, port) pair is one TCP connection from the client
+        stats["connections"].add(tuple(request.scope["client"]))
+        if app.state.down:
+            return JSONResponse({"error": {"message": "mock server down", "code": 503}}, status_code=503)
+        if app.state.reject:
+            return JSONResponse({"error": {"message": "request rejected", "code": app.state.reject}}, status_code=app.state.reject)
+        payload = await request.json()
+        if rate_limit:
+            bucket = app.state.bucket
+            now = time.monotonic()
+            bucket["tokens"] = min(rate_burst, bucket["tokens"] + (now - bucket["updated"]) * rate_limit)
+            bucket["updated"] = now
+            if bucket["tokens"] < 1:
+                stats["throttled"] = stats.get("throttled", 0) + 1
+                retry_after = math.ceil((1 - bucket["tokens"]) / rate_limit)
+                return JSONResponse({"error": {"message": "rate limited", "code": 429}}, status_code=429,
+                                    headers={"Retry-After": str(retry_after)})
+            bucket["tokens"] -= 1
+
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            slow = slow_rate and random.random() < slow_rate
+            await asyncio.sleep(slow_latency if slow else latency + random.uniform(0, jitter))
+        finally:
+            stats["in_flight"] -= 1
+        if failure_rate and random.random() < failure_rate:
+            return {"error": {"message": "mock failure", "code": 500}}
+
+        prompt = "\n".join(str(message.get("content", "")) for message in payload.get("messages", []))
+        batched = batch_questions(prompt)
+        # "exactly 3 ..." prompts (the question planner) get that many questions
+        exact = sum(int(count) for count in EXACT_COUNT.findall(prompt))
+        if batched is not None:
+            answer = json.dumps(batched)
+        elif exact or prompt_kind(prompt) != "mcq":
+            answer = json.dumps(mock_questions(exact or questions, prompt_kind(prompt)))
+        else:
+            answer = content
+
+        if payload.get("stream"):
+            async def events():
+                for i in range(0, len(answer), 4):
+                    delta = {"choices": [{"delta": {"content": answer[i:i + 4]}}]}
+                    yield f"data: {json.dumps(delta)}\n\n"
+                    await asyncio.sleep(token_delay)
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+        completion_tokens = token_count(answer)
+        await asyncio.sleep(token_delay * completion_tokens)
+        return {
+            "choices": [{"message": {"role": "assistant", "content": answer}}],
+            "usage": {"prompt_tokens": token_count(prompt), "completion_tokens": completion_tokens}
+        }
+
+    @app.get("/models")
+    @app.get("/v1/models")
+    async def models():
+        if app.state.down:
+            return JSONResponse({"error": {"message": "mock server down"}}, status_code=503)
+        return {"data": [{"id": "local-model"}]}
+
+    @app.get("/_stats")
+    async def mock_stats():
+        stats = app.state.stats
+        return {"requests": stats["requests"], "connections": len(stats["connections"])}
+
+    return app
+
+
+class MockLLMServer:
+    """Runs the mock app with uvicorn on a background thread."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **app_options):
+        self.app = create_mock_app(**app_options)
+        config = uvicorn.Config(
+            self.app, host=host, port=port,
+            log_level="warning", access_log=False, timeout_keep_alive=75
+        )
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.host = host
+
+    def start(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        self.port = self.server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def reset_stats(self):
+        self.app.state.stats = {"requests": 0, "connections": set(), "in_flight": 0, "max_in_flight": 0}
+
+    def set_down(self, down: bool = True):
+        self.app.state.down = down
+
+    def set_reject(self, status: int | None):
+        """Answer every completion with this 4xx (a request the backend refuses); None to stop."""
+        self.app.state.reject = status
+
+    def stats(self) -> dict:
+        stats = self.app.state.stats
+        return {
+            "requests": stats["requests"], "connections": len(stats["connections"]),
+            "max_in_flight": stats["max_in_flight"], "throttled": stats.get("throttled", 0),
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    # python benchmarks/mock_llm_server.py  ->  http://127.0.0.1:1234/v1/chat/completions
+    uvicorn.run(create_mock_app(), host="127.0.0.1", port=1234)
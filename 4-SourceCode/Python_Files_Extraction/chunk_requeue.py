@@ -0,0 +1,107 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+
+# ---------------- CONFIG ---------------- #
+# Chunks whose LLM calls still fail when their document's deadline comes are
+# handed to this queue and tried again in the background, after the response
+# has gone out. Whatever they produce lands in the quiz cache, so asking for
+# the same document again returns the full quiz without paying for the
+# chunks that had already worked.
+REQUEUE_DELAY_SECONDS = float(os.getenv("REQUEUE_DELAY_SECONDS", "30"))
+# Each later round waits twice as long as the one before
+REQUEUE_ROUNDS = int(os.getenv("REQUEUE_ROUNDS", "3"))
+REQUEUE_CONCURRENCY = int(os.getenv("REQUEUE_CONCURRENCY", "4"))
+REQUEUE_MAX_PENDING = int(os.getenv("REQUEUE_MAX_PENDING", "1000"))
+
+
+class ChunkRequeue:
+    """Delayed background retries: `submit(key, attempt)`, where `await attempt()` returns True once it worked.
+
+    Kept in memory only; anything still pending when the app stops is dropped
+    (the chunk is simply generated again on its next request).
+    """
+
+    def __init__(self, delay: float = REQUEUE_DELAY_SECONDS, rounds: int = REQUEUE_ROUNDS,
+                 concurrency: int = REQUEUE_CONCURRENCY, max_pending: int = REQUEUE_MAX_PENDING):
+        self.delay = delay
+        self.rounds = rounds
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self._due = []        # heap of (due time, seq, key)
+        self._pending = {}    # key -> (attempt, round)
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._tasks = []
+        self.metrics = {"submitted": 0, "recovered": 0, "gave_up": 0, "rejected": 0, "attempts": 0}
+
+    # ---- lifecycle ---- #
+    async def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ---- queue ---- #
+    def submit(self, key: str, attempt) -> bool:
+        """Queue a retry; the same key already waiting is not queued twice."""
+        if key in self._pending:
+            return True
+        if len(self._pending) >= self.max_pending:
+            self.metrics["rejected"] += 1
+            return False
+        self.metrics["submitted"] += 1
+        self._schedule(key, attempt, 0)
+        return True
+
+    def _schedule(self, key: str, attempt, round_: int):
+        self._pending[key] = (attempt, round_)
+        heapq.heappush(self._due, (time.monotonic() + self.delay * 2 ** round_, next(self._seq), key))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _next(self) -> str:
+        while True:
+            self._wakeup.clear()
+            timeout = None
+            if self._due:
+                timeout = self._due[0][0] - time.monotonic()
+                if timeout <= 0:
+                    return heapq.heappop(self._due)[2]
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self):
+        while True:
+            key = await self._next()
+            attempt, round_ = self._pending[key]
+            self.metrics["attempts"] += 1
+            try:
+                recovered = await attempt()
+            except Exception as e:
+                print(f"Requeued chunk {key[:12]} failed: {e}")
+                recovered = False
+            if recovered:
+                del self._pending[key]
+                self.metrics["recovered"] += 1
+            elif round_ + 1 < self.rounds:
+                self._schedule(key, attempt, round_ + 1)
+            else:
+                del self._pending[key]
+                self.metrics["gave_up"] += 1
+
+    def stats(self) -> dict:
+        return {**self.metrics, "pending": len(self._pending)}
+
+
+chunk_requeue = ChunkRequeue()
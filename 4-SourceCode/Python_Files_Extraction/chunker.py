@@ -0,0 +1,171 @@
+import math
+import os
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator
+
+# ---------------- CONFIG ---------------- #
+# Token budget for the document text in one LLM call (system prompt not included)
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "800"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "0"))
+# "tiktoken:<encoding>", "hf:<model id>" or "approx"
+CHUNK_TOKENIZER = os.getenv("CHUNK_TOKENIZER", "tiktoken:cl100k_base")
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n|\f")
+SENTENCE_END = re.compile(r"(?<=[.!?؟。])\s+")
+WORD_PIECE = re.compile(r"\w+|[^\w\s]")
+
+
+# ---------------- TOKEN COUNTING ---------------- #
+def approx_token_count(text: str) -> int:
+    """Tokenizer-free estimate: roughly one token per 4 characters of each word."""
+    return sum(math.ceil(len(piece) / 4) for piece in WORD_PIECE.findall(text))
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(tokenizer: str = CHUNK_TOKENIZER) -> Callable[[str], int]:
+    """Return a token counting function for the target model.
+
+    Falls back to the approximate counter when the tokenizer package is not installed.
+    """
+    kind, _, name = tokenizer.partition(":")
+    try:
+        if kind == "tiktoken":
+            import tiktoken  # if this isn't working, run: pip install tiktoken
+            encoding = tiktoken.get_encoding(name or "cl100k_base")
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+        if kind == "hf":
+            from transformers import AutoTokenizer  # if this isn't working, run: pip install transformers
+            hf_tokenizer = AutoTokenizer.from_pretrained(name)
+            return lambda text: len(hf_tokenizer.encode(text, add_special_tokens=False))
+    except Exception as e:
+        print(f"Tokenizer '{tokenizer}' unavailable ({e}), using approximate token counts")
+    return approx_token_count
+
+
+# ---------------- SPLITTING ---------------- #
+def split_paragraphs(text: str) -> list[str]:
+    """Split extracted text into paragraph units (blank lines / form feeds)."""
+    return [part.strip() for part in PARAGRAPH_BREAK.split(text) if part.strip()]
+
+
+def _split_oversized(unit: str, max_tokens: int, count_tokens) -> list[str]:
+    """Break a unit that alone exceeds the budget: lines, then sentences, then words."""
+    for pattern in ("\n", SENTENCE_END, " "):
+        pieces = unit.split(pattern) if isinstance(pattern, str) else pattern.split(unit)
+        pieces = [piece.strip() for piece in pieces if piece.strip()]
+        if len(pieces) > 1:
+            joiner = "\n" if pattern == "\n" else " "
+            return list(iter_chunks(pieces, max_tokens, 0, count_tokens, joiner=joiner))
+    # A single "word" longer than the budget (e.g. a base64 blob): hard cut
+    step = max(1, max_tokens * 4)
+    return [unit[i:i + step] for i in range(0, len(unit), step)]
+
+
+# ---------------- CHUNKING ---------------- #
+def iter_chunks(
+    parts: Iterable[str],
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    count_tokens: Callable[[str], int] | None = None,
+    joiner: str = "\n\n",
+) -> Iterator[str]:
+    """Pack whole parts (paragraphs, pages, slides) into chunks of at most `max_tokens`.
+
+    Works as a streaming generator: a chunk is yielded as soon as it is full,
+    so the caller can start generating while the rest is still being extracted.
+    `overlap_tokens` repeats the tail of the previous chunk at the start of the next.
+    """
+    count_tokens = count_tokens or get_token_counter()
+    current: list[tuple[str, int]] = []
+    current_tokens = 0
+
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        tokens = count_tokens(part)
+
+        if tokens > max_tokens:
+            units = _split_oversized(part, max_tokens, count_tokens)
+            unit_tokens = [count_tokens(unit) for unit in units]
+        else:
+            units, unit_tokens = [part], [tokens]
+
+        for unit, tokens in zip(units, unit_tokens):
+            if current and current_tokens + tokens > max_tokens:
+                yield joiner.join(text for text, _ in current)
+
+                # Carry the last units forward as overlap
+                carried, carried_tokens = [], 0
+                for text, n in reversed(current):
+                    if carried_tokens + n > overlap_tokens or carried_tokens + n + tokens > max_tokens:
+                        break
+                    carried.insert(0, (text, n))
+                    carried_tokens += n
+                current, current_tokens = carried, carried_tokens
+
+            current.append((unit, tokens))
+            current_tokens += tokens
+
+    if current:
+        yield joiner.join(text for text, _ in current)
+
+
+def chunk_document(text: str, max_tokens: int = CHUNK_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> Iterator[str]:
+    """Chunk a whole extracted document."""
+    return iter_chunks(split_paragraphs(text), max_tokens, overlap_tokens)
+
+
+def segments_to_parts(segments: Iterable) -> Iterator[str]:
+    """Group a stream of TextSegment into one part per PDF page / slide.
+
+    Segments without a page or slide (DOCX paragraphs) are split into paragraphs.
+    """
+    current_key, current = None, []
+    for segment in segments:
+        key = (segment.page, segment.slide)
+        if key == (None, None):
+            if current:
+                yield "".join(current)
+            current_key, current = None, []
+            yield from split_paragraphs(segment.text)
+            continue
+        if key != current_key and current:
+            yield "".join(current)
+            current = []
+        current_key = key
+        current.append(segment.text)
+    if current:
+        yield "".join(current)
+
+
+def chunk_segments(segments: Iterable, max_tokens: int = CHUNK_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> Iterator[str]:
+    """Chunk a (possibly still streaming) sequence of extracted segments."""
+    return iter_chunks(segments_to_parts(segments), max_tokens, overlap_tokens)
+
+
+# ---------------- BLOCK WEIGHTS ---------------- #
+# Share of a typed block's tokens that counts toward its chunk's question
+# weight (question_planner). Speaker notes mostly restate their slide in
+# prose, so a slide with long notes should not get twice the questions.
+BLOCK_WEIGHTS = {"notes": 0.5}
+
+
+def chunk_weights(chunks: list[str], segments: Iterable, count_tokens: Callable[[str], int] | None = None) -> list[int]:
+    """Planner weight of each chunk: its tokens, with the typed blocks of `segments` scaled by BLOCK_WEIGHTS."""
+    count_tokens = count_tokens or get_token_counter()
+    weights = [count_tokens(chunk) for chunk in chunks]
+    position = 0
+    for segment in segments:
+        share = BLOCK_WEIGHTS.get(segment.kind, 1.0)
+        block = segment.text.strip()
+        if share == 1.0 or not block:
+            continue
+        # Segments are in document order, so the search resumes at the last chunk matched
+        for index in range(position, len(chunks)):
+            if block in chunks[index]:
+                weights[index] -= (1 - share) * count_tokens(block)
+                position = index
+                break
+    return [max(1, round(weight)) for weight in weights]
@@ -1,44 +1,135 @@
-import aiohttp
 import asyncio
 import json
-import re
+import os
+import time
+import uuid
+import httpx
+from llm_clients import get_llm_client, stream_chat_completion, OPENROUTER_TIMEOUT
+from llm_router import Backend, BackendError, LLMRouter, LLMUnavailable, create_router
+from chunk_requeue import chunk_requeue
+from llm_scheduler import scheduler
+from chunker import CHUNK_MAX_TOKENS, chunk_document, get_token_counter
+from quiz_cache import quiz_cache
+from question_stream import QuestionStreamParser, merge_streams
+from question_planner import fill_budget, plan_questions
+from question_dedup import QUESTION_DEDUP, dedupe_questions, duplicate_positions
+from question_parser import NORMALIZERS, parse_questions, question_type_of, scanner_report, split_by_type
+from telemetry import count_chunks, set_attributes, span
 
 # ---------------- CONFIG ---------------- #
-API_KEY = "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"
-BASE_URL = "https://openrouter.ai/api/v1"
-
-# ---------------- CLEAN JSON ---------------- #
-def clean_json_like_text(text: str) -> str:
-    text = re.sub(r"```json|```", "", text).strip()
-    text = re.sub(r",\s*([}\]])", r"\1", text)
-    return text
+API_KEY = os.getenv("OPENROUTER_API_KEY", "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")
+BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+OPENROUTER_BACKEND = "openrouter"
+QUIZ_MODEL = "deepseek/deepseek-chat"
+SAMPLING = {"temperature": 0.3, "max_tokens": 1200}
+# Bump a version whenever its prompt changes so cached questions are regenerated
+PROMPT_VERSIONS = {"mcq": "mcq-v1", "tf": "tf-v1", "mixed": "mixed-v1"}
+# Extra requests for a chunk whose output had no usable question in it
+CHUNK_PARSE_RETRIES = int(os.getenv("CHUNK_PARSE_RETRIES", "1"))
+# A document's LLM calls (retries included) stop this long after it started;
+# chunks still failing then are retried in the background (chunk_requeue.py)
+QUIZ_DOCUMENT_DEADLINE = float(os.getenv("QUIZ_DOCUMENT_DEADLINE", "180"))
+# How long a background retry of one chunk may take
+REQUEUE_CHUNK_DEADLINE = float(os.getenv("REQUEUE_CHUNK_DEADLINE", "300"))
+
+# Batching: several chunks per completion, sized to fit the model's window
+QUIZ_MODEL_CONTEXT_TOKENS = int(os.getenv("QUIZ_MODEL_CONTEXT_TOKENS", "65536"))
+QUIZ_MODEL_MAX_OUTPUT_TOKENS = int(os.getenv("QUIZ_MODEL_MAX_OUTPUT_TOKENS", "8192"))
+# More chunks per call means fewer calls but a longer answer to wait for
+BATCH_MAX_CHUNKS = int(os.getenv("BATCH_MAX_CHUNKS", "8"))
+# Questions asked for a full-size chunk; shorter chunks get proportionally fewer
+QUESTIONS_PER_CHUNK = int(os.getenv("QUESTIONS_PER_CHUNK", "5"))
+# Rough output size of one question, used to budget max_tokens
+TOKENS_PER_QUESTION = {"mcq": 90, "tf": 40, "mixed": 65}
+
+
+def get_openrouter_client() -> httpx.AsyncClient:
+    return get_llm_client(OPENROUTER_BACKEND, BASE_URL, OPENROUTER_TIMEOUT)
+
+# ---------------- ROUTING ---------------- #
+# Quiz completions go through a router (llm_router.py): OpenRouter plus any
+# "quiz" backends from LLM_BACKENDS, with failover when one is slow or down.
+openrouter_backend = Backend(OPENROUTER_BACKEND, BASE_URL, api_key=API_KEY, timeout=OPENROUTER_TIMEOUT)
+quiz_router = create_router("quiz", [openrouter_backend])
+
+# Chunk calls take either the router or a plain client pointed at BASE_URL
+LLMClient = LLMRouter | httpx.AsyncClient
+
+def document_deadline(seconds: float | None = None) -> float | None:
+    """time.monotonic() by which a document's calls must be done (QUIZ_DOCUMENT_DEADLINE from now); None if disabled."""
+    seconds = QUIZ_DOCUMENT_DEADLINE if seconds is None else seconds
+    return time.monotonic() + seconds if seconds > 0 else None
+
+async def post_completion(client: LLMClient, payload: dict, deadline: float | None = None) -> dict:
+    if isinstance(client, LLMRouter):
+        return await client.chat_completion(payload, deadline)
+    resp = await client.post(f"{BASE_URL}/chat/completions", headers=openrouter_headers(), json=payload)
+    return resp.json()
+
+def completion_stream(client: LLMClient, payload: dict):
+    if isinstance(client, LLMRouter):
+        return client.stream(payload)
+    return stream_chat_completion(client, f"{BASE_URL}/chat/completions", payload, openrouter_headers())
 
 # ---------------- CHUNKING ---------------- #
-def chunk_text(text: str, max_chars: int = 500):
-    return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
-
-# ---------------- MCQ (CHUNK LEVEL) ---------------- #
-async def get_mcq_questions(session: aiohttp.ClientSession, content: str):
-    headers = {
+def chunk_text(text: str):
+    """Whole paragraphs packed up to the CHUNK_MAX_TOKENS budget (see chunker.py)."""
+    return chunk_document(text)
+
+# ---------------- USAGE ---------------- #
+# Tokens billed across all completions, as reported by the backend
+llm_usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+def record_usage(data: dict):
+    usage = data.get("usage") or {}
+    llm_usage["calls"] += 1
+    llm_usage["prompt_tokens"] += usage.get("prompt_tokens", 0)
+    llm_usage["completion_tokens"] += usage.get("completion_tokens", 0)
+
+# ---------------- PROMPTS ---------------- #
+def openrouter_headers() -> dict:
+    return {
         "Authorization": f"Bearer {API_KEY}",
         "Content-Type": "application/json"
     }
 
-    schema = {
+QUESTION_SCHEMAS = {
+    "mcq": {
         "question": "Question text",
         "options": ["Option 1", "Option 2", "Option 3", "Option 4"],
         "answer": "Correct option"
-    }
-
-    payload = {
-        "model": "deepseek/deepseek-chat",
+    },
+    "tf": {
+        "question": "Question text",
+        "answer": "Correct option"
+    },
+}
+QUESTION_LABELS = {"mcq": "MCQ", "tf": "True/False", "mixed": "MCQ and True/False"}
+
+def question_request(quiz_type: str, count: int | None = None) -> str:
+    """"Generate MCQ questions", or "Generate exactly 4 MCQ questions" when the planner set a count."""
+    amount = f"exactly {count} " if count else ""
+    return f"Generate {amount}{QUESTION_LABELS[quiz_type]} questions"
+
+def schema_prompt(quiz_type: str, **extra) -> str:
+    """The schema lines of a system prompt; `extra` adds fields (e.g. chunk=1) to the example."""
+    if quiz_type == "mixed":
+        schemas = [dict(QUESTION_SCHEMAS["mcq"], **extra), dict(QUESTION_SCHEMAS["tf"], **extra)]
+        return (
+            "Each object MUST follow one of these schemas (MCQ with options, True/False without):\n"
+            f"{json.dumps(schemas, indent=2)}\n"
+        )
+    return f"Each object MUST follow this schema:\n{json.dumps(dict(QUESTION_SCHEMAS[quiz_type], **extra), indent=2)}\n"
+
+def build_mcq_payload(content: str, count: int | None = None) -> dict:
+    return {
+        "model": QUIZ_MODEL,
         "messages": [
             {
                 "role": "system",
                 "content": (
                     "Return ONLY a JSON array of MCQ objects.\n"
-                    "Each object MUST follow this schema:\n"
-                    f"{json.dumps(schema, indent=2)}\n"
+                    f"{schema_prompt('mcq')}"
                     "Rules:\n"
                     "- JSON only\n"
                     "- No markdown\n"
@@ -47,66 +138,48 @@ async def get_mcq_questions(session: aiohttp.ClientSession, content: str):
             },
             {
                 "role": "user",
-                "content": f"Generate MCQ questions from this text:\n{content}"
+                "content": f"{question_request('mcq', count)} from this text:\n{content}"
             }
         ],
-        "temperature": 0.3,
-        "max_tokens": 1200
+        **SAMPLING
     }
 
-    try:
-        async with session.post(
-            f"{BASE_URL}/chat/completions",
-            headers=headers,
-            json=payload
-        ) as resp:
-            data = await resp.json()
-
-            if "error" in data:
-                raise Exception(data["error"]["message"])
-
-            if "choices" not in data:
-                raise Exception(f"Unexpected response: {data}")
-
-            raw = data["choices"][0]["message"]["content"]
-
-
-            raw = data["choices"][0]["message"]["content"]
-            cleaned = clean_json_like_text(raw)
-            parsed = json.loads(cleaned)
-
-            return parsed if isinstance(parsed, list) else []
-
-    # except Exception:
-    #     return []
-
-    except Exception as e:
-        print("MODEL ERROR:", e)
-        print("RAW:", raw if 'raw' in locals() else "NO RAW")
-        return []
-
-# ---------------- TF (CHUNK LEVEL) ---------------- #
-async def get_tf_questions(session: aiohttp.ClientSession, content: str):
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    schema = {
-        "question": "Question text",
-        "answer": "Correct option"
+def build_tf_payload(content: str, count: int | None = None) -> dict:
+    return {
+        "model": QUIZ_MODEL,
+        "messages": [
+            {
+                "role": "system",
+                "content": (
+                    "Return ONLY a JSON array of True/False objects.\n"
+                    f"{schema_prompt('tf')}"
+                    "Rules:\n"
+                    "- JSON only\n"
+                    "- No markdown\n"
+                    "- No explanations"
+                )
+            },
+            {
+                "role": "user",
+                "content": f"{question_request('tf', count)} from this text:\n{content}"
+            }
+        ],
+        **SAMPLING
     }
 
-    payload = {
-        "model": "deepseek/deepseek-chat",
+def build_mixed_payload(content: str, count: int | None = None) -> dict:
+    # Both question types from one read of the chunk: its tokens are paid once
+    return {
+        "model": QUIZ_MODEL,
         "messages": [
             {
                 "role": "system",
                 "content": (
-                    "Return ONLY a JSON array of True/False objects.\n"
-                    "Each object MUST follow this schema:\n"
-                    f"{json.dumps(schema, indent=2)}\n"
+                    "Return ONLY one JSON array holding both MCQ and True/False objects.\n"
+                    f"{schema_prompt('mixed')}"
                     "Rules:\n"
+                    "- About half MCQ, half True/False\n"
+                    "- True/False answers are \"True\" or \"False\"\n"
                     "- JSON only\n"
                     "- No markdown\n"
                     "- No explanations"
@@ -114,68 +187,437 @@ async def get_tf_questions(session: aiohttp.ClientSession, content: str):
             },
             {
                 "role": "user",
-                "content": f"Generate True/False questions from this text:\n{content}"
+                "content": f"{question_request('mixed', count)} from this text:\n{content}"
             }
         ],
-        "temperature": 0.3,
-        "max_tokens": 1200
+        **SAMPLING
     }
 
+CHUNK_PAYLOADS = {"mcq": build_mcq_payload, "tf": build_tf_payload, "mixed": build_mixed_payload}
+
+def chunk_summary(chunk_reports: list) -> dict:
+    """How many chunks produced questions, and how many failed (and were requeued)."""
+    failed = sum("error" in report for report in chunk_reports)
+    return {
+        "total": len(chunk_reports),
+        "succeeded": len(chunk_reports) - failed,
+        "failed": failed,
+        "requeued": sum(bool(report.get("requeued")) for report in chunk_reports),
+    }
+
+def quiz_output(questions: list, chunk_reports: list, quiz_type: str) -> dict:
+    # Overlapping chunks and repeated slides give near-identical questions
+    questions, duplicates = dedupe_questions(questions)
+    chunks = chunk_summary(chunk_reports)
+    count_chunks(chunks)
+    # Mixed quizzes come back split the same way /ask_ai_model splits them
+    return {
+        "questions": split_by_type(questions) if quiz_type == "mixed" else questions,
+        "chunk_reports": chunk_reports,
+        "chunks": chunks,
+        "duplicates_removed": duplicates
+    }
+
+# ---------------- CHUNK LEVEL ---------------- #
+async def get_chunk_questions(client: LLMClient, payload: dict, quiz_type: str = "mcq", deadline: float | None = None):
+    """One completion -> (valid questions, recovery report); see question_parser.py.
+
+    429s and 5xx are retried with backoff by the router until `deadline`.
+    """
     try:
-        async with session.post(
-            f"{BASE_URL}/chat/completions",
-            headers=headers,
-            json=payload
-        ) as resp:
-            data = await resp.json()
+        data = await post_completion(client, payload, deadline)
 
-            if "error" in data:
-                raise Exception(data["error"]["message"])
+        if "error" in data:
+            raise Exception(data["error"]["message"])
 
-            if "choices" not in data:
-                raise Exception(f"Unexpected response: {data}")
+        if "choices" not in data:
+            raise Exception(f"Unexpected response: {data}")
 
-            raw = data["choices"][0]["message"]["content"]
+        raw = data["choices"][0]["message"]["content"]
+        record_usage(data)
 
-            raw = data["choices"][0]["message"]["content"]
-            cleaned = clean_json_like_text(raw)
-            parsed = json.loads(cleaned)
+    except Exception as e:
+        print("MODEL ERROR:", e)
+        return [], {"error": str(e), "unrecoverable": False}
 
-            return parsed if isinstance(parsed, list) else []
+    questions, report = parse_questions(raw, quiz_type)
+    if report["unrecoverable"]:
+        print("UNUSABLE MODEL OUTPUT:", raw[:500])
+    return questions, report
 
-    except Exception:
-        return []
+# ---------------- MCQ (CHUNK LEVEL) ---------------- #
+async def get_mcq_questions(client: LLMClient, content: str):
+    questions, _ = await get_chunk_questions(client, build_mcq_payload(content), "mcq")
+    return questions
+
+# ---------------- TF (CHUNK LEVEL) ---------------- #
+async def get_tf_questions(client: LLMClient, content: str):
+    questions, _ = await get_chunk_questions(client, build_tf_payload(content), "tf")
+    return questions
+
+# ---------------- STREAMED (CHUNK LEVEL) ---------------- #
+async def stream_chunk_questions(client: LLMClient, payload: dict, quiz_type: str = "mcq", report: dict | None = None):
+    """Yield each valid question as soon as the model has finished writing it.
+
+    When the completion ends, its recovery stats are written into `report`.
+    """
+    parser = QuestionStreamParser()
+    normalize = NORMALIZERS[quiz_type]
+    found = valid = 0
+    try:
+        async for delta in completion_stream(client, payload):
+            for obj in parser.feed(delta):
+                found += 1
+                question = normalize(obj)
+                if question is not None:
+                    valid += 1
+                    yield question
+    except Exception as e:
+        print("MODEL ERROR:", e)
+        print("RAW:", parser.raw or "NO RAW")
+        raise
+    if report is not None:
+        report.update(scanner_report(parser, found, valid))
+
+# ---------------- SCHEDULED CHUNK CALL ---------------- #
+def chunk_cache_key(chunk: str, quiz_type: str, prompt_version: str | None = None) -> str:
+    return quiz_cache.make_key(chunk, quiz_type, QUIZ_MODEL, prompt_version or PROMPT_VERSIONS[quiz_type], SAMPLING)
+
+async def run_chunk(document_id: str, quiz_type: str, client: LLMClient, chunk: str, use_cache: bool = True,
+                    count: int | None = None, deadline: float | None = None, requeue: bool = True):
+    """Return (questions, report) for the chunk: from the cache, or generated once the scheduler grants a slot.
+
+    The chunk is only requested again when its output had nothing usable in it.
+    `count` asks for exactly that many questions (see question_planner.py).
+    A chunk whose calls still fail by `deadline` is handed to the background
+    requeue, which fills the cache for the next request.
+    """
+    key = chunk_cache_key(chunk, quiz_type, f"{PROMPT_VERSIONS[quiz_type]}-n{count}" if count else None)
+    with span("chunk", document_id=document_id, quiz_type=quiz_type, count=count) as current:
+        if use_cache:
+            cached = await asyncio.to_thread(quiz_cache.get, key)
+            if cached is not None:
+                set_attributes(current, cached=True, questions=len(cached))
+                return cached, {"cached": True, "valid": len(cached)}
+
+        payload = CHUNK_PAYLOADS[quiz_type](chunk, count)
+        for attempt in range(1 + CHUNK_PARSE_RETRIES):
+            async with scheduler.slot(document_id, OPENROUTER_BACKEND):
+                questions, report = await get_chunk_questions(client, payload, quiz_type, deadline)
+            report["attempts"] = attempt + 1
+            if not report["unrecoverable"]:
+                break
+
+        # Failed chunks come back empty; leave them uncached so they are retried
+        if questions:
+            await asyncio.to_thread(quiz_cache.put, key, questions)
+        elif "error" in report and requeue and isinstance(client, LLMRouter):
+            report["requeued"] = requeue_chunk(key, quiz_type, client, chunk, count)
+        set_attributes(current, cached=False, questions=len(questions), attempts=report["attempts"],
+                       error=report.get("error"), requeued=report.get("requeued"))
+        return questions, report
+
+def requeue_chunk(key: str, quiz_type: str, client: LLMRouter, chunk: str, count: int | None) -> bool:
+    async def attempt() -> bool:
+        _, report = await run_chunk(
+            "requeue", quiz_type, client, chunk, use_cache=True, count=count,
+            deadline=document_deadline(REQUEUE_CHUNK_DEADLINE), requeue=False
+        )
+        return "error" not in report
+    return chunk_requeue.submit(key, attempt)
+
+# ---------------- FINAL OUTPUT (ANY CHUNK SOURCE) ---------------- #
+async def generate_quiz_from_chunks(document_name: str, chunks, quiz_type: str, use_cache: bool = True, on_chunk=None, batch: bool = False, count: int | None = None,
+                                    weights: list | None = None):
+    """Generate questions for every chunk; `chunks` may be a generator that is still producing.
+
+    `on_chunk(index, total, questions)` is awaited as each chunk finishes (in completion order).
+    With `batch`, several chunks share one completion (see generate_quiz_batched).
+    With `count`, only as many chunks as that many questions need are sent (see generate_quiz_planned).
+    """
+    if count:
+        return await generate_quiz_planned(document_name, chunks, quiz_type, count, use_cache, on_chunk, weights)
+    if batch:
+        return await generate_quiz_batched(document_name, chunks, quiz_type, use_cache, on_chunk)
 
-# ---------------- FINAL MCQ OUTPUT ---------------- #
-async def generate_mcq_quiz_from_text(document_name: str, text: str):
-    chunks = chunk_text(text)
     all_questions = []
+    chunk_reports = []
 
-    async with aiohttp.ClientSession() as session:
-        tasks = [get_mcq_questions(session, chunk) for chunk in chunks]
-        results = await asyncio.gather(*tasks)
+    client = quiz_router
+    document_id = f"{document_name}:{uuid.uuid4().hex[:8]}"
+    deadline = document_deadline()
 
-    for block in results:
-        all_questions.extend(block)
+    tasks = []
+    all_scheduled = asyncio.Event()
+
+    async def run(index: int, chunk: str):
+        questions, report = await run_chunk(document_id, quiz_type, client, chunk, use_cache, deadline=deadline)
+        if on_chunk is not None:
+            await all_scheduled.wait()  # the total is only known once the generator is done
+            await on_chunk(index, len(tasks), questions)
+        return questions, report
 
+    # Each chunk's call starts as soon as the generator yields it, not after the whole document is chunked
+    try:
+        for index, chunk in enumerate(chunks):
+            tasks.append(asyncio.create_task(run(index, chunk)))
+            await asyncio.sleep(0)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    all_scheduled.set()
+    results = await asyncio.gather(*tasks)
+
+    for block, report in results:
+        all_questions.extend(block)
+        chunk_reports.append(report)
+
+    return quiz_output(all_questions, chunk_reports, quiz_type)
+
+# ---------------- STREAMED OUTPUT ---------------- #
+async def stream_chunk(document_id: str, quiz_type: str, client: LLMClient, chunk: str, use_cache: bool = True):
+    """Streaming counterpart of run_chunk: yield (question_type, question) one by one, or ("error", detail).
+
+    A failed call is yielded rather than raised so the questions already sent
+    stand and the other chunks carry on; anything else is a bug and propagates.
+    """
+    key = chunk_cache_key(chunk, quiz_type)
+    cached = await asyncio.to_thread(quiz_cache.get, key) if use_cache else None
+    if cached is not None:
+        for question in cached:
+            yield question_type_of(question), question
+        return
+
+    questions = []
+    payload = CHUNK_PAYLOADS[quiz_type](chunk)
+    try:
+        for _ in range(1 + CHUNK_PARSE_RETRIES):
+            report = {}
+            async with scheduler.slot(document_id, OPENROUTER_BACKEND):
+                async for question in stream_chunk_questions(client, payload, quiz_type, report):
+                    questions.append(question)
+                    yield question_type_of(question), question
+            if not report.get("unrecoverable"):
+                break
+    except (LLMUnavailable, BackendError) as e:
+        yield "error", str(e)  # already logged; nothing is cached
+        return
+
+    if questions:
+        await asyncio.to_thread(quiz_cache.put, key, questions)
+
+async def stream_quiz_from_chunks(document_name: str, chunks, quiz_type: str, use_cache: bool = True):
+    """Yield (chunk_index, question_type, question) as questions complete, across all chunks at once.
+
+    A chunk whose call failed yields (chunk_index, "error", detail) instead.
+    """
+    client = quiz_router
+    document_id = f"{document_name}:{uuid.uuid4().hex[:8]}"
+    streams = {
+        index: stream_chunk(document_id, quiz_type, client, chunk, use_cache)
+        for index, chunk in enumerate(chunks)
+    }
+    async for index, (key, item) in merge_streams(streams):
+        yield index, key, item
+
+# ---------------- BATCHED CHUNKS ---------------- #
+BATCH_CHUNK_HEADER = "### Chunk {number} ({quota} questions)"
+
+def batch_cache_key(chunk: str, quiz_type: str) -> str:
+    # Batched answers follow a different prompt and quota, so they are cached apart
+    return chunk_cache_key(chunk, quiz_type, f"{PROMPT_VERSIONS[quiz_type]}-batch-q{QUESTIONS_PER_CHUNK}")
+
+def chunk_quota(tokens: int) -> int:
+    return max(1, min(QUESTIONS_PER_CHUNK, round(QUESTIONS_PER_CHUNK * tokens / CHUNK_MAX_TOKENS)))
+
+def build_batch_system_prompt(quiz_type: str) -> str:
+    label = QUESTION_LABELS[quiz_type]
+    return (
+        f"You receive several numbered text chunks. For EACH chunk write exactly the number of "
+        f"{label} questions given in its header, using only that chunk's text.\n"
+        f"Return ONLY one JSON array of {label} objects for all chunks.\n"
+        f"{schema_prompt(quiz_type, chunk=1)}"
+        "Rules:\n"
+        "- \"chunk\" is the number of the chunk the question was written from\n"
+        "- JSON only\n"
+        "- No markdown\n"
+        "- No explanations"
+    )
+
+def build_batch_payload(batch: list, quiz_type: str) -> dict:
+    """`batch` is [(chunk_index, chunk, quota), ...]; chunks are numbered 1..n in the prompt."""
+    content = "\n\n".join(
+        f"{BATCH_CHUNK_HEADER.format(number=number, quota=quota)}\n{chunk}"
+        for number, (_, chunk, quota) in enumerate(batch, start=1)
+    )
+    max_tokens = sum(quota for _, _, quota in batch) * TOKENS_PER_QUESTION[quiz_type]
     return {
-            "questions": all_questions
+        "model": QUIZ_MODEL,
+        "messages": [
+            {"role": "system", "content": build_batch_system_prompt(quiz_type)},
+            {"role": "user", "content": f"Generate {QUESTION_LABELS[quiz_type]} questions from these chunks:\n\n{content}"}
+        ],
+        **SAMPLING,
+        # Room for every quota plus slack, never above what the model can write
+        "max_tokens": min(QUIZ_MODEL_MAX_OUTPUT_TOKENS, int(max_tokens * 1.25) + 200),
     }
 
-# ---------------- FINAL TF OUTPUT ---------------- #
-async def generate_tf_quiz_from_text(document_name: str, text: str):
-    chunks = chunk_text(text)
-    all_questions = []
+def plan_batches(chunks: list, quiz_type: str, count_tokens=None) -> list:
+    """Group (index, chunk) pairs into batches that fit the context window and output limit."""
+    count_tokens = count_tokens or get_token_counter()
+    system_tokens = count_tokens(build_batch_system_prompt(quiz_type))
+    input_budget = QUIZ_MODEL_CONTEXT_TOKENS - QUIZ_MODEL_MAX_OUTPUT_TOKENS - system_tokens
+    # max_tokens gets 25% + 200 slack on top of the quotas (see build_batch_payload)
+    output_budget = (QUIZ_MODEL_MAX_OUTPUT_TOKENS - 200) / 1.25
+
+    batches, current, input_tokens, output_tokens = [], [], 0, 0
+    for index, chunk in chunks:
+        tokens = count_tokens(chunk) + 12  # + chunk header
+        quota = chunk_quota(tokens)
+        output = quota * TOKENS_PER_QUESTION[quiz_type]
+        if current and (
+            len(current) >= BATCH_MAX_CHUNKS
+            or input_tokens + tokens > input_budget
+            or output_tokens + output > output_budget
+        ):
+            batches.append(current)
+            current, input_tokens, output_tokens = [], 0, 0
+        current.append((index, chunk, quota))
+        input_tokens += tokens
+        output_tokens += output
+    if current:
+        batches.append(current)
+    return batches
+
+async def get_batch_questions(client: LLMClient, batch: list, quiz_type: str, deadline: float | None = None):
+    """One completion for the whole batch -> ({chunk_index: questions}, report)."""
+    try:
+        data = await post_completion(client, build_batch_payload(batch, quiz_type), deadline)
 
-    async with aiohttp.ClientSession() as session:
-        tasks = [get_tf_questions(session, chunk) for chunk in chunks]
-        results = await asyncio.gather(*tasks)
+        if "error" in data:
+            raise Exception(data["error"]["message"])
 
-    for block in results:
-        all_questions.extend(block)
+        if "choices" not in data:
+            raise Exception(f"Unexpected response: {data}")
 
-    return {
+        raw = data["choices"][0]["message"]["content"]
+        record_usage(data)
 
-            "questions": all_questions
-        
+    except Exception as e:
+        print("MODEL ERROR:", e)
+        return {}, {"error": str(e), "unrecoverable": False}
+
+    questions, report = parse_questions(raw, quiz_type, keep=("chunk",))
+    by_number = {number: item for number, item in enumerate(batch, start=1)}
+    by_chunk = {index: [] for index, _, _ in batch}
+    unattributed = 0
+    for question in questions:
+        number = question.pop("chunk", None)
+        try:
+            index, _, quota = by_number[int(number)]
+        except (KeyError, TypeError, ValueError):
+            unattributed += 1
+            continue
+        if len(by_chunk[index]) < quota:
+            by_chunk[index].append(question)
+    report["unattributed"] = unattributed
+    return by_chunk, report
+
+async def run_batch(document_id: str, quiz_type: str, client: LLMClient, batch: list, on_chunk, total: int,
+                    deadline: float | None = None):
+    """Generate one batch; chunks the model skipped fall back to their own call."""
+    with span("chunk_batch", document_id=document_id, quiz_type=quiz_type, chunks=len(batch)) as current:
+        async with scheduler.slot(document_id, OPENROUTER_BACKEND):
+            by_chunk, report = await get_batch_questions(client, batch, quiz_type, deadline)
+        set_attributes(current, error=report.get("error"), questions=report.get("valid"))
+
+    results = {}
+    for index, chunk, _ in batch:
+        questions = by_chunk.get(index, [])
+        if questions:
+            await asyncio.to_thread(quiz_cache.put, batch_cache_key(chunk, quiz_type), questions)
+            chunk_report = {"batched": len(batch), "valid": len(questions)}
+        else:
+            questions, chunk_report = await run_chunk(document_id, quiz_type, client, chunk, use_cache=False, deadline=deadline)
+            chunk_report["batch_fallback"] = True
+        chunk_report["batch_report"] = report
+        results[index] = (questions, chunk_report)
+        if on_chunk is not None:
+            await on_chunk(index, total, questions)
+    return results
+
+async def generate_quiz_batched(document_name: str, chunks, quiz_type: str, use_cache: bool = True, on_chunk=None):
+    """Same result as generate_quiz_from_chunks, with several chunks per completion."""
+    client = quiz_router
+    document_id = f"{document_name}:{uuid.uuid4().hex[:8]}"
+    deadline = document_deadline()
+    chunks = list(chunks)
+    results = {}
+
+    pending = []
+    for index, chunk in enumerate(chunks):
+        cached = await asyncio.to_thread(quiz_cache.get, batch_cache_key(chunk, quiz_type)) if use_cache else None
+        if cached is not None:
+            results[index] = (cached, {"cached": True, "valid": len(cached)})
+            if on_chunk is not None:
+                await on_chunk(index, len(chunks), cached)
+        else:
+            pending.append((index, chunk))
+
+    batches = plan_batches(pending, quiz_type)
+    for batch_results in await asyncio.gather(*(
+        run_batch(document_id, quiz_type, client, batch, on_chunk, len(chunks), deadline) for batch in batches
+    )):
+        results.update(batch_results)
+
+    ordered = [results[index] for index in range(len(chunks))]
+    return quiz_output(
+        [question for questions, _ in ordered for question in questions],
+        [report for _, report in ordered],
+        quiz_type
+    )
+
+# ---------------- QUESTION BUDGET ---------------- #
+async def generate_quiz_planned(document_name: str, chunks, quiz_type: str, count: int, use_cache: bool = True, on_chunk=None,
+                                weights: list | None = None):
+    """`count` questions spread over the document by text weight; unneeded chunks are never sent.
+
+    `weights` (chunker.chunk_weights) defaults to the token count of each chunk.
+    """
+    client = quiz_router
+    document_id = f"{document_name}:{uuid.uuid4().hex[:8]}"
+    deadline = document_deadline()
+    chunks = list(chunks)
+    count_tokens = get_token_counter()
+    plan = plan_questions(weights or [count_tokens(chunk) for chunk in chunks], count)
+
+    async def generate(index: int, quota: int):
+        questions, report = await run_chunk(document_id, quiz_type, client, chunks[index], use_cache, count=quota, deadline=deadline)
+        if on_chunk is not None:
+            await on_chunk(index, len(chunks), questions[:quota])
+        return questions, report
+
+    questions, reports = await fill_budget(plan, generate, duplicate_positions if QUESTION_DEDUP else None)
+    order = sorted(questions)
+    output = quiz_output(
+        [question for index in order for question in questions[index]],
+        [dict(reports[index], chunk=index) for index in order],
+        quiz_type
+    )
+    output["plan"] = {
+        "requested": count,
+        "chunks": len(chunks),
+        "chunks_used": len(order),
+        "planned": plan.planned,
+        "generated": sum(len(questions[index]) for index in order),
     }
+    return output
+
+# ---------------- FINAL MCQ OUTPUT ---------------- #
+async def generate_mcq_quiz_from_text(document_name: str, text: str, use_cache: bool = True, count: int | None = None):
+    return await generate_quiz_from_chunks(document_name, chunk_text(text), "mcq", use_cache, count=count)
+
+# ---------------- FINAL TF OUTPUT ---------------- #
+async def generate_tf_quiz_from_text(document_name: str, text: str, use_cache: bool = True, count: int | None = None):
+    return await generate_quiz_from_chunks(document_name, chunk_text(text), "tf", use_cache, count=count)
@@ -0,0 +1,266 @@
+# Embedding index for topic-targeted quizzes: chunks are embedded once on CPU,
+# in batches, and kept as a memory-mapped float16 matrix that only grows.
+#
+#   python embedding_index.py build --store .cache/corpus     (embed every passage of an ingest.py store)
+#   python embedding_index.py query "regression" --k 5
+#
+# /generate_quiz?topic=...&top_k=... adds the upload's chunks (only the ones
+# not seen before are embedded) and sends just the top_k closest to the topic.
+#
+# One directory per model under EMBEDDING_INDEX_DIR:
+#   meta.json     model, dimensions
+#   vectors.f16   unit-length vectors, float16, one row per chunk, appended
+#   rows.jsonl    one line per row: {"key": sha256 of the normalized chunk, "path", "chunk"}
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import numpy as np  # if this isn't working, run: pip install numpy
+from question_dedup import normalize_question_text, shingle_hashes
+from quiz_cache import normalize_chunk
+
+# ---------------- CONFIG ---------------- #
+# A sentence-transformers model name (multilingual, so Arabic and English
+# chunks share one space), or "hash:<dimensions>" for the download-free
+# character n-gram hashing embedder (lexical only, but needs no model).
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+EMBEDDING_INDEX_DIR = os.getenv("EMBEDDING_INDEX_DIR", os.path.join(".cache", "embeddings"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+# CPU threads for the model (0 = the library default, usually every core)
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+# Rows scored per block in a search, so a large matrix is never upcast at once
+SEARCH_BLOCK_ROWS = 65536
+
+
+# ---------------- EMBEDDERS ---------------- #
+class HashingEmbedder:
+    """Signed feature hashing of character 4-grams (the shingles question_dedup already hashes)."""
+
+    def __init__(self, dimensions: int = 384):
+        self.name = f"hash:{dimensions}"
+        self.dimensions = dimensions
+
+    def embed(self, texts: list) -> np.ndarray:
+        texts = [normalize_question_text(text) or " " for text in texts]
+        hashes, starts = shingle_hashes(texts)
+        owner = np.repeat(np.arange(len(texts)), np.diff(np.append(starts, len(hashes))))
+        buckets = (hashes % np.uint64(self.dimensions)).astype(np.int64)
+        signs = np.where((hashes >> np.uint64(63)) == 0, 1.0, -1.0)
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(vectors, (owner, buckets), signs)
+        return vectors
+
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model: str, threads: int = EMBEDDING_THREADS):
+        from sentence_transformers import SentenceTransformer  # if this isn't working, run: pip install sentence-transformers
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.name = model
+        self._model = SentenceTransformer(model, device="cpu")
+        self.dimensions = self._model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: list) -> np.ndarray:
+        return self._model.encode(texts, batch_size=EMBEDDING_BATCH_SIZE, convert_to_numpy=True,
+                                  normalize_embeddings=True, show_progress_bar=False)
+
+
+def load_embedder(model: str = EMBEDDING_MODEL):
+    if model.startswith("hash:"):
+        return HashingEmbedder(int(model.split(":", 1)[1]))
+    return SentenceTransformerEmbedder(model)
+
+
+def chunk_key(text: str) -> str:
+    # Same normalization as the quiz cache: whitespace-only differences share a vector
+    return hashlib.sha256(normalize_chunk(text).encode("utf-8")).hexdigest()
+
+
+def unit_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms == 0, 1, norms)).astype(np.float16)
+
+
+# ---------------- INDEX ---------------- #
+class EmbeddingIndex:
+    """Append-only vector store with exact cosine top-k; the model is loaded on first use."""
+
+    def __init__(self, directory: str = EMBEDDING_INDEX_DIR, model: str = EMBEDDING_MODEL):
+        self.model = model
+        self.directory = os.path.join(directory, re.sub(r"[^\w.-]+", "_", model))
+        self._lock = threading.Lock()
+        self._embedder = None
+        self._keys = None      # key -> row
+        self._locations = []   # row -> [path, chunk] or None
+        self._vectors = None   # memmap (rows, dimensions)
+        self.metrics = {"embedded": 0, "reused": 0, "embed_seconds": 0.0, "searches": 0}
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = load_embedder(self.model)
+        return self._embedder
+
+    def _open(self):
+        """Read rows.jsonl and map the vectors (once); rows cut short by a crash are dropped."""
+        if self._keys is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if not os.path.exists(self._path("meta.json")):
+            self._dimensions = self.embedder.dimensions
+            open(self._path("vectors.f16"), "wb").close()
+            open(self._path("rows.jsonl"), "w").close()
+            with open(self._path("meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"model": self.model, "dimensions": self._dimensions}, f)
+
+        with open(self._path("meta.json"), encoding="utf-8") as f:
+            self._dimensions = json.load(f)["dimensions"]
+        rows = []
+        with open(self._path("rows.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    break
+        complete = min(len(rows), os.path.getsize(self._path("vectors.f16")) // (2 * self._dimensions))
+        if complete < len(rows) or os.path.getsize(self._path("vectors.f16")) != complete * 2 * self._dimensions:
+            # An add was interrupted: keep the rows both files agree on, so later appends line up
+            rows = rows[:complete]
+            with open(self._path("vectors.f16"), "r+b") as f:
+                f.truncate(complete * 2 * self._dimensions)
+            with open(self._path("rows.jsonl"), "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+        self._keys = {}
+        self._locations = []
+        for row in rows:
+            self._keys.setdefault(row["key"], len(self._locations))
+            self._locations.append([row["path"], row["chunk"]] if row.get("path") is not None else None)
+        self._map()
+
+    def _map(self):
+        rows = len(self._locations)
+        self._vectors = (np.memmap(self._path("vectors.f16"), dtype=np.float16, mode="r", shape=(rows, self._dimensions))
+                         if rows else np.zeros((0, self._dimensions), dtype=np.float16))
+
+    def add(self, texts: list, locations: list | None = None) -> list:
+        """Row of each text, embedding (in batches) only the texts not stored yet.
+
+        `locations` optionally gives a (path, chunk number) per text.
+        """
+        with self._lock:
+            self._open()
+            rows, missing = [], {}
+            for position, text in enumerate(texts):
+                key = chunk_key(text)
+                if key in self._keys:
+                    rows.append(self._keys[key])
+                    continue
+                if key not in missing:
+                    missing[key] = position
+                rows.append(None)
+            self.metrics["reused"] += len(texts) - len(missing)
+            if missing:
+                start = time.perf_counter()
+                positions = list(missing.values())
+                with open(self._path("vectors.f16"), "ab") as vectors, \
+                        open(self._path("rows.jsonl"), "a", encoding="utf-8") as lines:
+                    for first in range(0, len(positions), EMBEDDING_BATCH_SIZE):
+                        batch = positions[first:first + EMBEDDING_BATCH_SIZE]
+                        vectors.write(unit_rows(self.embedder.embed([texts[p] for p in batch])).tobytes())
+                        vectors.flush()
+                        for position in batch:
+                            key = chunk_key(texts[position])
+                            location = locations[position] if locations else None
+                            self._keys[key] = len(self._locations)
+                            self._locations.append(list(location) if location else None)
+                            lines.write(json.dumps({"key": key, "path": location[0] if location else None,
+                                                    "chunk": location[1] if location else None}, ensure_ascii=False) + "\n")
+                self.metrics["embedded"] += len(missing)
+                self.metrics["embed_seconds"] += time.perf_counter() - start
+                self._map()
+            return [row if row is not None else self._keys[chunk_key(texts[i])] for i, row in enumerate(rows)]
+
+    def search(self, query: str, k: int, rows: list | None = None) -> list:
+        """[(row, cosine similarity)] of the `k` rows closest to `query`, best first; only `rows` if given."""
+        with self._lock:
+            self._open()
+            vectors = self._vectors
+        query_vector = unit_rows(self.embedder.embed([query]))[0].astype(np.float32)
+        candidates = np.asarray(rows if rows is not None else range(len(vectors)), dtype=np.int64)
+        scores = np.empty(len(candidates), dtype=np.float32)
+        for first in range(0, len(candidates), SEARCH_BLOCK_ROWS):
+            block = candidates[first:first + SEARCH_BLOCK_ROWS]
+            scores[first:first + len(block)] = vectors[block].astype(np.float32) @ query_vector
+        self.metrics["searches"] += 1
+        if len(scores) > k:
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+    def location(self, row: int):
+        return self._locations[row]
+
+    def stats(self) -> dict:
+        embedded = self.metrics["embedded"]
+        return {
+            "model": self.model,
+            "rows": len(self._locations) if self._keys is not None else None,
+            **self.metrics,
+            "chunks_per_second": embedded / self.metrics["embed_seconds"] if self.metrics["embed_seconds"] else 0.0,
+        }
+
+
+embedding_index = EmbeddingIndex()
+
+
+def top_chunks(index: EmbeddingIndex, chunks: list, topic: str, k: int) -> list:
+    """(chunk number, similarity) of the `k` chunks closest to `topic`, in document order."""
+    rows = index.add(chunks)
+    by_row = {}
+    for number, row in enumerate(rows):
+        by_row.setdefault(row, number)  # a repeated chunk is only sent once
+    best = index.search(topic, k, list(by_row))
+    return sorted((by_row[row], score) for row, score in best)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the chunk embedding index.")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--index", default=EMBEDDING_INDEX_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="embed the passages of an ingest.py store (new ones only)")
+    build.add_argument("--store", default=os.path.join(".cache", "corpus"))
+    query = commands.add_parser("query", help="print the passages closest to a query")
+    query.add_argument("text")
+    query.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    index = EmbeddingIndex(args.index, args.model)
+    if args.command == "build":
+        from search_index import store_passages
+        passages = list(store_passages(args.store))
+        start = time.perf_counter()
+        index.add([text for _, _, text in passages], [(path, number) for path, number, _ in passages])
+        stats = index.stats()
+        print(f"{len(passages)} passages: {stats['embedded']} embedded, {stats['reused']} already stored, "
+              f"{time.perf_counter() - start:.1f} s -> {index.directory}")
+        return
+
+    start = time.perf_counter()
+    for row, score in index.search(args.text, args.k):
+        print(f"[{score:.3f}] {index.location(row)}")
+    print(f"{(time.perf_counter() - start) * 1000:.1f} ms (model load included)")
+
+
+if __name__ == "__main__":
+    main()
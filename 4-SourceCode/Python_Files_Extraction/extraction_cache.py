@@ -0,0 +1,156 @@
+import os
+import threading
+from collections import OrderedDict
+from Extractors.segments import EXTRACT_STRUCTURED
+
+# ---------------- CONFIG ---------------- #
+# Bump whenever an extractor changes its output so old entries stop matching.
+# "3" is still the flat (EXTRACT_STRUCTURED=0) output.
+EXTRACTOR_VERSION = "4" if EXTRACT_STRUCTURED else "3"
+
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", os.path.join(".cache", "extracted_text"))
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+EXTRACTION_MEMORY_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_MEMORY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+# ---------------- CACHE ---------------- #
+class ExtractionCache:
+    """Content-addressed cache of extraction results (segments serialized as JSON text).
+
+    Keys are the SHA-256 of the uploaded bytes plus the file extension and
+    EXTRACTOR_VERSION. A small in-memory LRU sits in front of an LRU-capped
+    directory of UTF-8 text files.
+    """
+
+    def __init__(self, directory: str, max_disk_bytes: int, max_memory_bytes: int):
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self._lock = threading.Lock()
+
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_loaded = False
+
+        self.metrics = {
+            "hits_memory": 0,
+            "hits_disk": 0,
+            "misses": 0,
+            "bytes_saved": 0,
+            "evictions_memory": 0,
+            "evictions_disk": 0,
+        }
+
+    @staticmethod
+    def make_key(digest: str, filename: str) -> str:
+        file_ext = os.path.splitext(filename)[1].lower().lstrip(".") or "bin"
+        return f"v{EXTRACTOR_VERSION}-{file_ext}-{digest}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.txt")
+
+    def _load_disk_index(self):
+        """Rebuild the disk LRU order from file mtimes (touched on every hit)."""
+        if self._disk_loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".txt"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._disk_loaded = True
+
+    # ---- memory tier ---- #
+    def _remember(self, key: str, text: str):
+        size = len(text.encode("utf-8"))
+        if size > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key).encode("utf-8"))
+        self._memory[key] = text
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted.encode("utf-8"))
+            self.metrics["evictions_memory"] += 1
+
+    # ---- public API ---- #
+    def get(self, key: str, upload_size: int = 0) -> str | None:
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self.metrics["hits_memory"] += 1
+                self.metrics["bytes_saved"] += upload_size
+                return text
+
+            self._load_disk_index()
+            if key in self._disk:
+                path = self._path(key)
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        text = f.read()
+                    os.utime(path)
+                except OSError:
+                    self._disk_bytes -= self._disk.pop(key)
+                else:
+                    self._disk.move_to_end(key)
+                    self._remember(key, text)
+                    self.metrics["hits_disk"] += 1
+                    self.metrics["bytes_saved"] += upload_size
+                    return text
+
+            self.metrics["misses"] += 1
+            return None
+
+    def put(self, key: str, text: str):
+        with self._lock:
+            self._remember(key, text)
+            self._load_disk_index()
+
+            data = text.encode("utf-8")
+            if len(data) > self.max_disk_bytes:
+                return
+            path = self._path(key)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(temp_path, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except OSError as e:
+                print(f"Extraction cache write failed: {e}")
+                return
+
+            if key in self._disk:
+                self._disk_bytes -= self._disk.pop(key)
+            self._disk[key] = len(data)
+            self._disk_bytes += len(data)
+
+            while self._disk_bytes > self.max_disk_bytes:
+                evicted, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                self.metrics["evictions_disk"] += 1
+                try:
+                    os.remove(self._path(evicted))
+                except OSError:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            metrics = dict(self.metrics)
+            lookups = metrics["hits_memory"] + metrics["hits_disk"] + metrics["misses"]
+            metrics["hit_rate"] = (metrics["hits_memory"] + metrics["hits_disk"]) / lookups if lookups else 0.0
+            metrics["memory_entries"] = len(self._memory)
+            metrics["memory_bytes"] = self._memory_bytes
+            metrics["disk_entries"] = len(self._disk)
+            metrics["disk_bytes"] = self._disk_bytes
+            return metrics
+
+
+extraction_cache = ExtractionCache(EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_MAX_BYTES, EXTRACTION_MEMORY_CACHE_MAX_BYTES)
@@ -0,0 +1,112 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException
+from Extractors.content_extractor_all import extract_file_segments
+from Extractors.pdf_extractor import (
+    PDF_PARALLEL_MIN_PAGES, extract_pdf_page_range, pdf_page_count, plan_page_ranges
+)
+
+# ---------------- CONFIG ---------------- #
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "180"))
+# Recycle a worker after this many jobs to contain parser memory growth
+EXTRACTION_MAX_JOBS_PER_WORKER = int(os.getenv("EXTRACTION_MAX_JOBS_PER_WORKER", "50"))
+
+
+def _warm_worker():
+    """Runs once in every worker so the first job does not pay the parser import cost."""
+    import fitz  # noqa: F401  # PyMuPDF
+    import docx  # noqa: F401
+    import pptx  # noqa: F401
+    import Extractors.content_extractor_all  # noqa: F401
+
+
+def _ping():
+    return os.getpid()
+
+
+# ---------------- POOL ---------------- #
+class ExtractionPool:
+    """Runs the blocking extractors in worker processes, off the event loop."""
+
+    def __init__(self, workers: int, timeout: float, max_jobs_per_worker: int):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._executor = None
+        self.metrics = {"jobs": 0, "parallel_pdf_jobs": 0, "failures": 0, "timeouts": 0, "restarts": 0}
+
+    def start(self):
+        if self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            # "spawn" is required for max_tasks_per_child and is the Windows default anyway
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+            max_tasks_per_child=self.max_jobs_per_worker,
+        )
+        # Workers are spawned on demand; submit one no-op per worker to start them all now
+        for _ in range(self.workers):
+            self._executor.submit(_ping)
+
+    def shutdown(self, kill: bool = False):
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        if kill:
+            # A running job cannot be cancelled; stop the processes instead.
+            # Other in-flight jobs then fail with BrokenProcessPool and are retried.
+            for process in list((executor._processes or {}).values()):
+                process.terminate()
+        executor.shutdown(wait=not kill)
+
+    def _restart(self, executor):
+        # Several jobs see the same broken pool; only the first one restarts it
+        if self._executor is executor:
+            self.metrics["restarts"] += 1
+            self.shutdown(kill=True)
+        self.start()
+
+    async def _run(self, executor, file_path: str, filename: str) -> list:
+        loop = asyncio.get_running_loop()
+        if filename.lower().endswith(".pdf") and self.workers > 1:
+            page_count = await asyncio.to_thread(pdf_page_count, file_path)
+            if page_count >= PDF_PARALLEL_MIN_PAGES:
+                # Large PDF: spread page ranges over the workers, reassemble in page order
+                self.metrics["parallel_pdf_jobs"] += 1
+                parts = await asyncio.gather(*(
+                    loop.run_in_executor(executor, extract_pdf_page_range, file_path, start, stop)
+                    for start, stop in plan_page_ranges(page_count, self.workers)
+                ))
+                return [segment for part in parts for segment in part]
+        return await loop.run_in_executor(executor, extract_file_segments, file_path, filename)
+
+    async def extract(self, file_path: str, filename: str, retry: bool = True) -> list:
+        """Extract a file's TextSegment list in worker processes."""
+        self.start()
+        executor = self._executor
+        self.metrics["jobs"] += 1
+        try:
+            return await asyncio.wait_for(self._run(executor, file_path, filename), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.metrics["timeouts"] += 1
+            self._restart(executor)
+            raise HTTPException(status_code=504, detail=f"Text extraction timed out after {self.timeout:.0f} s")
+        except BrokenProcessPool:
+            crashed_here = self._executor is executor
+            self._restart(executor)
+            if retry and not crashed_here:
+                # Collateral of another job's timeout or crash: run it again on the new pool
+                return await self.extract(file_path, filename, retry=False)
+            self.metrics["failures"] += 1
+            raise HTTPException(status_code=500, detail="Text extraction worker crashed")
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, **self.metrics}
+
+
+extraction_pool = ExtractionPool(EXTRACTION_WORKERS, EXTRACTION_TIMEOUT_SECONDS, EXTRACTION_MAX_JOBS_PER_WORKER)
@@ -0,0 +1,376 @@
+# Batch ingestion of a whole course folder (e.g. 8-CollectedData) without going
+# through /extract_text one upload at a time.
+#
+#   python ingest.py "../../8-CollectedData" --out .cache/corpus [--workers 8] [--format jsonl.zst]
+#
+# Files are extracted in parallel worker processes (extraction_pool.py) and
+# written, one record per distinct file content, to part files in --out:
+#   part-00001.jsonl.zst   {"sha256", "filename", "text", "segments": [{"start", "end", "page", "slide", "kind"}]}
+#   manifest.json          path -> size, mtime, sha256 of every file seen, and which part holds each sha256
+#                          (plus the EXTRACTOR_VERSION they were extracted with)
+# A re-run only extracts files whose size / mtime changed *and* whose hash
+# changed; moved, renamed or duplicated files reuse the record already stored.
+# read_store(out) yields the current text of every file.
+import argparse
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import time
+from Extractors.segments import TextSegment
+from extraction_cache import EXTRACTOR_VERSION
+from extraction_pool import EXTRACTION_TIMEOUT_SECONDS, EXTRACTION_WORKERS, ExtractionPool
+from text_normalizer import clean_characters
+
+try:
+    import zstandard  # if this isn't working, run: pip install zstandard
+except ImportError:
+    zstandard = None
+
+# ---------------- CONFIG ---------------- #
+INGEST_EXTENSIONS = (".pdf", ".pptx", ".ppt", ".docx", ".doc")
+INGEST_FORMAT = os.getenv("INGEST_FORMAT", "jsonl.zst")  # jsonl.zst, jsonl.gz or parquet
+INGEST_ZSTD_LEVEL = int(os.getenv("INGEST_ZSTD_LEVEL", "10"))
+# Worker recycling (EXTRACTION_MAX_JOBS_PER_WORKER) is off for batch runs:
+# on Python 3.11, ProcessPoolExecutor can deadlock replacing a retired
+# worker while jobs are queued, which a long batch always hits
+INGEST_MAX_JOBS_PER_WORKER = int(os.getenv("INGEST_MAX_JOBS_PER_WORKER", "0")) or None
+# Records buffered per Parquet row group
+INGEST_PARQUET_ROWS = int(os.getenv("INGEST_PARQUET_ROWS", "64"))
+# Records per part file; the manifest is saved each time a part is finished,
+# so an interrupted run keeps everything up to its last finished part
+INGEST_PART_RECORDS = int(os.getenv("INGEST_PART_RECORDS", "256"))
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+# ---------------- RECORDS ---------------- #
+def build_record(sha256: str, filename: str, segments: list) -> dict:
+    """One stored document: the normalized text once, and each segment as a span of it."""
+    parts, spans, offset = [], [], 0
+    for segment in segments:
+        text = clean_characters(segment.text)
+        if not text.strip():
+            continue
+        parts.append(text)
+        spans.append({"start": offset, "end": offset + len(text), "page": segment.page,
+                      "slide": segment.slide, "kind": segment.kind})
+        offset += len(text)
+    return {"sha256": sha256, "filename": filename, "text": "".join(parts), "segments": spans}
+
+
+def record_segments(record: dict) -> list:
+    """The record's segments as TextSegment, ready for chunker.chunk_segments."""
+    text = record["text"]
+    return [TextSegment(text[span["start"]:span["end"]], span["page"], span["slide"], span["kind"])
+            for span in record["segments"]]
+
+
+# ---------------- PART FILES ---------------- #
+def part_format(name: str) -> str:
+    return name.split(".", 1)[1]
+
+
+class PartWriter:
+    """Appends records to one part file; nothing in it is referenced until the manifest is saved."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.format = part_format(os.path.basename(path))
+        self.records = 0
+        self._rows = []
+        self._parquet = None
+        if self.format == "parquet":
+            import pyarrow  # noqa: F401  # if this isn't working, run: pip install pyarrow
+            self._file = None
+        elif self.format == "jsonl.zst":
+            self._raw = open(path, "wb")
+            self._file = zstandard.ZstdCompressor(level=INGEST_ZSTD_LEVEL).stream_writer(self._raw)
+        else:
+            self._file = gzip.open(path, "wb")
+
+    def write(self, record: dict):
+        self.records += 1
+        if self.format != "parquet":
+            self._file.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+            return
+        self._rows.append(record)
+        if len(self._rows) >= INGEST_PARQUET_ROWS:
+            self._flush_parquet()
+
+    def _flush_parquet(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if not self._rows:
+            return
+        table = pa.Table.from_pylist(self._rows, schema=parquet_schema())
+        if self._parquet is None:
+            self._parquet = pq.ParquetWriter(self.path, table.schema, compression="zstd")
+        self._parquet.write_table(table)
+        self._rows = []
+
+    def close(self):
+        if self.format == "parquet":
+            self._flush_parquet()
+            if self._parquet is not None:
+                self._parquet.close()
+        elif self.format == "jsonl.zst":
+            self._file.close()  # also closes the raw file
+        else:
+            self._file.close()
+
+
+def parquet_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("sha256", pa.string()),
+        ("filename", pa.string()),
+        ("text", pa.large_string()),
+        ("segments", pa.list_(pa.struct([
+            ("start", pa.int64()), ("end", pa.int64()), ("page", pa.int32()), ("slide", pa.int32()), ("kind", pa.string()),
+        ]))),
+    ])
+
+
+def read_part(path: str):
+    """Yield the records of one part file."""
+    fmt = part_format(os.path.basename(path))
+    if fmt == "parquet":
+        import pyarrow.parquet as pq  # if this isn't working, run: pip install pyarrow
+        parquet = pq.ParquetFile(path)
+        for group in range(parquet.num_row_groups):
+            yield from parquet.read_row_group(group).to_pylist()
+        return
+    if fmt == "jsonl.zst":
+        with open(path, "rb") as raw:
+            stream = io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw), encoding="utf-8")
+            for line in stream:
+                yield json.loads(line)
+        return
+    with gzip.open(path, "rt", encoding="utf-8") as stream:
+        for line in stream:
+            yield json.loads(line)
+
+
+# ---------------- MANIFEST ---------------- #
+def load_manifest(out: str) -> dict:
+    path = os.path.join(out, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "files": {}, "parts": {}}
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"{path}: manifest version {manifest.get('version')}, expected {MANIFEST_VERSION}")
+    return manifest
+
+
+def save_manifest(out: str, manifest: dict):
+    # Written to a temp file and renamed, so a crash never leaves half a manifest
+    path = os.path.join(out, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def next_part_name(out: str, fmt: str) -> str:
+    numbers = [int(name[5:10]) for name in os.listdir(out) if re.match(r"part-\d{5}\.", name)]
+    return f"part-{max(numbers, default=0) + 1:05d}.{fmt}"
+
+
+def remove_unreferenced_parts(out: str, manifest: dict):
+    """Parts left by an interrupted run, or emptied by a compaction, are deleted."""
+    live = set(manifest["parts"].values())
+    for name in os.listdir(out):
+        if re.match(r"part-\d{5}\.", name) and name not in live:
+            os.remove(os.path.join(out, name))
+
+
+# ---------------- READING ---------------- #
+def read_store(out: str):
+    """Yield (relative path, record) for every file of the last run, part by part."""
+    manifest = load_manifest(out)
+    paths_by_hash = {}
+    for path, entry in manifest["files"].items():
+        if entry.get("sha256") in manifest["parts"]:
+            paths_by_hash.setdefault(entry["sha256"], []).append(path)
+    for part in sorted(set(manifest["parts"].values())):
+        for record in read_part(os.path.join(out, part)):
+            # A part may still hold records no file points to any more
+            if manifest["parts"].get(record["sha256"]) != part:
+                continue
+            for path in paths_by_hash.get(record["sha256"], []):
+                yield path, record
+
+
+# ---------------- INGESTION ---------------- #
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def scan(source: str) -> dict:
+    """Relative path -> absolute path of every supported file under `source`."""
+    found = {}
+    for root, dirs, names in os.walk(source):
+        dirs.sort()
+        for name in sorted(names):
+            if name.lower().endswith(INGEST_EXTENSIONS) and not name.startswith("~$"):
+                path = os.path.join(root, name)
+                found[os.path.relpath(path, source).replace(os.sep, "/")] = path
+    return found
+
+
+async def ingest(source: str, out: str, workers: int = EXTRACTION_WORKERS, fmt: str = INGEST_FORMAT,
+                 retry_errors: bool = False) -> dict:
+    """Bring the store in `out` up to date with `source`; returns what was done."""
+    os.makedirs(out, exist_ok=True)
+    manifest = load_manifest(out)
+    # Only parts the manifest on disk does not name; stale ones go after the next save
+    remove_unreferenced_parts(out, manifest)
+    # Stores written before the field existed hold the flat ("3") output
+    if manifest.get("extractor", "3") != EXTRACTOR_VERSION:
+        # The extractors' output changed: every file is extracted again
+        manifest["files"], manifest["parts"] = {}, {}
+    manifest["extractor"] = EXTRACTOR_VERSION
+    previous = manifest["files"]
+    files = scan(source)
+    report = {"files": len(files), "unchanged": 0, "extracted": 0, "reused": 0, "failed": 0,
+              "removed": len(set(previous) - set(files)), "bytes_read": 0}
+
+    pool = ExtractionPool(workers, EXTRACTION_TIMEOUT_SECONDS, INGEST_MAX_JOBS_PER_WORKER)
+    writer = None
+    done = False
+    written = {}  # sha256 -> part, for the records of the part still being written
+    current = {}
+    extracting = {}  # sha256 -> task, so duplicate files are extracted once
+    limit = asyncio.Semaphore(max(2 * workers, 2))
+
+    def finish_part():
+        # A part is only named in the manifest once it is closed and readable
+        nonlocal writer
+        if writer is not None:
+            writer.close()
+            writer = None
+            manifest["parts"].update(written)
+            written.clear()
+        # Until every file is visited, the ones not reached yet keep their entries
+        manifest["files"] = current if done else {**previous, **current}
+        save_manifest(out, manifest)
+
+    async def extract(path: str, sha256: str) -> str | None:
+        nonlocal writer
+        async with limit:
+            for attempt in range(2):
+                try:
+                    segments = await pool.extract(path, os.path.basename(path))
+                    error = next((segment.text for segment in segments if segment.kind == "error"), None)
+                    break
+                except Exception as e:  # timeouts and crashed workers come back as HTTPException; try once more
+                    error = str(getattr(e, "detail", e))
+        if error is not None:
+            return error.strip()
+        if writer is None:
+            writer = PartWriter(os.path.join(out, next_part_name(out, fmt)))
+        # Encoding and compression stay on the event loop thread: they are
+        # a small fraction of the extraction time, and one writer is not thread safe
+        writer.write(build_record(sha256, os.path.basename(path), segments))
+        written[sha256] = os.path.basename(writer.path)
+        if writer.records >= INGEST_PART_RECORDS:
+            finish_part()
+        return None
+
+    async def visit(relpath: str, path: str):
+        stat = os.stat(path)
+        entry = previous.get(relpath)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns \
+                and (entry.get("sha256") in manifest["parts"] or (entry.get("error") and not retry_errors)):
+            report["unchanged"] += 1
+            current[relpath] = entry
+            return
+        report["bytes_read"] += stat.st_size
+        sha256 = await asyncio.to_thread(file_sha256, path)
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+        current[relpath] = entry
+        if sha256 in manifest["parts"] and sha256 not in extracting:
+            report["reused"] += 1  # touched, moved, or a copy of a file already stored
+            return
+        if sha256 not in extracting:
+            extracting[sha256] = asyncio.ensure_future(extract(path, sha256))
+            report["extracted"] += 1
+        else:
+            report["reused"] += 1
+        error = await extracting[sha256]
+        if error is not None:
+            entry["error"] = error
+            report["failed"] += 1
+            print(f"Could not extract {relpath}: {error[:200]}")
+
+    try:
+        await asyncio.gather(*(visit(relpath, path) for relpath, path in files.items()))
+        # Records only the removed files used are dropped at the next compaction
+        done = True
+    finally:
+        pool.shutdown()
+        finish_part()
+        # Parts of an older EXTRACTOR_VERSION go only once the saved manifest no longer names them
+        remove_unreferenced_parts(out, manifest)
+    return report
+
+
+def compact(out: str, fmt: str = INGEST_FORMAT) -> dict:
+    """Rewrite the records still in use into one part and delete the others."""
+    manifest = load_manifest(out)
+    live = {entry["sha256"] for entry in manifest["files"].values() if entry.get("sha256") in manifest["parts"]}
+    writer = PartWriter(os.path.join(out, next_part_name(out, fmt)))
+    written = set()
+    for part in sorted(set(manifest["parts"].values())):
+        for record in read_part(os.path.join(out, part)):
+            if record["sha256"] in live and record["sha256"] not in written and manifest["parts"][record["sha256"]] == part:
+                writer.write(record)
+                written.add(record["sha256"])
+    writer.close()
+    manifest["parts"] = {sha256: os.path.basename(writer.path) for sha256 in written}
+    save_manifest(out, manifest)
+    remove_unreferenced_parts(out, manifest)
+    return {"records": len(written), "bytes": os.path.getsize(writer.path)}
+
+
+def store_size(out: str) -> int:
+    return sum(os.path.getsize(os.path.join(out, name)) for name in os.listdir(out) if name.startswith("part-"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract a folder of course files into a compressed, incremental text store.")
+    parser.add_argument("source", help="folder to walk, e.g. ../../8-CollectedData")
+    parser.add_argument("--out", default=os.path.join(".cache", "corpus"))
+    parser.add_argument("--workers", type=int, default=EXTRACTION_WORKERS)
+    parser.add_argument("--format", choices=("jsonl.zst", "jsonl.gz", "parquet"), default=INGEST_FORMAT)
+    parser.add_argument("--retry-errors", action="store_true", help="extract files that failed last time even if unchanged")
+    parser.add_argument("--compact", action="store_true", help="afterwards, rewrite the live records into a single part")
+    args = parser.parse_args()
+
+    fmt = args.format
+    if fmt == "jsonl.zst" and zstandard is None:
+        print("zstandard is not installed (pip install zstandard); writing jsonl.gz instead")
+        fmt = "jsonl.gz"
+
+    start = time.perf_counter()
+    report = asyncio.run(ingest(args.source, args.out, args.workers, fmt, args.retry_errors))
+    print(f"{report['files']} files: {report['extracted']} extracted, {report['reused']} reused, "
+          f"{report['unchanged']} unchanged, {report['failed']} failed, {report['removed']} removed; "
+          f"{report['bytes_read'] / 1e6:.1f} MB read in {time.perf_counter() - start:.1f} s")
+    if args.compact:
+        compacted = compact(args.out, fmt)
+        print(f"compacted to {compacted['records']} records")
+    print(f"store: {store_size(args.out) / 1e6:.2f} MB in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import json
+import os
+from contextlib import asynccontextmanager
+import httpx  # if this isn't working, run: pip install httpx
+
+# ---------------- CONFIG ---------------- #
+# One pooled client per LLM backend, opened once in the FastAPI lifespan and
+# reused by every chunk request so TCP/TLS setup is paid once per connection.
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "100"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "1") == "1"
+
+LM_TIMEOUT = httpx.Timeout(300.0)
+OPENROUTER_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def _http2_supported(base_url: str) -> bool:
+    """HTTP/2 is negotiated over TLS (ALPN) and needs the optional `h2` package."""
+    if not LLM_HTTP2 or not base_url.startswith("https://"):
+        return False
+    try:
+        import h2  # noqa: F401  # if this isn't working, run: pip install httpx[http2]
+    except ImportError:
+        return False
+    return True
+
+
+def _make_client(base_url: str, timeout: httpx.Timeout) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(
+        timeout=timeout,
+        limits=limits,
+        http2=_http2_supported(base_url),
+    )
+
+
+def get_llm_client(backend: str, base_url: str, timeout: httpx.Timeout) -> httpx.AsyncClient:
+    """Return the shared client for a backend, creating it on first use.
+
+    Outside the app (scripts, benchmarks) the client is created lazily here;
+    inside the app it already exists from the lifespan.
+    """
+    client = _clients.get(backend)
+    if client is None or client.is_closed:
+        client = _make_client(base_url, timeout)
+        _clients[backend] = client
+    return client
+
+
+async def close_llm_clients():
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+@asynccontextmanager
+async def llm_clients_lifespan(backends: dict[str, tuple[str, httpx.Timeout]]):
+    """Open one client per backend for the lifetime of the app."""
+    for name, (base_url, timeout) in backends.items():
+        get_llm_client(name, base_url, timeout)
+    try:
+        yield
+    finally:
+        await close_llm_clients()
+
+
+async def stream_chat_completion(client: httpx.AsyncClient, url: str, payload: dict, headers: dict | None = None):
+    """POST an OpenAI-style chat completion with stream=True and yield the content deltas.
+
+    Both LM Studio and OpenRouter answer with Server-Sent Events
+    (`data: {...}` lines, ending with `data: [DONE]`); `:` comment lines are
+    keep-alives and are skipped.
+    """
+    async with client.stream("POST", url, json={**payload, "stream": True}, headers=headers) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            event = json.loads(data)
+            if "error" in event:
+                raise Exception(event["error"].get("message", event["error"]))
+            choices = event.get("choices") or [{}]
+            delta = (choices[0].get("delta") or {}).get("content")
+            if delta:
+                yield delta
@@ -0,0 +1,571 @@
+import asyncio
+import json
+import os
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+import httpx  # if this isn't working, run: pip install httpx
+from llm_clients import get_llm_client, stream_chat_completion
+from telemetry import record_llm_call, stage
+
+# ---------------- CONFIG ---------------- #
+# Extra OpenAI-compatible backends, as a JSON list:
+#   [{"pool": "quiz", "name": "groq", "base_url": "https://api.groq.com/openai/v1",
+#     "model": "llama-3.1-70b", "api_key_env": "GROQ_API_KEY", "max_concurrency": 8}]
+# "pool" is "quiz" (/generate_quiz, OpenRouter by default) or "lm_studio" (/ask_ai_model).
+LLM_BACKENDS = os.getenv("LLM_BACKENDS", "")
+LLM_HEALTH_INTERVAL = float(os.getenv("LLM_HEALTH_INTERVAL", "15"))
+LLM_HEALTH_TIMEOUT = float(os.getenv("LLM_HEALTH_TIMEOUT", "3"))
+# Consecutive failures that open a backend's circuit, and how long it stays open
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+# Send the same request to a second backend when the first is slower than usual:
+# slower than this percentile of the backend's recent successful calls
+LLM_HEDGE = os.getenv("LLM_HEDGE", "1") == "1"
+LLM_HEDGE_MIN_SECONDS = float(os.getenv("LLM_HEDGE_MIN_SECONDS", "2"))
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_BACKEND_CONCURRENCY = int(os.getenv("LLM_BACKEND_CONCURRENCY", "32"))
+# Passes over the whole pool before a call gives up, with jittered exponential
+# backoff between them (base * 2^n, capped); a Retry-After header wins if longer
+LLM_RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "4"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "1"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "30"))
+# Longest Retry-After that is honoured as-is
+LLM_RETRY_AFTER_MAX_SECONDS = float(os.getenv("LLM_RETRY_AFTER_MAX_SECONDS", "120"))
+
+LATENCY_SMOOTHING = 0.2  # weight of the newest sample in the moving average
+LATENCY_WINDOW = 64      # recent successful call times kept per backend for the hedge percentile
+
+
+class LLMUnavailable(Exception):
+    """Every backend of a pool failed or is switched off."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class DeadlineExceeded(LLMUnavailable):
+    """The caller's deadline came before any backend answered."""
+
+    def __init__(self, message: str):
+        super().__init__(message, retryable=False)
+
+
+class BackendError(Exception):
+    """One backend gave no usable answer; the router tries another."""
+
+    def __init__(self, message: str, retryable: bool = True, throttled: bool = False):
+        super().__init__(message)
+        self.retryable = retryable  # worth asking again later (429, 5xx, network)
+        self.throttled = throttled  # rate limited: the backend is fine, just busy
+
+
+# ---------------- RETRIES ---------------- #
+@dataclass
+class RetryPolicy:
+    attempts: int = LLM_RETRY_ATTEMPTS
+    base: float = LLM_RETRY_BASE_SECONDS
+    cap: float = LLM_RETRY_MAX_SECONDS
+
+    def delay(self, attempt: int) -> float:
+        """Full jitter: uniform over [0, base * 2^attempt], so throttled callers spread out."""
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+
+def retry_after_seconds(value: str | None) -> float | None:
+    """Retry-After as seconds; it may be a number or an HTTP date."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), LLM_RETRY_AFTER_MAX_SECONDS)
+
+
+# ---------------- CIRCUIT BREAKER ---------------- #
+class CircuitBreaker:
+    """closed -> open after N straight failures -> half-open (one trial call) after a cooldown."""
+
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.threshold = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allows(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self.trial_running)
+
+    def on_start(self):
+        if self.state == "half_open":
+            self.trial_running = True
+
+    def on_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def on_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or (self.opened_at is None and self.failures >= self.threshold):
+            self.opened += 1
+            self.opened_at = time.monotonic()
+        self.trial_running = False
+
+
+# ---------------- BACKEND ---------------- #
+@dataclass
+class Backend:
+    name: str
+    base_url: str
+    model: str | None = None  # replaces the payload's model when set
+    api_key: str | None = None
+    max_concurrency: int = LLM_BACKEND_CONCURRENCY
+    timeout: httpx.Timeout = field(default_factory=lambda: httpx.Timeout(120.0, connect=10.0))
+    # live state
+    healthy: bool = True
+    paused_until: float = 0.0  # monotonic time a Retry-After asked us to wait for
+    in_flight: int = 0
+    latency: float = 1.0     # moving average of successful call time, seconds (first sample replaces it)
+    samples: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    metrics: dict = field(default_factory=lambda: {"requests": 0, "failures": 0, "throttled": 0, "hedges": 0, "hedges_won": 0})
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url.rstrip('/')}/chat/completions"
+
+    def headers(self) -> dict:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def body(self, payload: dict) -> dict:
+        return dict(payload, model=self.model) if self.model else payload
+
+    def pause(self, seconds: float | None):
+        if seconds:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def ready_in(self) -> float:
+        """Seconds until this backend takes calls again (Retry-After or open circuit)."""
+        now = time.monotonic()
+        wait = self.paused_until - now
+        if self.breaker.state == "open":
+            wait = max(wait, self.breaker.opened_at + self.breaker.cooldown - now)
+        return max(wait, 0.0)
+
+    def error_for(self, status: int, headers, code=None) -> BackendError:
+        """BackendError for an HTTP status (or an error body's code); honours Retry-After."""
+        status = int(code) if str(code).isdigit() else status
+        self.pause(retry_after_seconds(headers.get("Retry-After")))
+        if status == 429:
+            self.metrics["throttled"] += 1
+            return BackendError(f"{self.name}: rate limited (429)", throttled=True)
+        return BackendError(f"{self.name}: HTTP {status}", retryable=status >= 500 or status == 408)
+
+    def record_latency(self, seconds: float):
+        if self.samples:
+            self.latency += LATENCY_SMOOTHING * (seconds - self.latency)
+        else:
+            self.latency = seconds
+        self.samples.append(seconds)
+
+    def latency_percentile(self, percentile: float) -> float:
+        """`percentile` of the recent successful call times; the moving average before the first one."""
+        if not self.samples:
+            return self.latency
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(percentile / 100 * len(ordered)))]
+
+    def stats(self) -> dict:
+        return {
+            "base_url": self.base_url,
+            "model": self.model,
+            "healthy": self.healthy,
+            "paused_seconds": round(self.ready_in(), 2),
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.opened,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "latency_seconds": round(self.latency, 4),
+            "latency_p95_seconds": round(self.latency_percentile(95), 4),
+            **self.metrics,
+        }
+
+
+def configured_backends(pool: str) -> list:
+    """Backends from LLM_BACKENDS that belong to `pool`."""
+    if not LLM_BACKENDS.strip():
+        return []
+    backends = []
+    for entry in json.loads(LLM_BACKENDS):
+        if entry.get("pool") != pool:
+            continue
+        backends.append(Backend(
+            name=entry["name"],
+            base_url=entry["base_url"],
+            model=entry.get("model"),
+            api_key=os.getenv(entry["api_key_env"]) if entry.get("api_key_env") else entry.get("api_key"),
+            max_concurrency=int(entry.get("max_concurrency", LLM_BACKEND_CONCURRENCY)),
+        ))
+    return backends
+
+
+# ---------------- ROUTER ---------------- #
+class LLMRouter:
+    """Spreads chat completions over a pool of OpenAI-compatible backends.
+
+    Each call goes to a backend picked at random, weighted towards the
+    fastest, among those that are healthy, have a closed circuit and are
+    under their concurrency cap. A failed call moves on to the next backend.
+    A call slower than the backend usually is gets a hedge: the same request
+    goes to a second backend, the first answer wins and the other is cancelled.
+    """
+
+    def __init__(self, name: str, backends: list, hedge: bool = LLM_HEDGE, hedge_min: float = LLM_HEDGE_MIN_SECONDS,
+                 retry: RetryPolicy | None = None):
+        self.name = name
+        self.backends = list(backends)
+        self.hedge = hedge
+        self.hedge_min = hedge_min
+        self.retry = retry or RetryPolicy()
+        self._waiters = []  # futures of calls waiting for a backend under its cap
+        self._probe_task = None
+        self.metrics = {
+            "requests": 0, "failovers": 0, "hedged": 0, "retries": 0,
+            "unavailable": 0, "deadline_exceeded": 0,
+        }
+
+    # ---- picking ---- #
+    def _candidates(self, exclude: set) -> list:
+        now = time.monotonic()
+        usable = [b for b in self.backends if b.name not in exclude and b.breaker.allows() and b.paused_until <= now]
+        # Probes can be wrong or stale: when nothing looks healthy, still try the rest
+        return [b for b in usable if b.healthy] or usable
+
+    def _pick(self, exclude: set):
+        candidates = [b for b in self._candidates(exclude) if b.in_flight < b.max_concurrency]
+        if not candidates:
+            return None
+        return random.choices(candidates, weights=[1 / max(b.latency, 0.001) for b in candidates])[0]
+
+    def hedge_after(self, backend: Backend) -> float:
+        """The backend's slow-call time: a call taking longer than this gets hedged.
+
+        A high percentile of the recent calls: a single stall barely moves it,
+        so the next stall is still hedged early. Calls that lose a hedge race
+        are cancelled and never become samples. Before the first sample only
+        hedge_min applies, so the very first calls can be hedged too.
+        """
+        if not backend.samples:
+            return self.hedge_min
+        return max(self.hedge_min, backend.latency_percentile(LLM_HEDGE_PERCENTILE))
+
+    async def _acquire(self, exclude: set, deadline: float | None = None):
+        """A backend to call, waiting for capacity if every candidate is at its cap; None when none is left.
+
+        Raises DeadlineExceeded when `deadline` passes while still waiting.
+        """
+        while True:
+            if not self._candidates(exclude):
+                return None
+            backend = self._pick(exclude)
+            if backend is not None:
+                return backend
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            if deadline is None:
+                await waiter
+                continue
+            try:
+                await asyncio.wait_for(waiter, max(deadline - time.monotonic(), 0.0))
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"{self.name}: deadline reached waiting for a free backend") from None
+
+    def _claim(self, backend: Backend):
+        # Counted before any await so concurrent callers see the slot as taken
+        backend.in_flight += 1
+        backend.metrics["requests"] += 1
+        backend.breaker.on_start()
+
+    def _release(self, backend: Backend):
+        backend.in_flight -= 1
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _launch(self, backend: Backend, payload: dict) -> asyncio.Future:
+        self._claim(backend)
+        task = asyncio.ensure_future(self._call(backend, payload))
+        task.add_done_callback(lambda _: self._release(backend))
+        return task
+
+    # ---- calls ---- #
+    async def _call(self, backend: Backend, payload: dict) -> dict:
+        start = time.monotonic()
+        try:
+            client = get_llm_client(backend.name, backend.base_url, backend.timeout)
+            resp = await client.post(backend.url, json=backend.body(payload), headers=backend.headers())
+            if resp.status_code >= 400:
+                raise backend.error_for(resp.status_code, resp.headers)
+            data = resp.json()
+            if "error" in data:
+                # OpenRouter reports some upstream failures, 429s included, in a 200 body
+                error = data["error"] if isinstance(data["error"], dict) else {"message": data["error"]}
+                if str(error.get("code")).isdigit():
+                    raise backend.error_for(resp.status_code, resp.headers, error["code"])
+                raise BackendError(f"{backend.name}: {error.get('message', error)}")
+            if "choices" not in data:
+                raise BackendError(f"{backend.name}: unexpected response {str(data)[:200]}")
+        except asyncio.CancelledError:
+            backend.breaker.trial_running = False  # lost a hedge race: no verdict, no latency sample
+            raise
+        except (BackendError, httpx.HTTPError, ValueError) as e:
+            self._failed(backend, e, time.monotonic() - start)
+            if isinstance(e, BackendError):
+                raise
+            raise BackendError(f"{backend.name}: {e or type(e).__name__}") from e
+        elapsed = time.monotonic() - start
+        backend.record_latency(elapsed)
+        backend.breaker.on_success()
+        record_llm_call(self.name, backend.name, elapsed, "ok", data.get("usage"))
+        return data
+
+    def _failed(self, backend: Backend, error: Exception, elapsed: float):
+        backend.metrics["failures"] += 1
+        throttled = getattr(error, "throttled", False)
+        if throttled or not getattr(error, "retryable", True):
+            # Busy (429) or a rejected request (400, 413...): the backend itself is fine
+            backend.breaker.trial_running = False
+        else:
+            backend.breaker.on_failure()
+        record_llm_call(self.name, backend.name, elapsed, "throttled" if throttled else "error")
+
+    def _ready_in(self) -> float:
+        return min((backend.ready_in() for backend in self.backends), default=0.0)
+
+    async def _backoff(self, attempt: int, retry: RetryPolicy, deadline: float | None, error: LLMUnavailable):
+        """Wait before the next pass over the pool, or raise `error` when there will be none."""
+        if not error.retryable or attempt + 1 >= retry.attempts:
+            self.metrics["unavailable"] += 1
+            raise error
+        # Not before some backend is out of its Retry-After / open circuit
+        wait = max(retry.delay(attempt), self._ready_in())
+        if deadline is not None and time.monotonic() + wait >= deadline:
+            self.metrics["deadline_exceeded"] += 1
+            raise DeadlineExceeded(f"{self.name}: deadline reached, last error: {error}") from error
+        self.metrics["retries"] += 1
+        await asyncio.sleep(wait)
+
+    def _no_backend_left(self, errors: list) -> LLMUnavailable:
+        # Nothing tried (all paused or open) is worth retrying too
+        retryable = not errors or any(error.retryable for error in errors)
+        detail = errors[-1] if errors else "every backend is paused, switched off or none configured"
+        return LLMUnavailable(f"{self.name}: no backend left ({detail})", retryable)
+
+    async def chat_completion(self, payload: dict, deadline: float | None = None, retry: RetryPolicy | None = None) -> dict:
+        """The first successful completion from any backend in the pool.
+
+        When every backend has failed, the pool is tried again after a backoff,
+        up to `retry.attempts` passes and never past `deadline` (time.monotonic()).
+        """
+        retry = retry or self.retry
+        self.metrics["requests"] += 1
+        attempt = 0
+        with stage("llm", "chat_completion", pool=self.name) as span:
+            while True:
+                try:
+                    return await self._attempt(payload, deadline)
+                except DeadlineExceeded:
+                    self.metrics["deadline_exceeded"] += 1
+                    raise
+                except LLMUnavailable as error:
+                    await self._backoff(attempt, retry, deadline, error)
+                attempt += 1
+                if span is not None:
+                    span.set_attribute("retries", attempt)
+
+    async def _attempt(self, payload: dict, deadline: float | None) -> dict:
+        """One pass over the pool: failover and hedging, each backend tried at most once."""
+        tried, running = set(), {}
+        first, errors = None, []
+        hedged = False
+        try:
+            while True:
+                if not running:
+                    backend = await self._acquire(tried, deadline)
+                    if backend is None:
+                        raise self._no_backend_left(errors)
+                    if tried:
+                        self.metrics["failovers"] += 1
+                    first = first or backend
+                    tried.add(backend.name)
+                    running[self._launch(backend, payload)] = backend
+
+                # Only the first call is hedged, and only if another backend could take it
+                hedge_due = self.hedge and not hedged and len(running) == 1 and bool(self._candidates(tried))
+                timeout = self.hedge_after(next(iter(running.values()))) if hedge_due else None
+                if deadline is not None:
+                    left = max(deadline - time.monotonic(), 0.0)
+                    timeout = left if timeout is None else min(timeout, left)
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise DeadlineExceeded(f"{self.name}: deadline reached with calls still running")
+                    if hedge_due:
+                        hedged = True
+                        backend = self._pick(tried)
+                        if backend is not None:
+                            self.metrics["hedged"] += 1
+                            backend.metrics["hedges"] += 1
+                            tried.add(backend.name)
+                            running[self._launch(backend, payload)] = backend
+                    continue
+
+                for task in done:
+                    backend = running.pop(task)
+                    try:
+                        data = task.result()
+                    except BackendError as e:
+                        errors.append(e)
+                        continue
+                    if hedged and backend is not first:
+                        backend.metrics["hedges_won"] += 1
+                    return data
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def stream(self, payload: dict, deadline: float | None = None, retry: RetryPolicy | None = None):
+        """Yield content deltas from one backend.
+
+        Failover and retries (as in chat_completion) only happen before the
+        first delta; after that a BackendError is raised to the caller.
+        """
+        retry = retry or self.retry
+        self.metrics["requests"] += 1
+        tried, errors, attempt = set(), [], 0
+        while True:
+            try:
+                backend = await self._acquire(tried, deadline)
+            except DeadlineExceeded:
+                self.metrics["deadline_exceeded"] += 1
+                raise
+            if backend is None:
+                await self._backoff(attempt, retry, deadline, self._no_backend_left(errors))
+                tried, errors, attempt = set(), [], attempt + 1
+                continue
+            if tried:
+                self.metrics["failovers"] += 1
+            tried.add(backend.name)
+
+            self._claim(backend)
+            started = False
+            start = time.monotonic()
+            try:
+                client = get_llm_client(backend.name, backend.base_url, backend.timeout)
+                async for delta in stream_chat_completion(client, backend.url, backend.body(payload), backend.headers()):
+                    started = True
+                    yield delta
+            except Exception as e:  # HTTP errors, error events, bad JSON
+                if isinstance(e, httpx.HTTPStatusError):
+                    e = backend.error_for(e.response.status_code, e.response.headers)
+                self._failed(backend, e, time.monotonic() - start)
+                error = e if isinstance(e, BackendError) else BackendError(f"{backend.name}: {e or type(e).__name__}")
+                if started:  # part of the answer is already out
+                    if error is e:
+                        raise
+                    raise error from e
+                errors.append(error)
+                continue
+            finally:
+                self._release(backend)
+            elapsed = time.monotonic() - start
+            backend.record_latency(elapsed)
+            backend.breaker.on_success()
+            record_llm_call(self.name, backend.name, elapsed, "ok")
+            return
+
+    # ---- health probes ---- #
+    async def probe(self):
+        """GET /models on every backend; a backend that does not answer is skipped until it does."""
+        async def check(backend: Backend):
+            client = get_llm_client(backend.name, backend.base_url, backend.timeout)
+            try:
+                resp = await client.get(
+                    f"{backend.base_url.rstrip('/')}/models",
+                    headers=backend.headers(),
+                    timeout=LLM_HEALTH_TIMEOUT,
+                )
+                backend.healthy = resp.status_code < 500
+            except httpx.HTTPError:
+                backend.healthy = False
+
+        await asyncio.gather(*(check(backend) for backend in self.backends))
+
+    async def _probe_loop(self):
+        while True:
+            await self.probe()
+            await asyncio.sleep(LLM_HEALTH_INTERVAL)
+
+    def start(self):
+        if self._probe_task is None and LLM_HEALTH_INTERVAL > 0:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def stop(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            await asyncio.gather(self._probe_task, return_exceptions=True)
+            self._probe_task = None
+
+    def stats(self) -> dict:
+        return {**self.metrics, "backends": {b.name: b.stats() for b in self.backends}}
+
+
+# ---------------- REGISTRY ---------------- #
+routers: dict[str, LLMRouter] = {}
+
+
+def create_router(pool: str, default_backends: list) -> LLMRouter:
+    """The pool's router: its built-in backends plus any configured in LLM_BACKENDS."""
+    router = LLMRouter(pool, default_backends + configured_backends(pool))
+    routers[pool] = router
+    return router
+
+
+def router_backends() -> dict:
+    """name -> (base_url, timeout) of every backend, for llm_clients_lifespan."""
+    return {b.name: (b.base_url, b.timeout) for router in routers.values() for b in router.backends}
+
+
+def start_routers():
+    for router in routers.values():
+        router.start()
+
+
+async def stop_routers():
+    for router in routers.values():
+        await router.stop()
+
+
+def router_stats() -> dict:
+    return {name: router.stats() for name, router in routers.items()}
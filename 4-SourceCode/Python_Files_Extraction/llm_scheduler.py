@@ -0,0 +1,181 @@
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from telemetry import observe_stage
+
+# ---------------- CONFIG ---------------- #
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_PER_DOCUMENT_CONCURRENCY = int(os.getenv("LLM_PER_DOCUMENT_CONCURRENCY", "8"))
+
+# backend -> (requests per second, burst size)
+LLM_RATE_LIMITS = {
+    "openrouter": (float(os.getenv("OPENROUTER_RPS", "10")), int(os.getenv("OPENROUTER_BURST", "20"))),
+    "lm_studio": (float(os.getenv("LM_STUDIO_RPS", "4")), int(os.getenv("LM_STUDIO_BURST", "4"))),
+}
+
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# ---------------- TOKEN BUCKET ---------------- #
+class TokenBucket:
+    """Reservation-based token bucket: callers sleep until their token is due."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take one token and return how long to wait before using it."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        # Negative balance = queue of callers already holding future tokens
+        return -self.tokens / self.rate
+
+    async def acquire(self) -> float:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+# ---------------- SCHEDULER ---------------- #
+class LLMScheduler:
+    """Caps in-flight LLM calls globally and per document.
+
+    Free slots are handed out round-robin across documents that have work
+    waiting, so one huge upload cannot starve small ones queued behind it.
+    """
+
+    def __init__(self, max_concurrency: int, per_document_concurrency: int, rate_limits: dict):
+        self.max_concurrency = max_concurrency
+        self.per_document_concurrency = per_document_concurrency
+        self.buckets = {name: TokenBucket(rate, burst) for name, (rate, burst) in rate_limits.items()}
+
+        self._waiting: dict[str, deque] = {}
+        self._running: dict[str, int] = {}
+        self._round_robin: deque = deque()
+        self._active = 0
+
+        self.metrics = {
+            "granted": 0,
+            "max_queue_depth": 0,
+            "wait_seconds_sum": 0.0,
+            "wait_seconds_max": 0.0,
+            "wait_buckets": [0] * (len(WAIT_BUCKETS) + 1),
+            "rate_limited": {name: 0 for name in self.buckets},
+            "rate_limit_seconds_sum": {name: 0.0 for name in self.buckets},
+        }
+
+    # ---- dispatch ---- #
+    def _dispatch(self):
+        while self._active < self.max_concurrency and self._round_robin:
+            for _ in range(len(self._round_robin)):
+                document_id = self._round_robin[0]
+                self._round_robin.rotate(-1)
+                queue = self._waiting.get(document_id)
+                while queue and queue[0].cancelled():
+                    queue.popleft()  # its task is still unwinding out of slot()
+                if queue and self._running.get(document_id, 0) < self.per_document_concurrency:
+                    waiter = queue.popleft()
+                    self._active += 1
+                    self._running[document_id] = self._running.get(document_id, 0) + 1
+                    waiter.set_result(None)
+                    break
+            else:
+                return  # every waiting document is at its own cap
+
+    def _release(self, document_id: str):
+        self._active -= 1
+        self._running[document_id] -= 1
+        self._forget_if_idle(document_id)
+        self._dispatch()
+
+    def _forget_if_idle(self, document_id: str):
+        if not self._waiting.get(document_id) and not self._running.get(document_id):
+            self._waiting.pop(document_id, None)
+            self._running.pop(document_id, None)
+            if document_id in self._round_robin:
+                self._round_robin.remove(document_id)
+
+    def _record_wait(self, waited: float):
+        metrics = self.metrics
+        metrics["granted"] += 1
+        metrics["wait_seconds_sum"] += waited
+        metrics["wait_seconds_max"] = max(metrics["wait_seconds_max"], waited)
+        observe_stage("llm_wait", waited)
+        for i, bound in enumerate(WAIT_BUCKETS):
+            if waited <= bound:
+                metrics["wait_buckets"][i] += 1
+                break
+        else:
+            metrics["wait_buckets"][-1] += 1
+
+    # ---- public API ---- #
+    @asynccontextmanager
+    async def slot(self, document_id: str, backend: str):
+        """Wait for a fair share of LLM capacity, then for the backend rate limit."""
+        start = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+
+        if document_id not in self._waiting:
+            self._waiting[document_id] = deque()
+            self._round_robin.append(document_id)
+        self._waiting[document_id].append(waiter)
+        self.metrics["max_queue_depth"] = max(self.metrics["max_queue_depth"], self.queue_depth())
+        self._dispatch()
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release(document_id)
+            else:
+                queue = self._waiting.get(document_id)
+                if queue and waiter in queue:
+                    queue.remove(waiter)
+                self._forget_if_idle(document_id)
+            raise
+
+        try:
+            self._record_wait(time.monotonic() - start)
+            bucket = self.buckets.get(backend)
+            if bucket is not None:
+                delay = await bucket.acquire()
+                if delay > 0:
+                    self.metrics["rate_limited"][backend] += 1
+                    self.metrics["rate_limit_seconds_sum"][backend] += delay
+            yield
+        finally:
+            self._release(document_id)
+
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._waiting.values())
+
+    def stats(self) -> dict:
+        metrics = self.metrics
+        granted = metrics["granted"]
+        return {
+            "queue_depth": self.queue_depth(),
+            "queue_depth_by_document": {doc: len(q) for doc, q in self._waiting.items() if q},
+            "in_flight": self._active,
+            "max_concurrency": self.max_concurrency,
+            "per_document_concurrency": self.per_document_concurrency,
+            "max_queue_depth": metrics["max_queue_depth"],
+            "granted": granted,
+            "wait_seconds_avg": metrics["wait_seconds_sum"] / granted if granted else 0.0,
+            "wait_seconds_max": metrics["wait_seconds_max"],
+            "wait_seconds_buckets": dict(zip([*map(str, WAIT_BUCKETS), "+Inf"], metrics["wait_buckets"])),
+            "rate_limited": dict(metrics["rate_limited"]),
+            "rate_limit_seconds_sum": dict(metrics["rate_limit_seconds_sum"]),
+        }
+
+
+scheduler = LLMScheduler(LLM_MAX_CONCURRENCY, LLM_PER_DOCUMENT_CONCURRENCY, LLM_RATE_LIMITS)
@@ -0,0 +1,174 @@
+import os
+import re
+import threading
+import unicodedata
+import numpy as np  # if this isn't working, run: pip install numpy
+from question_parser import question_type_of
+
+# ---------------- CONFIG ---------------- #
+QUESTION_DEDUP = os.getenv("QUESTION_DEDUP", "1") == "1"
+# Estimated Jaccard similarity (of character shingles) above which two questions are the same
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.7"))
+DEDUP_SHINGLE = 4
+# 16 bands x 4 rows: pairs above ~0.5 similarity almost always share a bucket
+DEDUP_BANDS = 16
+DEDUP_ROWS = 4
+
+# ---------------- NORMALIZATION ---------------- #
+# Arabic harakat, superscript alef and tatweel carry no meaning for matching
+ARABIC_MARKS = re.compile("[ؐ-ًؚ-ٰٟۖ-ۭـ]")
+ARABIC_LETTERS = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ة": "ه", "ؤ": "و", "ئ": "ي"})
+# Eastern Arabic digits -> ASCII so "٣" and "3" match
+ARABIC_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")
+NON_WORD = re.compile(r"[\W_]+")
+OPTION_PREFIX = re.compile(r"^\s*\(?[A-Ha-h]\s*[\)\.:\-]\s*")
+
+
+def normalize_question_text(text: str) -> str:
+    """Casefolded Arabic/English text without diacritics, letter variants or punctuation."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = ARABIC_MARKS.sub("", text).translate(ARABIC_LETTERS).translate(ARABIC_DIGITS)
+    return NON_WORD.sub(" ", text).strip()
+
+
+def question_signature_text(question: dict) -> str:
+    """What makes two questions the same: the stem and the correct answer, not option order."""
+    answer = OPTION_PREFIX.sub("", question.get("answer", ""), count=1)
+    return normalize_question_text(f"{question.get('question', '')} {answer}")
+
+
+def question_quality(question: dict) -> tuple:
+    """Higher is better-formed; the best variant of each duplicate group is kept."""
+    text = question.get("question", "").strip()
+    options = question.get("options", [])
+    return (
+        min(len(options), 4),
+        len(set(options)) == len(options),
+        text.endswith(("?", "؟")) or "options" not in question,
+        min(len(text), 300),
+    )
+
+
+# ---------------- MINHASH ---------------- #
+_rng = np.random.default_rng(0)
+# Multiply-shift hashing: (a * x + b) mod 2**64, top 32 bits; a is odd
+PERM_A = _rng.integers(0, 1 << 63, size=DEDUP_BANDS * DEDUP_ROWS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+PERM_B = _rng.integers(0, 1 << 63, size=DEDUP_BANDS * DEDUP_ROWS, dtype=np.uint64)
+SHINGLE_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+SHIFT = np.uint64(32)
+
+
+def shingle_hashes(texts: list) -> tuple[np.ndarray, np.ndarray]:
+    """64-bit hashes of every character shingle of every text, and where each text's run starts.
+
+    All texts are hashed in one pass over their concatenated code points.
+    """
+    texts = [text.ljust(DEDUP_SHINGLE, "\0") for text in texts]
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    points = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+
+    count = len(points) - DEDUP_SHINGLE + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for offset in range(DEDUP_SHINGLE):
+            hashes = hashes * SHINGLE_MULTIPLIER + points[offset:offset + count]
+
+    # Drop the shingles that run across the end of a text into the next one
+    ends = np.cumsum(lengths)
+    valid = np.ones(count, dtype=bool)
+    for back in range(1, DEDUP_SHINGLE):
+        crossing = ends - back
+        valid[crossing[crossing < count]] = False
+    per_text = lengths - DEDUP_SHINGLE + 1
+    starts = np.concatenate(([0], np.cumsum(per_text)[:-1]))
+    return hashes[valid], starts
+
+
+def minhash_signatures(texts: list) -> np.ndarray:
+    """(len(texts), perms) MinHash signatures, computed for all texts at once."""
+    hashes, starts = shingle_hashes(texts)
+    signatures = np.empty((len(texts), len(PERM_A)), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for perm, (a, b) in enumerate(zip(PERM_A, PERM_B)):
+            signatures[:, perm] = np.minimum.reduceat((a * hashes + b) >> SHIFT, starts)
+    return signatures
+
+
+# ---------------- DEDUP ---------------- #
+class DedupStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.metrics = {"runs": 0, "questions": 0, "removed": 0}
+
+    def record(self, questions: int, removed: int):
+        with self._lock:
+            self.metrics["runs"] += 1
+            self.metrics["questions"] += questions
+            self.metrics["removed"] += removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.metrics)
+
+
+dedup_stats = DedupStats()
+
+
+def _find(parent: list, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def duplicate_positions(questions: list, threshold: float = DEDUP_THRESHOLD) -> set:
+    """Positions of questions that repeat an earlier or better-formed one.
+
+    Candidates come from LSH buckets (a shared band of the MinHash signature),
+    so the work grows with the number of questions, not its square. Each
+    bucket is checked against its first member only; MCQ and True/False are
+    never merged with each other.
+    """
+    if len(questions) < 2:
+        return set()
+    kinds = [question_type_of(question) for question in questions]
+    signatures = minhash_signatures([question_signature_text(question) for question in questions])
+
+    kinds = np.array([kind == "multiple_choice" for kind in kinds])
+    parent = list(range(len(questions)))
+    for band in range(DEDUP_BANDS):
+        rows = np.ascontiguousarray(signatures[:, band * DEDUP_ROWS:(band + 1) * DEDUP_ROWS])
+        _, bucket_of = np.unique(rows.view(f"V{rows.shape[1] * 8}").ravel(), return_inverse=True)
+        bucket_of = bucket_of.ravel()
+        # Sort by bucket, then pair every member with the first of its bucket
+        order = np.argsort(bucket_of, kind="stable")
+        sorted_buckets = bucket_of[order]
+        new_bucket = np.concatenate(([True], sorted_buckets[1:] != sorted_buckets[:-1]))
+        firsts = order[np.flatnonzero(new_bucket)][np.cumsum(new_bucket) - 1]
+        pairs = firsts != order
+        firsts, others = firsts[pairs], order[pairs]
+        if not len(others):
+            continue
+        agreement = (signatures[others] == signatures[firsts]).mean(axis=1)
+        similar = (agreement >= threshold) & (kinds[others] == kinds[firsts])
+        for first, other in zip(firsts[similar].tolist(), others[similar].tolist()):
+            root, other_root = _find(parent, first), _find(parent, other)
+            if root != other_root:
+                parent[other_root] = root
+
+    best = {}
+    for i in range(len(questions)):
+        root = _find(parent, i)
+        if root not in best or question_quality(questions[i]) > question_quality(questions[best[root]]):
+            best[root] = i
+    keep = set(best.values())
+    return {i for i in range(len(questions)) if i not in keep}
+
+
+def dedupe_questions(questions: list) -> tuple[list, int]:
+    """(questions without near-duplicates, in their original order; how many were removed)."""
+    if not QUESTION_DEDUP:
+        return questions, 0
+    dropped = duplicate_positions(questions)
+    dedup_stats.record(len(questions), len(dropped))
+    return [question for i, question in enumerate(questions) if i not in dropped], len(dropped)
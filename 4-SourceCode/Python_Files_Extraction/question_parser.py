@@ -0,0 +1,242 @@
+import json
+import re
+import threading
+from question_stream import QuestionStreamParser, loads_lenient
+from telemetry import stage
+
+# ---------------- TOLERANT QUESTION PARSER ---------------- #
+# One scan over the model output recovers every complete question object,
+# whatever surrounds it (code fences, prose, {"questions": [...]} wrappers, a
+# completion cut off mid-object), then each object is checked against the
+# MCQ / True-False schema and normalized. Only output with nothing usable in
+# it is worth paying for again.
+
+TRUE_WORDS = {"true", "t", "yes", "correct", "صح", "صحيح", "نعم"}
+FALSE_WORDS = {"false", "f", "no", "incorrect", "خطأ", "خطا", "غلط", "خاطئ", "لا"}
+# "A)", "(b)", "C.", "d -", "A:" at the start of an option or answer
+OPTION_LETTER = re.compile(r"^\s*\(?([A-Ha-h])\s*[\)\.:\-]\s*")
+LETTER_ONLY = re.compile(r"^\s*\(?([A-Ha-h])\)?\.?\s*$")
+
+
+def _clean_text(value) -> str:
+    return value.strip() if isinstance(value, str) else ""
+
+
+def _strip_letter(option: str) -> str:
+    return OPTION_LETTER.sub("", option, count=1).strip().casefold()
+
+
+def resolve_mcq_answer(answer, options: list) -> str | None:
+    """Map the model's answer onto the full text of one of the options."""
+    if isinstance(answer, int) and not isinstance(answer, bool):
+        return options[answer] if 0 <= answer < len(options) else None
+    answer = _clean_text(answer)
+    if not answer:
+        return None
+    if answer in options:
+        return answer
+
+    letter = LETTER_ONLY.match(answer) or OPTION_LETTER.match(answer)
+    by_letter = None
+    if letter:
+        index = ord(letter.group(1).upper()) - ord("A")
+        if index < len(options):
+            by_letter = options[index]
+    if LETTER_ONLY.match(answer):
+        return by_letter
+
+    # "Extracting useful knowledge" vs "A) Extracting useful knowledge"
+    wanted = _strip_letter(answer)
+    for option in options:
+        if _strip_letter(option) == wanted:
+            return option
+    return by_letter
+
+
+def normalize_mcq(obj: dict) -> dict | None:
+    question = _clean_text(obj.get("question"))
+    options = obj.get("options", obj.get("choices"))
+    if not question or not isinstance(options, list):
+        return None
+    options = [_clean_text(option) for option in options]
+    if len(options) < 2 or not all(options) or len(set(options)) != len(options):
+        return None
+    answer = resolve_mcq_answer(obj.get("answer", obj.get("correct_answer")), options)
+    if answer is None:
+        return None
+    return {"question": question, "options": options, "answer": answer}
+
+
+def normalize_tf(obj: dict) -> dict | None:
+    question = _clean_text(obj.get("question"))
+    answer = obj.get("answer", obj.get("correct_answer"))
+    if not question:
+        return None
+    if isinstance(answer, bool):
+        return {"question": question, "answer": "True" if answer else "False"}
+    word = _clean_text(answer).strip(".!").casefold()
+    if word in TRUE_WORDS:
+        return {"question": question, "answer": "True"}
+    if word in FALSE_WORDS:
+        return {"question": question, "answer": "False"}
+    return None
+
+
+def normalize_mixed(obj: dict) -> dict | None:
+    """Either type in one completion: objects with options are MCQs, the rest True/False."""
+    if "options" in obj or "choices" in obj:
+        return normalize_mcq(obj)
+    return normalize_tf(obj)
+
+
+NORMALIZERS = {"mcq": normalize_mcq, "tf": normalize_tf, "mixed": normalize_mixed}
+
+
+def question_type_of(question: dict) -> str:
+    """Response key for a normalized question."""
+    return "multiple_choice" if "options" in question else "true_false"
+
+
+def split_by_type(questions: list) -> dict:
+    split = {"multiple_choice": [], "true_false": []}
+    for question in questions:
+        split[question_type_of(question)].append(question)
+    return split
+
+
+# ---------------- STATS ---------------- #
+class ParseStats:
+    """Totals over every parsed completion, for /stats."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.metrics = {
+            "completions": 0,
+            "clean": 0,              # plain JSON, nothing to fix
+            "recovered": 0,          # needed fixing (fences, prose, truncation, commas, bad items) but gave questions
+            "unrecoverable": 0,      # nothing usable, worth a re-request
+            "questions_valid": 0,
+            "questions_dropped": 0,  # found but failed the schema
+            "questions_repaired": 0,
+            "truncated": 0,
+        }
+
+    def record(self, report: dict):
+        with self._lock:
+            self.metrics["completions"] += 1
+            self.metrics["clean"] += report["clean"]
+            self.metrics["recovered"] += report["recovered"]
+            self.metrics["unrecoverable"] += report["unrecoverable"]
+            self.metrics["questions_valid"] += report["valid"]
+            self.metrics["questions_dropped"] += report["dropped"]
+            self.metrics["questions_repaired"] += report["repaired"]
+            self.metrics["truncated"] += report["truncated"]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.metrics)
+
+
+parse_stats = ParseStats()
+
+
+# ---------------- PARSE ---------------- #
+def _is_empty_answer(raw: str) -> bool:
+    """The model deliberately returned no questions ([] or {"questions": []})."""
+    try:
+        parsed = json.loads(raw.strip().strip("`").removeprefix("json").strip())
+    except (json.JSONDecodeError, AttributeError):
+        return False
+    return parsed == [] or (isinstance(parsed, dict) and parsed.get("questions") == [])
+
+
+def build_report(found: int, valid: int, raw: str, repaired: int = 0, truncated: bool = False, wrapped: bool = False) -> dict:
+    """Recovery stats for one completion; also added to the /stats totals."""
+    needed_fixing = bool(truncated or wrapped or repaired or found > valid)
+    report = {
+        "found": found,
+        "valid": valid,
+        "dropped": found - valid,
+        "repaired": repaired,
+        "truncated": truncated,
+        "wrapped": wrapped,
+        "clean": not needed_fixing and valid > 0,
+        "recovered": needed_fixing and valid > 0,
+        "unrecoverable": valid == 0 and not _is_empty_answer(raw),
+    }
+    parse_stats.record(report)
+    return report
+
+
+def merge_reports(reports: list) -> dict:
+    """One report for a question set that was generated over several completions."""
+    merged = {"chunks": len(reports)}
+    for key in ("found", "valid", "dropped", "repaired", "attempts"):
+        merged[key] = sum(report.get(key, 0) for report in reports)
+    for key in ("truncated", "wrapped", "recovered"):
+        merged[key] = any(report.get(key) for report in reports)
+    merged["clean"] = bool(reports) and all(report.get("clean") for report in reports)
+    merged["unrecoverable"] = bool(reports) and all(report.get("unrecoverable") for report in reports)
+    return merged
+
+
+def scanner_report(scanner: QuestionStreamParser, found: int, valid: int) -> dict:
+    return build_report(found, valid, scanner.raw, scanner.repaired, scanner.truncated, scanner.noise > 0)
+
+
+def _decode_whole(raw: str):
+    """Fast path: the JSON between the first bracket and the last one parses as-is.
+
+    Returns (question objects, text around the JSON?, trailing commas removed?)
+    or None to fall back to the scanner.
+    """
+    starts = [i for i in (raw.find("["), raw.find("{")) if i != -1]
+    if not starts:
+        return None
+    start, end = min(starts), max(raw.rfind("]"), raw.rfind("}"))
+    if end < start:
+        return None
+    parsed, repaired = loads_lenient(raw[start:end + 1])
+    if parsed is None:
+        return None
+    if isinstance(parsed, dict):
+        parsed = [parsed] if "question" in parsed else parsed.get("questions")
+    if not isinstance(parsed, list):
+        return None
+    found = [obj for obj in parsed if isinstance(obj, dict) and "question" in obj]
+    return found, bool(raw[:start].strip() or raw[end + 1:].strip()), repaired
+
+
+@stage("parse")
+def parse_questions(raw: str, quiz_type: str, keep: tuple = ()) -> tuple[list, dict]:
+    """Recover and validate the questions in one completion.
+
+    Well-formed JSON (with or without fences/prose around it) is decoded in
+    one C-level json.loads; anything else goes through the incremental scanner.
+    Returns (questions, report). `report["unrecoverable"]` is True only when
+    the output held no valid question and was not a deliberate empty answer.
+    Keys listed in `keep` (e.g. "chunk" in batched prompts) are copied over
+    from the model's object when present.
+    """
+    raw = raw or ""
+    normalize = NORMALIZERS[quiz_type]
+    whole = _decode_whole(raw)
+    if whole is not None:
+        found, wrapped, repaired = whole
+        scanner = None
+    else:
+        scanner = QuestionStreamParser()
+        found = scanner.feed(raw)
+
+    questions = []
+    for obj in found:
+        question = normalize(obj)
+        if question is not None:
+            for key in keep:
+                if key in obj:
+                    question[key] = obj[key]
+            questions.append(question)
+
+    if scanner is None:
+        return questions, build_report(len(found), len(questions), raw, int(repaired), wrapped=wrapped)
+    return questions, scanner_report(scanner, len(found), len(questions))
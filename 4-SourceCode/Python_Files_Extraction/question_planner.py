@@ -0,0 +1,210 @@
+import asyncio
+import heapq
+import math
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from question_parser import question_type_of
+from question_stream import merge_streams
+
+# ---------------- QUESTION BUDGET PLANNER ---------------- #
+# A quiz of N questions does not need every chunk of a 300-page document.
+# The planner picks just enough chunks, spread evenly over the text, gives
+# each a quota in proportion to how much text it holds, and asks the model
+# for exactly that many. Chunks that come back short are topped up from
+# reserve chunks; once the budget is met nothing else is scheduled.
+
+# Questions asked of one chunk when there is text to spare
+PLAN_QUESTIONS_PER_CHUNK = int(os.getenv("PLAN_QUESTIONS_PER_CHUNK", "5"))
+# Hard cap per chunk, used when the document is short for the budget
+PLAN_MAX_QUESTIONS_PER_CHUNK = int(os.getenv("PLAN_MAX_QUESTIONS_PER_CHUNK", "10"))
+# A chunk supports about one question per this many tokens of text
+PLAN_TOKENS_PER_QUESTION = int(os.getenv("PLAN_TOKENS_PER_QUESTION", "60"))
+
+
+@dataclass
+class QuestionPlan:
+    budget: int
+    quotas: dict                                  # chunk index -> questions to ask for
+    reserve: list = field(default_factory=list)   # unused chunks, best first, for top-ups
+    capacity: dict = field(default_factory=dict)  # chunk index -> most questions it can take
+
+    @property
+    def planned(self) -> int:
+        return sum(self.quotas.values())
+
+
+def chunk_capacity(tokens: int) -> int:
+    return max(1, min(PLAN_MAX_QUESTIONS_PER_CHUNK, tokens // PLAN_TOKENS_PER_QUESTION))
+
+
+def allocate(budget: int, weights: dict, caps: dict) -> dict:
+    """Split `budget` over the keys of `weights` proportionally (highest averages), never above `caps`."""
+    quotas = {key: 0 for key in weights}
+    heap = [(-weight, key) for key, weight in weights.items() if caps[key] > 0]
+    heapq.heapify(heap)
+    for _ in range(budget):
+        if not heap:
+            break
+        _, key = heapq.heappop(heap)
+        quotas[key] += 1
+        if quotas[key] < caps[key]:
+            heapq.heappush(heap, (-weights[key] / (quotas[key] + 1), key))
+    return quotas
+
+
+def spread(weights: list, count: int) -> list:
+    """`count` chunk indexes evenly spaced over the document's text (by cumulative weight)."""
+    total = sum(weights)
+    chosen, position, edge = [], 0, 0
+    for step in range(count):
+        target = (step + 0.5) * total / count
+        while position < len(weights) - 1 and edge + weights[position] <= target:
+            edge += weights[position]
+            position += 1
+        if not chosen or chosen[-1] != position:
+            chosen.append(position)
+    return chosen
+
+
+def plan_questions(weights: list, budget: int) -> QuestionPlan:
+    """Choose chunks and per-chunk quotas for `budget` questions; `weights` are chunk token counts."""
+    capacity = {index: chunk_capacity(tokens) for index, tokens in enumerate(weights)}
+    if budget <= 0 or not weights:
+        return QuestionPlan(budget, {}, [], capacity)
+
+    # Fewest chunks that can hold the budget at the comfortable per-chunk rate
+    count = min(len(weights), math.ceil(budget / PLAN_QUESTIONS_PER_CHUNK))
+    while True:
+        chosen = spread(weights, count)
+        if sum(capacity[index] for index in chosen) >= budget or count >= len(weights):
+            break
+        count += 1
+    if sum(capacity[index] for index in chosen) < budget:
+        chosen = list(range(len(weights)))  # short document: every chunk, up to its capacity
+
+    quotas = allocate(budget, {index: weights[index] for index in chosen}, capacity)
+    quotas = {index: quota for index, quota in quotas.items() if quota}
+    reserve = sorted((index for index in range(len(weights)) if index not in quotas), key=lambda index: -weights[index])
+    return QuestionPlan(budget, quotas, reserve, capacity)
+
+
+def drop_duplicates(questions: dict, find_duplicates):
+    """Remove repeats across chunks in place, keeping the document order of the rest."""
+    flat = [(index, question) for index in sorted(questions) for question in questions[index]]
+    dropped = find_duplicates([question for _, question in flat])
+    if not dropped:
+        return
+    for index in questions:
+        questions[index] = []
+    for position, (index, question) in enumerate(flat):
+        if position not in dropped:
+            questions[index].append(question)
+
+
+async def fill_budget(plan: QuestionPlan, generate, find_duplicates=None, counts: dict | None = None) -> tuple[dict, dict]:
+    """Run the plan, topping up from reserve chunks until the budget is met or they run out.
+
+    `generate(index, quota)` returns (questions, report) for one chunk. Returns
+    ({chunk index: questions}, {chunk index: report}); extra questions are trimmed.
+    `find_duplicates(questions) -> positions` (see question_dedup.py) drops repeats
+    after every wave, so duplicates count as missing and get topped up too.
+    With `counts` ({question type: count}, adding up to plan.budget) every type
+    has a budget of its own: quotas are {type: quota} dicts, chunks are trimmed
+    per type and only the types that came back short are topped up.
+    """
+    questions, reports = {}, {}
+    wave = dict(plan.quotas) if counts is None else split_quotas(plan.quotas, counts)
+    reserve = list(plan.reserve)
+    while wave:
+        results = await asyncio.gather(*(generate(index, quota) for index, quota in wave.items()))
+        for (index, quota), (found, report) in zip(wave.items(), results):
+            questions[index] = found[:quota] if counts is None else trim_types(found, quota)
+            reports[index] = dict(report, quota=quota)
+        if find_duplicates is not None:
+            drop_duplicates(questions, find_duplicates)
+
+        if counts is not None:
+            found = Counter(question_type_of(question) for chunk in questions.values() for question in chunk)
+            wave = top_up(reserve, plan.capacity, {key: count - found[key] for key, count in counts.items()})
+            continue
+        missing = plan.budget - sum(len(found) for found in questions.values())
+        wave = {}
+        while missing > 0 and reserve:
+            index = reserve.pop(0)
+            wave[index] = min(missing, plan.capacity[index])
+            missing -= wave[index]
+    return questions, reports
+
+# ---------------- TYPED BUDGETS ---------------- #
+# A mixed quiz asks one chunk for several question types at once. Each
+# chunk's quota is shared out between the types, and a type that comes back
+# short is topped up on its own, so one type never stands in for another.
+
+def split_quotas(quotas: dict, counts: dict) -> dict:
+    """{chunk index: {type: quota}}, sharing each chunk's quota in proportion to what each type still needs."""
+    left = dict(counts)
+    split = {}
+    for index in sorted(quotas):
+        split[index] = allocate(quotas[index], left, left)
+        for key, quota in split[index].items():
+            left[key] -= quota
+    return split
+
+
+def trim_types(questions: list, quotas: dict) -> list:
+    """The first questions of each type, up to its quota, in their original order."""
+    taken = Counter()
+    kept = []
+    for question in questions:
+        key = question_type_of(question)
+        if taken[key] < quotas.get(key, 0):
+            taken[key] += 1
+            kept.append(question)
+    return kept
+
+
+def top_up(reserve: list, capacity: dict, missing: dict) -> dict:
+    """Next wave {chunk index: {type: quota}} for the `missing` questions of each type; takes chunks off `reserve`."""
+    missing = {key: count for key, count in missing.items() if count > 0}
+    wave = {}
+    while missing and reserve:
+        index = reserve.pop(0)
+        wave[index] = allocate(min(sum(missing.values()), capacity[index]), missing, missing)
+        missing = {key: count - wave[index][key] for key, count in missing.items() if count > wave[index][key]}
+    return wave
+
+
+async def stream_budget(plan: QuestionPlan, counts: dict, stream_chunk):
+    """Streaming counterpart of fill_budget for one or more question types.
+
+    `counts` maps type -> questions wanted (they add up to plan.budget).
+    `stream_chunk(index, quotas)` yields (type, question) for one chunk, or
+    ("error", detail) when the chunk failed. Yields (index, type, question)
+    and (index, "error", detail). Each chunk is held to its quota per type,
+    types that come back short are topped up from reserve chunks, and the
+    generator returns as soon as every count is met, or after a wave in which
+    every chunk failed (the backend is down; more chunks would fail the same way).
+    """
+    sent = dict.fromkeys(counts, 0)
+    reserve = list(plan.reserve)
+    wave = split_quotas(plan.quotas, counts)
+    while wave:
+        taken = {index: dict.fromkeys(quotas, 0) for index, quotas in wave.items()}
+        failed = set()
+        streams = {index: stream_chunk(index, quotas) for index, quotas in wave.items() if any(quotas.values())}
+        async for index, (key, item) in merge_streams(streams):
+            if key == "error":
+                failed.add(index)
+                yield index, key, item
+                continue
+            if taken[index].get(key, 0) >= wave[index].get(key, 0):
+                continue  # more of this type than the chunk was asked for
+            taken[index][key] += 1
+            sent[key] += 1
+            yield index, key, item
+            if sent == counts:
+                return
+        if failed and failed == set(streams):
+            return
+        wave = top_up(reserve, plan.capacity, {key: counts[key] - sent[key] for key in counts})
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import re
+
+# ---------------- LENIENT JSON ---------------- #
+# A whole JSON string, or a comma followed only by whitespace and a closing bracket
+TRAILING_COMMA = re.compile(r'("(?:[^"\\]|\\.)*")|,(\s*[}\]])', re.DOTALL)
+
+
+def strip_trailing_commas(text: str) -> str:
+    """Drop commas directly before } or ] (outside strings), a common model slip."""
+    return TRAILING_COMMA.sub(lambda m: m.group(1) or m.group(2), text)
+
+
+def loads_lenient(text: str):
+    """(value, repaired): json.loads, retried once without trailing commas; value is None when it still fails."""
+    try:
+        return json.loads(text), False
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(strip_trailing_commas(text)), True
+    except json.JSONDecodeError:
+        return None, False
+
+
+# ---------------- INCREMENTAL QUESTION PARSER ---------------- #
+# Completions are streamed token by token. Instead of waiting for the whole
+# JSON document, the parser tracks strings and brace depth as text arrives and
+# hands back every question object the moment its closing brace is seen.
+# Works for a bare array ([{...}, {...}]) and for wrapper objects
+# ({"questions": [{...}]}); code fences or prose around the JSON are skipped.
+
+
+# Outside strings only these characters matter; string bodies are skipped whole
+STRUCTURAL = re.compile(r'[{}"]')
+STRING_REST = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+NOISE = re.compile(r"[^\s\[\],]")
+
+
+class QuestionStreamParser:
+    """feed() completion deltas, get back the question objects they completed."""
+
+    def __init__(self, required_key: str = "question"):
+        self.required_key = required_key
+        self.questions = []
+        self._text = ""
+        self._pos = 0           # next character to scan in _text
+        self._starts = []       # offsets of the currently open "{"
+        self._last_found = -1   # start offset of the last question found
+        self.repaired = 0       # questions that only parsed after removing trailing commas
+        self.noise = 0          # stretches of text outside the JSON (fences, prose)
+        self._in_string = False
+        self._raw = []          # every delta, kept for error messages
+
+    @property
+    def raw(self) -> str:
+        return "".join(self._raw)
+
+    def feed(self, delta: str) -> list:
+        self._raw.append(delta)
+        self._text += delta
+        found = []
+        text = self._text
+        i = self._pos
+        gap = i  # start of the text not yet checked for noise
+        while True:
+            if self._in_string:
+                end = STRING_REST.match(text, i)
+                if end is None:
+                    break  # string continues in the next delta; rescan it from i then
+                i = end.end()
+                self._in_string = False
+                continue
+
+            match = STRUCTURAL.search(text, i)
+            if match is None:
+                i = len(text)
+                break
+            i = match.start()
+            char = text[i]
+            if not self._starts:
+                if char != "{" or NOISE.search(text, gap, i):
+                    self.noise += 1
+                gap = i + 1
+            i += 1
+
+            if char == '"':
+                # Quotes only open strings inside objects; outside they are prose
+                self._in_string = bool(self._starts)
+            elif char == "{":
+                self._starts.append(i - 1)
+            elif self._starts:
+                start = self._starts.pop()
+                gap = i
+                if start < self._last_found:
+                    continue  # a wrapper around questions already found: no need to decode it again
+                obj, repaired = loads_lenient(text[start:i])
+                if isinstance(obj, dict) and self.required_key in obj:
+                    found.append(obj)
+                    self._last_found = start
+                    self.repaired += repaired
+
+        if not self._starts and NOISE.search(text, gap):
+            self.noise += 1
+        self._pos = i
+        if not self._starts:
+            # Nothing open: everything scanned so far can be dropped
+            self._text, self._pos, self._last_found = "", 0, -1
+        self.questions.extend(found)
+        return found
+
+    @property
+    def truncated(self) -> bool:
+        """True when the text ended inside an object (the completion was cut off)."""
+        return bool(self._starts)
+
+
+# ---------------- FAN-IN ---------------- #
+async def merge_streams(streams: dict):
+    """Run several async iterators at once and yield (key, item) in arrival order.
+
+    If one stream raises, the others are cancelled and the error propagates;
+    streams that should survive a failure handle it themselves. Leaving the
+    loop early (client disconnect) cancels whatever is still running.
+    """
+    queue = asyncio.Queue()
+    finished = object()
+
+    async def pump(key, stream):
+        try:
+            async for item in stream:
+                queue.put_nowait((key, item))
+        except Exception as e:
+            queue.put_nowait((finished, e))
+        else:
+            queue.put_nowait((finished, None))
+
+    tasks = [asyncio.create_task(pump(key, stream)) for key, stream in streams.items()]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            key, item = await queue.get()
+            if key is finished:
+                if item is not None:
+                    raise item
+                remaining -= 1
+                continue
+            yield key, item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
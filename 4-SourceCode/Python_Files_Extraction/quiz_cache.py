@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+# ---------------- CONFIG ---------------- #
+QUIZ_CACHE_PATH = os.getenv("QUIZ_CACHE_PATH", os.path.join(".cache", "quiz_cache.sqlite3"))
+QUIZ_CACHE_TTL_SECONDS = float(os.getenv("QUIZ_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+QUIZ_CACHE_MAX_ENTRIES = int(os.getenv("QUIZ_CACHE_MAX_ENTRIES", "200000"))
+# Hits only note their access time; it is written in one batch this often
+QUIZ_CACHE_TOUCH_BATCH = int(os.getenv("QUIZ_CACHE_TOUCH_BATCH", "100"))
+
+
+def normalize_chunk(text: str) -> str:
+    """Chunks that differ only in whitespace or Unicode form share one entry."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+
+# ---------------- CACHE ---------------- #
+class QuizCache:
+    """SQLite memo of generated questions per chunk, with TTL and LRU eviction.
+
+    get / put block on SQLite: call them from async code with asyncio.to_thread.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self._entries = 0
+        self._touched = {}  # key -> access time not yet written
+        self.metrics = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "writes": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS quiz_cache ("
+                " key TEXT PRIMARY KEY,"
+                " questions TEXT NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS quiz_cache_accessed ON quiz_cache(accessed)")
+            # Counted once; put and _evict keep it up to date so stats() does not query
+            (self._entries,) = conn.execute("SELECT COUNT(*) FROM quiz_cache").fetchone()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(chunk: str, quiz_type: str, model: str, prompt_version: str, sampling: dict) -> str:
+        payload = json.dumps(
+            [normalize_chunk(chunk), quiz_type, model, prompt_version, sampling],
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> list | None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT questions, created FROM quiz_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.metrics["misses"] += 1
+                return None
+            questions, created = row
+            if now - created > self.ttl_seconds:
+                conn.execute("DELETE FROM quiz_cache WHERE key = ?", (key,))
+                self._touched.pop(key, None)
+                self._entries -= 1
+                self.metrics["expired"] += 1
+                self.metrics["misses"] += 1
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= QUIZ_CACHE_TOUCH_BATCH:
+                self._flush_touched(conn)
+            self.metrics["hits"] += 1
+        return json.loads(questions)
+
+    def put(self, key: str, questions: list):
+        now = time.time()
+        data = json.dumps(questions, ensure_ascii=False)
+        with self._lock:
+            conn = self._connect()
+            if conn.execute("SELECT 1 FROM quiz_cache WHERE key = ?", (key,)).fetchone() is None:
+                self._entries += 1
+            conn.execute(
+                "INSERT OR REPLACE INTO quiz_cache (key, questions, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, data, now, now),
+            )
+            self._touched.pop(key, None)
+            self.metrics["writes"] += 1
+            # Evict in batches so the count query does not run on every write
+            if self.metrics["writes"] % 100 == 0:
+                self._evict(conn, now)
+
+    def _flush_touched(self, conn: sqlite3.Connection):
+        """Write the pending access times in one transaction."""
+        if not self._touched:
+            return
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany("UPDATE quiz_cache SET accessed = ? WHERE key = ?",
+                             [(accessed, key) for key, accessed in self._touched.items()])
+        self._touched.clear()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        # LRU order needs the recent hits on disk first
+        self._flush_touched(conn)
+        expired = conn.execute("DELETE FROM quiz_cache WHERE created < ?", (now - self.ttl_seconds,)).rowcount
+        self.metrics["expired"] += max(expired, 0)
+        (self._entries,) = conn.execute("SELECT COUNT(*) FROM quiz_cache").fetchone()
+        overflow = self._entries - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM quiz_cache WHERE key IN (SELECT key FROM quiz_cache ORDER BY accessed LIMIT ?)",
+                (overflow,),
+            )
+            self._entries -= overflow
+            self.metrics["evictions"] += overflow
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._connect()
+            metrics = dict(self.metrics)
+            metrics["entries"] = self._entries
+        lookups = metrics["hits"] + metrics["misses"]
+        metrics["hit_rate"] = metrics["hits"] / lookups if lookups else 0.0
+        return metrics
+
+
+quiz_cache = QuizCache(QUIZ_CACHE_PATH, QUIZ_CACHE_TTL_SECONDS, QUIZ_CACHE_MAX_ENTRIES)
@@ -0,0 +1,342 @@
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from fastapi import HTTPException
+from uploads import SavedUpload
+
+# ---------------- CONFIG ---------------- #
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(".cache", "jobs.sqlite3"))
+JOBS_UPLOAD_DIR = os.getenv("JOBS_UPLOAD_DIR", os.path.join(".cache", "job_uploads"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Finished jobs (and their events) are deleted after this long
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+# SSE/WebSocket subscribers get a keep-alive this often so proxies keep the stream open
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+
+FINISHED_STATES = ("done", "failed")
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    filename: str
+    upload_path: str
+    sha256: str
+    size: int
+    params: dict
+    status: str
+    created: float
+    updated: float
+    result: dict | None = None
+    error: str | None = None
+
+    @property
+    def upload(self) -> SavedUpload:
+        return SavedUpload(path=self.upload_path, filename=self.filename, sha256=self.sha256, size=self.size)
+
+    def public(self) -> dict:
+        """What clients see: no server paths."""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "filename": self.filename,
+            "params": self.params,
+            "status": self.status,
+            "created": self.created,
+            "updated": self.updated,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+# ---------------- STORE ---------------- #
+class JobStore:
+    """SQLite table of jobs plus the ordered event log each job emitted."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " filename TEXT NOT NULL,"
+                " upload_path TEXT NOT NULL,"
+                " sha256 TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " params TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " created REAL NOT NULL,"
+                " updated REAL NOT NULL,"
+                " result TEXT,"
+                " error TEXT)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_events ("
+                " job_id TEXT NOT NULL,"
+                " seq INTEGER NOT NULL,"
+                " event TEXT NOT NULL,"
+                " data TEXT NOT NULL,"
+                " PRIMARY KEY (job_id, seq))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _row_to_job(row) -> Job:
+        (job_id, kind, filename, upload_path, sha256, size, params, status, created, updated, result, error) = row
+        return Job(
+            id=job_id, kind=kind, filename=filename, upload_path=upload_path, sha256=sha256, size=size,
+            params=json.loads(params), status=status, created=created, updated=updated,
+            result=json.loads(result) if result else None, error=error,
+        )
+
+    def create(self, job: Job):
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO jobs (id, kind, filename, upload_path, sha256, size, params, status, created, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.kind, job.filename, job.upload_path, job.sha256, job.size,
+                 json.dumps(job.params), job.status, job.created, job.updated),
+            )
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def set_status(self, job_id: str, status: str, result: dict | None = None, error: str | None = None):
+        with self._lock:
+            self._connect().execute(
+                "UPDATE jobs SET status = ?, updated = ?, result = ?, error = ? WHERE id = ?",
+                (status, time.time(), json.dumps(result, ensure_ascii=False) if result is not None else None, error, job_id),
+            )
+
+    def add_event(self, job_id: str, event: str, data: dict) -> int:
+        with self._lock:
+            conn = self._connect()
+            (last,) = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM job_events WHERE job_id = ?", (job_id,)).fetchone()
+            conn.execute(
+                "INSERT INTO job_events (job_id, seq, event, data) VALUES (?, ?, ?, ?)",
+                (job_id, last + 1, event, json.dumps(data, ensure_ascii=False)),
+            )
+        return last + 1
+
+    def events(self, job_id: str, after: int = 0) -> list:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT seq, event, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after),
+            ).fetchall()
+        return [(seq, event, json.loads(data)) for seq, event, data in rows]
+
+    def unfinished(self) -> list:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id FROM jobs WHERE status NOT IN (?, ?) ORDER BY created", FINISHED_STATES
+            ).fetchall()
+        return [job_id for (job_id,) in rows]
+
+    def purge(self, older_than: float) -> list:
+        """Delete finished jobs last updated before `older_than`; returns their upload paths."""
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT id, upload_path FROM jobs WHERE status IN (?, ?) AND updated < ?", (*FINISHED_STATES, older_than)
+            ).fetchall()
+            for job_id, _ in rows:
+                conn.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return [path for _, path in rows]
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+
+# ---------------- MANAGER ---------------- #
+class JobManager:
+    """Runs queued jobs on a fixed set of worker tasks and fans their events out to subscribers.
+
+    Jobs and events live in SQLite and the upload is kept on disk until the job
+    finishes, so jobs that were queued or running when the process stopped are
+    picked up again on the next start.
+    """
+
+    def __init__(self, store: JobStore, workers: int, upload_dir: str):
+        self.store = store
+        self.workers = workers
+        self.upload_dir = upload_dir
+        self._handlers = {}
+        self._queue = None
+        self._tasks = []
+        self._subscribers: dict[str, list[asyncio.Queue]] = {}
+        self.metrics = {"submitted": 0, "completed": 0, "failed": 0, "resumed": 0}
+
+    def register(self, kind: str, handler):
+        """`handler(job, emit)` does the work; `await emit(event, data)` reports progress."""
+        self._handlers[kind] = handler
+
+    # ---- lifecycle ---- #
+    async def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        for path in self.store.purge(time.time() - JOB_RETENTION_SECONDS):
+            self._remove_upload(path)
+
+        # Jobs interrupted by a restart run again from the start; the extraction
+        # and question caches make the already finished parts cheap.
+        for job_id in self.store.unfinished():
+            self.store.set_status(job_id, "queued")
+            await self._emit(job_id, "status", {"status": "queued", "resumed": True})
+            self._queue.put_nowait(job_id)
+            self.metrics["resumed"] += 1
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        # Cancelled jobs stay "running" in the store and are resumed on the next start
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ---- jobs ---- #
+    async def submit(self, kind: str, upload: SavedUpload, params: dict) -> Job:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.upload_dir, exist_ok=True)
+        path = os.path.join(self.upload_dir, job_id + os.path.splitext(upload.filename)[1].lower())
+        # Take the temp file over; saved_upload then has nothing left to delete. shutil.move
+        # renames when it can and copies when the temp dir is another filesystem (tmpfs /tmp)
+        await asyncio.to_thread(shutil.move, upload.path, path)
+
+        now = time.time()
+        job = Job(
+            id=job_id, kind=kind, filename=upload.filename, upload_path=path, sha256=upload.sha256,
+            size=upload.size, params=params, status="queued", created=now, updated=now,
+        )
+        self.store.create(job)
+        await self._emit(job_id, "status", {"status": "queued"})
+        self.metrics["submitted"] += 1
+        if self._queue is not None:
+            self._queue.put_nowait(job_id)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self.store.get(job_id)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = self.store.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return
+        self.store.set_status(job_id, "running")
+        await self._emit(job_id, "status", {"status": "running"})
+
+        async def emit(event: str, data: dict):
+            await self._emit(job_id, event, data)
+
+        try:
+            result = await self._handlers[job.kind](job, emit)
+        except asyncio.CancelledError:
+            raise
+        except HTTPException as e:
+            await self._finish(job, "failed", error=str(e.detail))
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            await self._finish(job, "failed", error=str(e))
+        else:
+            await self._finish(job, "done", result=result)
+
+    async def _finish(self, job: Job, status: str, result: dict | None = None, error: str | None = None):
+        self.store.set_status(job.id, status, result=result, error=error)
+        self.metrics["completed" if status == "done" else "failed"] += 1
+        self._remove_upload(job.upload_path)
+        await self._emit(job.id, status, {"result": result} if status == "done" else {"error": error})
+
+    @staticmethod
+    def _remove_upload(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    # ---- events ---- #
+    async def _emit(self, job_id: str, event: str, data: dict):
+        seq = self.store.add_event(job_id, event, data)
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait((seq, event, data))
+
+    async def subscribe(self, job_id: str, after: int = 0):
+        """Yield (seq, event, data) from `after` on until the job finishes; None is a heartbeat.
+
+        Stored events are replayed first, so late or reconnecting clients
+        (SSE Last-Event-ID) see everything they missed.
+        """
+        queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(queue)
+        try:
+            last = after
+            for seq, event, data in self.store.events(job_id, after):
+                last = seq
+                yield seq, event, data
+                if event in FINISHED_STATES:
+                    return
+            while True:
+                try:
+                    seq, event, data = await asyncio.wait_for(queue.get(), timeout=JOB_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if seq <= last:
+                    continue  # already sent during the replay
+                last = seq
+                yield seq, event, data
+                if event in FINISHED_STATES:
+                    return
+        finally:
+            subscribers = self._subscribers.get(job_id, [])
+            if queue in subscribers:
+                subscribers.remove(queue)
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "by_status": self.store.counts(),
+            **self.metrics,
+        }
+
+
+job_manager = JobManager(JobStore(JOBS_DB_PATH), JOB_WORKERS, JOBS_UPLOAD_DIR)
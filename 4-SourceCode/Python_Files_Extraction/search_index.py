@@ -0,0 +1,291 @@
+# BM25 retrieval over the extracted course material, so a whole-course quiz
+# only sends the passages relevant to a topic instead of entire folders.
+#
+#   python ingest.py "../../8-CollectedData" --out .cache/corpus      (extract once, incremental)
+#   python search_index.py build --store .cache/corpus                (index the store's passages)
+#   python search_index.py query "خوارزميات الترتيب" --k 5
+#
+# Passages are the same chunks the quiz prompts are built from
+# (text_normalizer + chunker.chunk_segments). The index is a directory of
+# flat files; the postings, lengths and passage text are memory-mapped, so
+# opening it costs one read of vocab.json and a query touches only the
+# postings of its terms.
+#   meta.json          passage count, average length, BM25 parameters
+#   vocab.json         term -> [first posting, document frequency]
+#   postings_doc.npy   passage ids of every term's postings (uint32), grouped by term
+#   postings_tf.npy    matching term frequencies (uint16)
+#   doc_len.npy        tokens per passage (uint32)
+#   passages.bin       passage text, UTF-8, back to back; passage_offsets.npy gives the byte ranges
+#   passages.json      [path, chunk number in that file] per passage
+import argparse
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+import numpy as np  # if this isn't working, run: pip install numpy
+from question_dedup import normalize_question_text
+
+# ---------------- CONFIG ---------------- #
+SEARCH_INDEX_DIR = os.getenv("SEARCH_INDEX_DIR", os.path.join(".cache", "search_index"))
+SEARCH_DEFAULT_K = int(os.getenv("SEARCH_DEFAULT_K", "10"))
+SEARCH_MAX_K = int(os.getenv("SEARCH_MAX_K", "100"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+INDEX_VERSION = 1
+
+# ---------------- TOKENIZATION ---------------- #
+# Same casefolding / Arabic letter and digit folding as question_dedup, then
+# light stemming: the Arabic article (with its attached prepositions) and up to
+# two plural / feminine / pronoun suffixes (those of the Light10 stemmer), and
+# the English plural "s", so "بالخوارزمية", "الخوارزميات" and "خوارزمية" or
+# "tree" and "trees" are one term.
+ARABIC_ARTICLE = re.compile(r"^(?:وال|بال|كال|فال|لل|ال)(?=\w{3,})")
+ARABIC_SUFFIX = re.compile(r"(?<=\w{3})(?:ها|ان|ات|ون|ين|يه|ه|ي)$")
+ARABIC_WORD = re.compile(r"[\u0600-\u06ff]")
+ENGLISH_PLURAL = re.compile(r"(?<=[a-z]{3})(?<!s)s$")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+what which who how when where why can not no do does than then there these those into also such
+في من على الى إلى عن مع هذا هذه ذلك تلك التي الذي الذين هو هي هم ان أن إن او أو ما لا كان كانت
+ثم قد كل بين عند حتى اذا إذا لم لن وهو وهي وفي ومن
+""".split())
+STOPWORDS = frozenset(normalize_question_text(word) for word in STOPWORDS)
+
+
+def tokenize(text: str) -> list:
+    """Normalized Arabic / English terms of `text` (stopwords and one-letter tokens dropped)."""
+    terms = []
+    for token in normalize_question_text(text).split():
+        if token in STOPWORDS:
+            continue
+        if ARABIC_WORD.match(token):
+            # Twice, so "ات" + "ي" ("خوارزميات") ends where "يه" ("خوارزمية") does
+            token = ARABIC_SUFFIX.sub("", ARABIC_SUFFIX.sub("", ARABIC_ARTICLE.sub("", token)))
+        else:
+            token = ENGLISH_PLURAL.sub("", token)
+        if len(token) > 1:
+            terms.append(token)
+    return terms
+
+
+# ---------------- BUILD ---------------- #
+def build_index(passages, out: str = SEARCH_INDEX_DIR) -> dict:
+    """Write the index for `passages`, an iterable of (path, chunk number, text); returns meta.json.
+
+    Written next to the old index and swapped in by renaming, so a running
+    app keeps its open index until it reloads.
+    """
+    tmp = out.rstrip("/\\") + ".building"
+    os.makedirs(tmp, exist_ok=True)
+    postings = {}
+    lengths, locations, offsets = [], [], [0]
+    with open(os.path.join(tmp, "passages.bin"), "wb") as text_file:
+        for doc, (path, number, text) in enumerate(passages):
+            terms = tokenize(text)
+            for term, tf in Counter(terms).items():
+                postings.setdefault(term, []).append((doc, min(tf, 65535)))
+            lengths.append(len(terms))
+            locations.append([path, number])
+            data = text.encode("utf-8")
+            text_file.write(data)
+            offsets.append(offsets[-1] + len(data))
+
+    vocab, docs, tfs = {}, [], []
+    for term in sorted(postings):
+        entries = postings[term]
+        vocab[term] = [len(docs), len(entries)]
+        docs.extend(doc for doc, _ in entries)
+        tfs.extend(tf for _, tf in entries)
+    np.save(os.path.join(tmp, "postings_doc.npy"), np.asarray(docs, dtype=np.uint32))
+    np.save(os.path.join(tmp, "postings_tf.npy"), np.asarray(tfs, dtype=np.uint16))
+    np.save(os.path.join(tmp, "doc_len.npy"), np.asarray(lengths, dtype=np.uint32))
+    np.save(os.path.join(tmp, "passage_offsets.npy"), np.asarray(offsets, dtype=np.uint64))
+    with open(os.path.join(tmp, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(vocab, f, ensure_ascii=False, separators=(",", ":"))
+    with open(os.path.join(tmp, "passages.json"), "w", encoding="utf-8") as f:
+        json.dump(locations, f, ensure_ascii=False)
+    meta = {
+        "version": INDEX_VERSION,
+        "passages": len(lengths),
+        "terms": len(vocab),
+        "postings": len(docs),
+        "avg_len": (sum(lengths) / len(lengths)) if lengths else 0.0,
+        "k1": BM25_K1,
+        "b": BM25_B,
+        "built_at": time.time(),
+    }
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    old = out.rstrip("/\\") + ".old"
+    if os.path.isdir(out):
+        os.replace(out, old)
+    os.replace(tmp, out)
+    if os.path.isdir(old):
+        for name in os.listdir(old):
+            os.remove(os.path.join(old, name))
+        os.rmdir(old)
+    return meta
+
+
+def store_passages(store: str):
+    """(path, chunk number, text) for every chunk of every file in an ingest.py store."""
+    from chunker import chunk_segments
+    from ingest import read_store, record_segments
+    from text_normalizer import normalize_segments
+
+    for path, record in read_store(store):
+        for number, chunk in enumerate(chunk_segments(normalize_segments(record_segments(record)))):
+            yield path, number, chunk
+
+
+# ---------------- SEARCH ---------------- #
+class SearchIndex:
+    """Read side of the index; opened on first use, safe to share between requests."""
+
+    def __init__(self, directory: str = SEARCH_INDEX_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._loaded = None
+        self.metrics = {"queries": 0, "query_seconds_sum": 0.0, "query_seconds_max": 0.0}
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def load(self) -> dict:
+        """Open the index files (once); raises FileNotFoundError when there is no index."""
+        loaded = self._loaded
+        if loaded is not None:
+            return loaded
+        with self._lock:
+            if self._loaded is None:
+                if not os.path.exists(self._path("meta.json")):
+                    raise FileNotFoundError(f"No search index in {self.directory} (build it with: python search_index.py build)")
+                with open(self._path("meta.json"), encoding="utf-8") as f:
+                    meta = json.load(f)
+                if meta.get("version") != INDEX_VERSION:
+                    raise FileNotFoundError(f"Search index in {self.directory} is version {meta.get('version')}; rebuild it")
+                with open(self._path("vocab.json"), encoding="utf-8") as f:
+                    vocab = json.load(f)
+                with open(self._path("passages.json"), encoding="utf-8") as f:
+                    locations = json.load(f)
+                lengths = np.load(self._path("doc_len.npy"), mmap_mode="r")
+                avg_len = meta["avg_len"] or 1.0
+                self._loaded = {
+                    "meta": meta,
+                    "vocab": vocab,
+                    "locations": locations,
+                    "docs": np.load(self._path("postings_doc.npy"), mmap_mode="r"),
+                    "tfs": np.load(self._path("postings_tf.npy"), mmap_mode="r"),
+                    "offsets": np.load(self._path("passage_offsets.npy"), mmap_mode="r"),
+                    "text": np.memmap(self._path("passages.bin"), dtype=np.uint8, mode="r") if meta["passages"] else b"",
+                    # The length part of the BM25 denominator, per passage
+                    "norm": (meta["k1"] * (1 - meta["b"] + meta["b"] * lengths / avg_len)).astype(np.float32),
+                }
+            return self._loaded
+
+    def reload(self):
+        """Pick up a rebuilt index on the next query."""
+        with self._lock:
+            self._loaded = None
+
+    @property
+    def available(self) -> bool:
+        return os.path.exists(self._path("meta.json"))
+
+    def passage_text(self, doc: int) -> str:
+        index = self.load()
+        start, stop = int(index["offsets"][doc]), int(index["offsets"][doc + 1])
+        return bytes(index["text"][start:stop]).decode("utf-8")
+
+    def search(self, query: str, k: int = SEARCH_DEFAULT_K, path_prefix: str | None = None) -> list:
+        """Top `k` passages for `query` by BM25: [{"score", "path", "chunk", "text"}], best first.
+
+        `path_prefix` keeps only passages from files under that folder (e.g. one course).
+        """
+        start = time.perf_counter()
+        index = self.load()
+        meta = index["meta"]
+        count = meta["passages"]
+        scores = np.zeros(count, dtype=np.float32)
+        for term in set(tokenize(query)):
+            entry = index["vocab"].get(term)
+            if entry is None:
+                continue
+            first, df = entry
+            docs = index["docs"][first:first + df]
+            tf = index["tfs"][first:first + df].astype(np.float32)
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tf * (meta["k1"] + 1) / (tf + index["norm"][docs])
+
+        if path_prefix:
+            prefix = path_prefix.strip("/") + "/"
+            keep = np.fromiter((path.startswith(prefix) for path, _ in index["locations"]), dtype=bool, count=count)
+            scores[~keep] = 0.0
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(scores[matched], -k)[-k:]]
+        best = matched[np.argsort(-scores[matched], kind="stable")]
+        results = [
+            {"score": round(float(scores[doc]), 4), "path": index["locations"][doc][0],
+             "chunk": index["locations"][doc][1], "text": self.passage_text(int(doc))}
+            for doc in best
+        ]
+
+        elapsed = time.perf_counter() - start
+        self.metrics["queries"] += 1
+        self.metrics["query_seconds_sum"] += elapsed
+        self.metrics["query_seconds_max"] = max(self.metrics["query_seconds_max"], elapsed)
+        return results
+
+    def stats(self) -> dict:
+        queries = self.metrics["queries"]
+        loaded = self._loaded
+        return {
+            "directory": self.directory,
+            "loaded": loaded is not None,
+            "passages": loaded["meta"]["passages"] if loaded else None,
+            "terms": loaded["meta"]["terms"] if loaded else None,
+            "queries": queries,
+            "query_seconds_avg": self.metrics["query_seconds_sum"] / queries if queries else 0.0,
+            "query_seconds_max": self.metrics["query_seconds_max"],
+        }
+
+
+search_index = SearchIndex()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the BM25 passage index.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="index the passages of an ingest.py store")
+    build.add_argument("--store", default=os.path.join(".cache", "corpus"))
+    build.add_argument("--out", default=SEARCH_INDEX_DIR)
+    query = commands.add_parser("query", help="print the best passages for a query")
+    query.add_argument("text")
+    query.add_argument("--k", type=int, default=5)
+    query.add_argument("--index", default=SEARCH_INDEX_DIR)
+    query.add_argument("--course", help="only passages under this folder of the corpus")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        meta = build_index(store_passages(args.store), args.out)
+        print(f"{meta['passages']} passages, {meta['terms']} terms, {meta['postings']} postings "
+              f"in {time.perf_counter() - start:.1f} s -> {args.out}")
+        return
+
+    index = SearchIndex(args.index)
+    start = time.perf_counter()
+    results = index.search(args.text, args.k, args.course)
+    print(f"{len(results)} passages in {(time.perf_counter() - start) * 1000:.1f} ms (index opened on first query)")
+    for result in results:
+        print(f"\n[{result['score']:.2f}] {result['path']} #{result['chunk']}\n{result['text'][:300]}")
+
+
+if __name__ == "__main__":
+    main()
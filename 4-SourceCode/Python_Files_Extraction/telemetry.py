@@ -0,0 +1,196 @@
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import prometheus_client  # if this isn't working, run: pip install prometheus-client
+    from prometheus_client.core import GaugeMetricFamily
+except ImportError:
+    prometheus_client = None
+
+try:
+    from opentelemetry import trace  # if this isn't working, run: pip install opentelemetry-api
+except ImportError:
+    trace = None
+
+# ---------------- CONFIG ---------------- #
+# Prometheus metrics are served on /metrics whenever prometheus-client is
+# installed. Traces are only exported when OTEL_TRACES_EXPORTER is "otlp"
+# (OTLP over HTTP to OTEL_EXPORTER_OTLP_ENDPOINT, http://localhost:4318 by
+# default, e.g. a local OpenTelemetry collector or Jaeger) or "console".
+OTEL_TRACES_EXPORTER = os.getenv("OTEL_TRACES_EXPORTER", "none")
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "quiz-api")
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class _NoMetric:
+    """Stands in for a metric when prometheus-client is not installed."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, value=1):
+        pass
+
+
+# ---------------- METRICS ---------------- #
+if prometheus_client is not None:
+    # Upload, extraction, normalize, chunking, embedding (topic selection),
+    # llm_wait (scheduler queue), llm (the whole routed call, retries
+    # included) and parse, each as its own histogram
+    STAGE_SECONDS = prometheus_client.Histogram(
+        "quiz_stage_seconds", "Time spent in each stage of the quiz pipeline", ["stage"], buckets=STAGE_BUCKETS)
+    LLM_REQUEST_SECONDS = prometheus_client.Histogram(
+        "llm_request_seconds", "Latency of single calls to an LLM backend", ["pool", "backend", "outcome"],
+        buckets=STAGE_BUCKETS)
+    LLM_TOKENS = prometheus_client.Counter(
+        "llm_tokens", "Tokens reported by LLM backends", ["pool", "backend", "kind"])
+    QUIZ_CHUNKS = prometheus_client.Counter(
+        "quiz_chunks", "Chunks of finished documents by outcome", ["outcome"])
+else:
+    STAGE_SECONDS = LLM_REQUEST_SECONDS = LLM_TOKENS = QUIZ_CHUNKS = _NoMetric()
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def record_llm_call(pool: str, backend: str, seconds: float, outcome: str, usage: dict | None = None):
+    """One call to one backend: its latency, and the tokens it reported on success."""
+    LLM_REQUEST_SECONDS.labels(pool, backend, outcome).observe(seconds)
+    for kind in ("prompt_tokens", "completion_tokens"):
+        tokens = (usage or {}).get(kind)
+        if tokens:
+            LLM_TOKENS.labels(pool, backend, kind.removesuffix("_tokens")).inc(tokens)
+
+
+def count_chunks(summary: dict):
+    """Add a document's chunk_summary() to the chunk counters."""
+    for outcome in ("succeeded", "failed", "requeued"):
+        if summary.get(outcome):
+            QUIZ_CHUNKS.labels(outcome).inc(summary[outcome])
+
+
+# The existing .stats() dicts (cache hit rates, scheduler queue, jobs...)
+# are exported as gauges, read when /metrics is scraped
+_stats_sources = {}
+
+
+def register_stats(section: str, stats):
+    """Export the numbers in `stats()` as quiz_<section>_<key> gauges."""
+    _stats_sources[section] = stats
+
+
+class _StatsCollector:
+    def collect(self):
+        for section, stats in list(_stats_sources.items()):
+            try:
+                values = stats()
+            except Exception as e:
+                print(f"Stats for {section} unavailable: {e}")
+                continue
+            for key, value in values.items():
+                # Nested dicts (per-backend, per-document) stay on /stats
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    yield GaugeMetricFamily(f"quiz_{section}_{key}", f"{section} {key} (see /stats)", value=value)
+
+
+if prometheus_client is not None:
+    prometheus_client.REGISTRY.register(_StatsCollector())
+
+
+def metrics_payload() -> tuple[bytes, str] | None:
+    """(body, content type) for /metrics; None when prometheus-client is not installed."""
+    if prometheus_client is None:
+        return None
+    return prometheus_client.generate_latest(), prometheus_client.CONTENT_TYPE_LATEST
+
+
+# ---------------- TRACING ---------------- #
+_provider = None
+
+
+def setup_tracing():
+    """Install the span exporter chosen by OTEL_TRACES_EXPORTER (once, from the app lifespan)."""
+    global _provider
+    if _provider is not None or trace is None or OTEL_TRACES_EXPORTER == "none":
+        return
+    try:
+        from opentelemetry.sdk.resources import Resource  # if this isn't working, run: pip install opentelemetry-sdk
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+        if OTEL_TRACES_EXPORTER == "otlp":
+            # if this isn't working, run: pip install opentelemetry-exporter-otlp-proto-http
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            exporter = OTLPSpanExporter()
+        else:
+            exporter = ConsoleSpanExporter()
+    except ImportError as e:
+        print(f"Tracing disabled: {e}")
+        return
+    _provider = TracerProvider(resource=Resource.create({"service.name": OTEL_SERVICE_NAME}))
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+
+
+def shutdown_tracing():
+    """Flush the spans still buffered."""
+    global _provider
+    if _provider is not None:
+        _provider.shutdown()
+        _provider = None
+
+
+def _tracer():
+    # Looked up on every span: the provider is only installed in the lifespan
+    return trace.get_tracer("quiz_pipeline") if trace is not None else None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """An OpenTelemetry span around the block (nothing when tracing is not installed); None attributes are left out."""
+    tracer = _tracer()
+    if tracer is None:
+        yield None
+        return
+    attributes = {key: value for key, value in attributes.items() if value is not None}
+    with tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def set_attributes(current, **attributes):
+    if current is not None:
+        current.set_attributes({key: value for key, value in attributes.items() if value is not None})
+
+
+@contextmanager
+def stage(name: str, span_name: str | None = None, **attributes):
+    """Time the block into quiz_stage_seconds{stage=name}, inside a span (also usable as a decorator)."""
+    start = time.perf_counter()
+    try:
+        with span(span_name or name, **attributes) as current:
+            yield current
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+def timed_iter(name: str, iterable):
+    """Yield from `iterable` (e.g. a lazy chunker) and record the time spent producing its items as one `name` sample."""
+    iterator = iter(iterable)
+    spent = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                spent += time.perf_counter() - start
+            yield item
+    finally:
+        observe_stage(name, spent)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Tests import the service modules the way APIFile does, and the mock LLM server from benchmarks/
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, os.path.join(SERVICE_DIR, "benchmarks"))
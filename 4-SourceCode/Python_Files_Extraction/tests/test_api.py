@@ -0,0 +1,118 @@
+import asyncio
+import importlib
+import io
+import json
+import os
+import time
+
+import pytest
+from docx import Document
+from fastapi.testclient import TestClient
+
+from llm_router import Backend, CircuitBreaker, LLMRouter, RetryPolicy
+from mock_llm_server import MockLLMServer
+
+
+@pytest.fixture(scope="module")
+def api(tmp_path_factory):
+    """(TestClient for APIFile with LM Studio pointed at a mock server, the mock server)."""
+    server = MockLLMServer(latency=0.01).start()
+    cache = tmp_path_factory.mktemp("cache")
+    os.environ.update(
+        LM_STUDIO_URL=f"{server.base_url}/chat/completions",
+        EXTRACTION_CACHE_DIR=str(cache / "extracted"), QUIZ_CACHE_PATH=str(cache / "quiz.sqlite3"),
+        JOBS_DB_PATH=str(cache / "jobs.sqlite3"), JOBS_UPLOAD_DIR=str(cache / "uploads"),
+        EXTRACTION_WORKERS="1",
+    )
+    api_file = importlib.import_module("APIFile")
+    # Fail fast while the mock is down, and let the next test back in right after
+    api_file.lm_studio_router.retry = RetryPolicy(attempts=1)
+    for backend in api_file.lm_studio_router.backends:
+        backend.breaker = CircuitBreaker(cooldown=0.1)
+    with TestClient(api_file.app) as client:
+        yield client, server
+    server.stop()
+
+
+def lecture(paragraphs: int = 30) -> bytes:
+    document = Document()
+    for number in range(paragraphs):
+        document.add_paragraph(f"Section {number}: " + f"Topic {number} covers clustering and classification. " * 40)
+    data = io.BytesIO()
+    document.save(data)
+    return data.getvalue()
+
+
+def ask_stream(client, url="/ask_ai_model/stream", **params) -> list:
+    response = client.post(url, params=params, files={"file": ("lecture.docx", lecture())})
+    assert response.status_code == 200
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.mark.parametrize("mixed", [False, True])
+def test_stream_sends_exactly_the_requested_counts(api, mixed):
+    client, server = api
+    server.reset_stats()
+    events = ask_stream(client, mcq_count=7, tf_count=3, mixed=mixed)
+    kinds = [data["question_type"] for event, data in events if event == "question"]
+    assert kinds.count("multiple_choice") == 7
+    assert kinds.count("true_false") == 3
+    assert events[-1] == ("done", {"questions": {"multiple_choice": 7, "true_false": 3}})
+    # Only the planned chunks were sent, not the whole document per type
+    assert server.stats()["requests"] < events[0][1]["chunks"]
+
+
+def test_stream_reports_lm_studio_errors(api):
+    client, server = api
+    server.set_down()
+    try:
+        events = ask_stream(client, mcq_count=2, tf_count=2)
+    finally:
+        server.set_down(False)
+    errors = [data for event, data in events if event == "error"]
+    assert errors and all(data["detail"].startswith("LM Studio unreachable") for data in errors)
+    assert events[-1] == ("done", {"questions": {"multiple_choice": 0, "true_false": 0}})
+
+
+def test_quiz_stream_reports_backend_errors(api, monkeypatch):
+    client, server = api
+    content_creation_json = importlib.import_module("content_creation_json")
+    router = LLMRouter("quiz-test", [Backend("mock", server.base_url)], hedge=False, retry=RetryPolicy(attempts=1))
+    monkeypatch.setattr(content_creation_json, "quiz_router", router)
+    server.set_down()
+    try:
+        events = ask_stream(client, "/generate_quiz/stream", quiz_type="tf", fresh=True)
+    finally:
+        server.set_down(False)
+    errors = [data for event, data in events if event == "error"]
+    assert len(errors) == events[0][1]["chunks"]
+    assert {data["chunk"] for data in errors} == set(range(len(errors)))
+    assert all(data["detail"].startswith("quiz-test: no backend left") for data in errors)
+    assert events[-1] == ("done", {"questions": 0})
+
+
+def test_lm_studio_calls_get_the_lm_studio_deadline(api, monkeypatch):
+    api_file = importlib.import_module("APIFile")
+    deadlines = []
+
+    async def send_to_lm_studio(prompt, document_id="lm_studio", deadline=None):
+        deadlines.append(deadline - time.monotonic())
+        return "[]"
+
+    monkeypatch.setattr(api_file, "send_to_lm_studio", send_to_lm_studio)
+    asyncio.run(api_file.ask_ai_model_from_text("lecture.txt", "Clustering groups data. " * 200, 2, 0))
+    assert deadlines and all(abs(left - api_file.LM_STUDIO_DEADLINE_SECONDS) < 5 for left in deadlines)
+    assert api_file.LM_STUDIO_DEADLINE_SECONDS == api_file.LM_TIMEOUT.read
+
+
+def test_mixed_ask_ai_model_returns_the_requested_counts(api):
+    client, _ = api
+    response = client.post("/ask_ai_model", params={"mcq_count": 7, "tf_count": 3, "mixed": True},
+                           files={"file": ("lecture.docx", lecture())})
+    assert response.status_code == 200
+    questions = response.json()["questions"]
+    assert (len(questions["multiple_choice"]), len(questions["true_false"])) == (7, 3)
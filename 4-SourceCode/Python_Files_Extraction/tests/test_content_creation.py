@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+import content_creation_json
+from content_creation_json import generate_quiz_from_chunks
+
+TF = {"question": "Clustering groups data without predefined labels.", "answer": "True"}
+
+
+@pytest.fixture
+def events(monkeypatch):
+    """Log of "chunked i" / "started i" / "cancelled i"; run_chunk is replaced by a fake LLM call."""
+    log = []
+
+    async def run_chunk(document_id, quiz_type, client, chunk, use_cache=True, deadline=None):
+        number = int(chunk.split()[-1])
+        log.append(f"started {number}")
+        try:
+            await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            log.append(f"cancelled {number}")
+            raise
+        return [dict(TF, question=f"Statement {number}.")], {"valid": 1}
+
+    monkeypatch.setattr(content_creation_json, "run_chunk", run_chunk)
+    return log
+
+
+def chunk_stream(log: list, count: int, fail_after: int | None = None):
+    for number in range(count):
+        if number == fail_after:
+            raise ValueError("extraction failed")
+        log.append(f"chunked {number}")
+        yield f"chunk {number}"
+
+
+def test_chunks_start_while_the_generator_is_still_producing(events):
+    totals = []
+
+    async def on_chunk(index, total, questions):
+        totals.append(total)
+
+    output = asyncio.run(generate_quiz_from_chunks("doc", chunk_stream(events, 4), "tf", use_cache=False, on_chunk=on_chunk))
+    assert events.index("started 0") < events.index("chunked 1")
+    assert events.index("started 2") < events.index("chunked 3")
+    assert len(output["questions"]) == 4
+    # on_chunk still sees the real total, even for chunks that finished early
+    assert totals == [4, 4, 4, 4]
+
+
+def test_generator_failure_cancels_the_started_chunks(events):
+    with pytest.raises(ValueError):
+        asyncio.run(generate_quiz_from_chunks("doc", chunk_stream(events, 4, fail_after=2), "tf", use_cache=False))
+    assert "cancelled 0" in events and "cancelled 1" in events
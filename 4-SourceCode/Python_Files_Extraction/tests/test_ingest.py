@@ -0,0 +1,93 @@
+import asyncio
+import os
+
+import pytest
+
+import ingest
+from Extractors.segments import TextSegment
+from ingest import build_record, load_manifest, read_store, record_segments
+from text_normalizer import clean_text
+
+
+class FakePool:
+    """Stands in for ExtractionPool; the extraction number `interrupt_at` is cancelled, like a Ctrl+C."""
+
+    def __init__(self, interrupt_at: int | None = None):
+        self.interrupt_at = interrupt_at
+        self.calls = 0
+
+    def __call__(self, workers, timeout, max_jobs_per_worker):
+        return self
+
+    async def extract(self, path: str, filename: str) -> list:
+        self.calls += 1
+        if self.calls == self.interrupt_at:
+            raise asyncio.CancelledError
+        with open(path, encoding="utf-8") as f:
+            return [TextSegment(f.read(), page=1, kind="page")]
+
+    def shutdown(self):
+        pass
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    folder = tmp_path / "source"
+    folder.mkdir()
+    for number in range(6):
+        (folder / f"lecture{number}.pdf").write_text(f"Lecture {number} text.", encoding="utf-8")
+    monkeypatch.setattr(ingest, "INGEST_PART_RECORDS", 2)
+    return str(folder)
+
+
+def run(source: str, out: str, monkeypatch, pool: FakePool) -> dict:
+    monkeypatch.setattr(ingest, "ExtractionPool", pool)
+    return asyncio.run(ingest.ingest(source, out, workers=1, fmt="jsonl.gz"))
+
+
+def assert_consistent(out: str):
+    """Every part the manifest on disk names is there and readable."""
+    manifest = load_manifest(out)
+    for part in set(manifest["parts"].values()):
+        assert os.path.exists(os.path.join(out, part))
+    return list(read_store(out))
+
+
+def test_records_get_the_same_character_cleanup_as_prompts():
+    segments = [TextSegment("Data\u00admining\u200f\x0c  \nﬁnds patterns.\u00a0\n\n\n\n", page=1, kind="page"),
+                TextSegment(" \u200b\n", page=2, kind="page")]
+    record = build_record("0" * 64, "lecture.pdf", segments)
+    assert record["text"] == "Datamining\nfinds patterns.\n\n"
+    assert [segment.page for segment in record_segments(record)] == [1]
+    # The prompt cleanup only goes further (Arabic marks, hyphenated words, inner spaces)
+    assert clean_text(record["text"]) == record["text"]
+
+
+def test_interrupted_run_keeps_its_finished_parts(source, tmp_path, monkeypatch):
+    out = str(tmp_path / "store")
+    with pytest.raises(asyncio.CancelledError):
+        run(source, out, monkeypatch, FakePool(interrupt_at=4))
+    kept = assert_consistent(out)
+    assert len(kept) >= 3  # the part finished before the interruption, and the one it cut short
+
+    # The next run only extracts what the interrupted one did not store
+    report = run(source, out, monkeypatch, FakePool())
+    assert report["extracted"] == 6 - len(kept)
+    assert sorted(path for path, _ in assert_consistent(out)) == [f"lecture{number}.pdf" for number in range(6)]
+
+
+def test_extractor_change_keeps_the_old_parts_until_the_new_manifest_is_saved(source, tmp_path, monkeypatch):
+    out = str(tmp_path / "store")
+    run(source, out, monkeypatch, FakePool())
+    old_parts = set(load_manifest(out)["parts"].values())
+
+    monkeypatch.setattr(ingest, "EXTRACTOR_VERSION", "test-next")
+    with pytest.raises(asyncio.CancelledError):
+        run(source, out, monkeypatch, FakePool(interrupt_at=1))
+    assert_consistent(out)
+
+    run(source, out, monkeypatch, FakePool())
+    manifest = load_manifest(out)
+    assert manifest["extractor"] == "test-next"
+    assert len(assert_consistent(out)) == 6
+    assert not old_parts & set(os.listdir(out))
@@ -0,0 +1,185 @@
+import asyncio
+import random
+import time
+
+import pytest
+
+from llm_clients import close_llm_clients
+from llm_router import Backend, BackendError, CircuitBreaker, DeadlineExceeded, LLMRouter, LLMUnavailable, RetryPolicy
+from mock_llm_server import MockLLMServer
+
+PAYLOAD = {"model": "local-model", "messages": [{"role": "user", "content": "Generate MCQs."}], "max_tokens": 50}
+
+
+@pytest.fixture
+def servers():
+    """start(name=..., **options) -> a running MockLLMServer; all are stopped after the test."""
+    started = {}
+
+    def start(name, **options):
+        started[name] = MockLLMServer(**options).start()
+        return started[name]
+
+    yield start
+    for server in started.values():
+        server.stop()
+
+
+def run(coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await close_llm_clients()
+    return asyncio.run(main())
+
+
+async def send(router, requests, concurrency=1):
+    """`requests` completions, `concurrency` at a time -> (sorted latencies of successes, failures)."""
+    latencies, failures = [], 0
+    numbers = iter(range(requests))
+
+    async def worker():
+        nonlocal failures
+        for _ in numbers:
+            start = time.perf_counter()
+            try:
+                await router.chat_completion(PAYLOAD)
+                latencies.append(time.perf_counter() - start)
+            except LLMUnavailable:
+                failures += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return sorted(latencies), failures
+
+
+def test_failover_when_a_backend_goes_down(servers):
+    a, b = servers("a", latency=0.01), servers("b", latency=0.01)
+    router = LLMRouter("failover", [Backend("a", a.base_url), Backend("b", b.base_url)], hedge=False,
+                       retry=RetryPolicy(attempts=1))
+    a.set_down()
+    latencies, failures = run(send(router, 30, concurrency=5))
+    assert failures == 0 and len(latencies) == 30
+    assert b.stats()["requests"] == 30
+    assert router.metrics["failovers"] == a.stats()["requests"]
+
+
+def test_breaker_opens_after_failures_and_half_opens_after_cooldown(servers):
+    server = servers("flaky", latency=0.01)
+    backend = Backend("flaky", server.base_url, breaker=CircuitBreaker(failures=3, cooldown=0.3))
+    router = LLMRouter("breaker", [backend], hedge=False, retry=RetryPolicy(attempts=1))
+
+    async def scenario():
+        server.set_down()
+        _, failures = await send(router, 5)
+        assert failures == 5
+        assert server.stats()["requests"] == 3  # the last two never reached the server
+        assert backend.breaker.state == "open"
+
+        await asyncio.sleep(0.35)
+        assert backend.breaker.state == "half_open"
+        _, failures = await send(router, 1)  # the trial call fails: open again
+        assert failures == 1 and server.stats()["requests"] == 4
+        assert backend.breaker.state == "open"
+
+        await asyncio.sleep(0.35)
+        server.set_down(False)
+        latencies, failures = await send(router, 3)  # the trial succeeds: closed
+        assert failures == 0 and len(latencies) == 3
+        assert backend.breaker.state == "closed"
+
+    run(scenario())
+
+
+def test_rejected_requests_leave_the_circuit_closed(servers):
+    server = servers("strict", latency=0.01)
+    backend = Backend("strict", server.base_url, breaker=CircuitBreaker(failures=3, cooldown=30))
+    router = LLMRouter("reject", [backend], hedge=False, retry=RetryPolicy(attempts=3))
+
+    async def scenario():
+        server.set_reject(400)  # e.g. oversized prompts
+        _, failures = await send(router, 10)
+        assert failures == 10
+        assert server.stats()["requests"] == 10  # every call reached it: no retries, no open circuit
+        assert backend.breaker.state == "closed" and backend.breaker.opened == 0
+        assert backend.metrics["failures"] == 10
+
+        server.set_reject(None)
+        latencies, failures = await send(router, 3)
+        assert failures == 0 and len(latencies) == 3
+
+    run(scenario())
+
+
+def test_rejected_trial_call_keeps_the_circuit_half_open():
+    breaker = CircuitBreaker(failures=1, cooldown=0.0)
+    backend = Backend("b", "http://127.0.0.1:9", breaker=breaker)
+    router = LLMRouter("trial", [backend], hedge=False)
+    breaker.on_failure()
+    breaker.on_start()
+    router._failed(backend, BackendError("b: HTTP 413", retryable=False), 0.01)
+    assert breaker.state == "half_open" and breaker.allows()
+
+
+def test_half_open_allows_a_single_trial_call():
+    breaker = CircuitBreaker(failures=1, cooldown=0.0)
+    breaker.on_failure()
+    assert breaker.state == "half_open" and breaker.allows()
+    breaker.on_start()
+    assert not breaker.allows()
+
+
+def test_max_concurrency_is_never_exceeded(servers):
+    small, big = servers("small", latency=0.03), servers("big", latency=0.06)
+    router = LLMRouter("cap", [Backend("small", small.base_url, max_concurrency=4), Backend("big", big.base_url)],
+                       hedge=False)
+    latencies, failures = run(send(router, 150, concurrency=20))
+    assert failures == 0 and len(latencies) == 150
+    assert 0 < small.stats()["max_in_flight"] <= 4
+
+
+def test_deadline_applies_while_waiting_for_a_free_backend(servers):
+    server = servers("busy", latency=0.5)
+    router = LLMRouter("capped", [Backend("busy", server.base_url, max_concurrency=1)], hedge=False,
+                       retry=RetryPolicy(attempts=1))
+
+    async def scenario():
+        holder = asyncio.create_task(router.chat_completion(PAYLOAD))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        with pytest.raises(DeadlineExceeded):
+            await router.chat_completion(PAYLOAD, deadline=time.monotonic() + 0.1)
+        waited = time.perf_counter() - start
+        await holder
+        return waited
+
+    assert run(scenario()) < 0.3  # not the 0.45 s left on the call holding the slot
+    assert router.metrics["deadline_exceeded"] == 1
+    assert server.stats()["requests"] == 1
+
+
+def test_hedged_p99_stays_below_the_stall(servers):
+    # 3% stalls over 400 calls: p99 is the 4th slowest call, and a hedge that
+    # stalls as well (3% of hedges) is too rare to reach it
+    random.seed(7)
+    stall = 1.5
+    backends = [
+        Backend(name, servers(name, latency=0.02, jitter=0.01, slow_rate=0.03, slow_latency=stall).base_url)
+        for name in ("a", "b")
+    ]
+    router = LLMRouter("hedging", backends, hedge=True, hedge_min=0.2)
+    latencies, failures = run(send(router, 400, concurrency=10))
+    assert failures == 0
+    assert router.metrics["hedged"] > 0
+    p99 = latencies[int(0.99 * len(latencies))]
+    assert p99 < stall / 2
+
+
+def test_one_stall_does_not_delay_the_next_hedge():
+    router = LLMRouter("estimate", [], hedge_min=0.1)
+    backend = Backend("a", "http://127.0.0.1:1/v1")
+    assert router.hedge_after(backend) == 0.1  # no samples yet: hedge early
+    for _ in range(30):
+        backend.record_latency(0.05)
+    backend.record_latency(1.5)
+    assert router.hedge_after(backend) == pytest.approx(0.1)
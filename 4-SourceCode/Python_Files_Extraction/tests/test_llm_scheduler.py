@@ -0,0 +1,151 @@
+import asyncio
+import time
+
+import pytest
+
+import llm_scheduler
+from llm_scheduler import LLMScheduler, TokenBucket
+
+
+async def settle():
+    """Let every runnable task reach its next await."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class Holder:
+    """Tasks that take a slot, note the grant and hold it until released."""
+
+    def __init__(self, scheduler: LLMScheduler):
+        self.scheduler = scheduler
+        self.granted = []
+        self.running = {}
+        self.max_running = {}
+        self.release = {}
+
+    def start(self, document_id: str, name: str, backend: str = "test") -> asyncio.Task:
+        self.release[name] = asyncio.Event()
+        return asyncio.create_task(self.hold(document_id, name, backend))
+
+    async def hold(self, document_id: str, name: str, backend: str):
+        async with self.scheduler.slot(document_id, backend):
+            self.granted.append(name)
+            self.running[document_id] = self.running.get(document_id, 0) + 1
+            self.max_running[document_id] = max(self.max_running.get(document_id, 0), self.running[document_id])
+            await self.release[name].wait()
+            self.running[document_id] -= 1
+
+    async def finish(self, name: str):
+        self.release[name].set()
+        await settle()
+
+
+def test_slots_are_granted_round_robin_across_documents():
+    async def main():
+        holder = Holder(LLMScheduler(1, 8, {}))
+        tasks = [holder.start("big", f"big{number}") for number in range(6)]
+        await settle()
+        tasks += [holder.start("small", f"small{number}") for number in range(3)]
+        await settle()
+        while len(holder.granted) < len(tasks):
+            await holder.finish(holder.granted[-1])
+        await holder.finish(holder.granted[-1])
+        await asyncio.gather(*tasks)
+        return holder.granted
+
+    # "small" joins the rotation behind "big" (already served once), then the
+    # two alternate: the big upload queued first but cannot hold the small one back
+    assert asyncio.run(main()) == ["big0", "big1", "small0", "big2", "small1", "big3", "small2", "big4", "big5"]
+
+
+def test_per_document_cap_lets_other_documents_through():
+    async def main():
+        scheduler = LLMScheduler(10, 2, {})
+        holder = Holder(scheduler)
+        tasks = [holder.start("big", f"big{number}") for number in range(5)]
+        await settle()
+        tasks.append(holder.start("small", "small0"))
+        await settle()
+        assert holder.granted == ["big0", "big1", "small0"]
+        assert scheduler.stats()["queue_depth_by_document"] == {"big": 3}
+        for name in ["big0", "small0", "big1", "big2", "big3", "big4"]:
+            await holder.finish(name)
+        await asyncio.gather(*tasks)
+        return holder, scheduler
+
+    holder, scheduler = asyncio.run(main())
+    assert holder.max_running == {"big": 2, "small": 1}
+    assert scheduler.stats()["in_flight"] == 0
+    assert scheduler.stats()["granted"] == 6
+
+
+def test_cancelled_waiter_frees_its_place():
+    async def main():
+        scheduler = LLMScheduler(1, 8, {})
+        holder = Holder(scheduler)
+        first = holder.start("a", "a0")
+        await settle()
+        cancelled = holder.start("b", "b0")
+        waiting = holder.start("c", "c0")
+        await settle()
+        cancelled.cancel()
+        await settle()
+        assert "b" not in scheduler.stats()["queue_depth_by_document"]
+        await holder.finish("a0")
+        assert holder.granted == ["a0", "c0"]
+        await holder.finish("c0")
+        await asyncio.gather(first, waiting)
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    assert scheduler.stats()["in_flight"] == 0
+    assert scheduler._waiting == {} and not scheduler._round_robin
+
+
+def test_waiter_cancelled_after_its_grant_gives_the_slot_back():
+    async def main():
+        scheduler = LLMScheduler(1, 8, {})
+        holder = Holder(scheduler)
+        async with scheduler.slot("a", "test"):
+            granted_then_cancelled = holder.start("b", "b0")
+            after = holder.start("c", "c0")
+            await settle()
+        # Leaving the block handed the slot to b0; it is cancelled before it runs
+        granted_then_cancelled.cancel()
+        await settle()
+        assert holder.granted == ["c0"]
+        await holder.finish("c0")
+        await after
+        with pytest.raises(asyncio.CancelledError):
+            await granted_then_cancelled
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_token_bucket_reservations(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(llm_scheduler.time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=10, capacity=2)
+    # The burst is free, then each caller waits one more token interval
+    assert [bucket.reserve() for _ in range(4)] == pytest.approx([0.0, 0.0, 0.1, 0.2])
+    now[0] += 1.0  # refills, but never above capacity
+    assert [bucket.reserve() for _ in range(3)] == pytest.approx([0.0, 0.0, 0.1])
+
+
+def test_slot_waits_for_the_backend_rate_limit():
+    async def main():
+        scheduler = LLMScheduler(8, 8, {"lm_studio": (20, 1)})
+        start = time.monotonic()
+
+        async def call():
+            async with scheduler.slot("doc", "lm_studio"):
+                return time.monotonic() - start
+
+        return scheduler, sorted(await asyncio.gather(*(call() for _ in range(3))))
+
+    scheduler, started = asyncio.run(main())
+    assert started[0] < 0.03
+    assert started[1] >= 0.04 and started[2] >= 0.09
+    assert scheduler.stats()["rate_limited"] == {"lm_studio": 2}
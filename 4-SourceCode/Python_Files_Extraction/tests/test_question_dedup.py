@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from question_dedup import (DEDUP_SHINGLE, dedupe_questions, duplicate_positions, minhash_signatures,
+                            normalize_question_text, question_signature_text)
+
+# The permutations come from np.random.default_rng(0), so signatures (and
+# therefore every merge decision below) are the same on every run.
+
+
+def mcq(question, answer="A) Extracting useful knowledge from data", options=None):
+    options = options or ["A) Extracting useful knowledge from data", "B) Storing large datasets",
+                          "C) Designing databases", "D) Visualizing data only"]
+    return {"question": question, "options": options, "answer": answer}
+
+
+def tf(question, answer="True"):
+    return {"question": question, "answer": answer}
+
+
+def shingles(text: str) -> set:
+    return {text[i:i + DEDUP_SHINGLE] for i in range(len(text) - DEDUP_SHINGLE + 1)}
+
+
+def test_signatures_are_reproducible():
+    texts = ["what is the main goal of data mining", "clustering groups data without labels"]
+    assert np.array_equal(minhash_signatures(texts), minhash_signatures(list(texts)))
+    # Batching does not change a text's signature
+    assert np.array_equal(minhash_signatures(texts)[1], minhash_signatures(texts[1:])[0])
+
+
+def test_signature_agreement_tracks_jaccard():
+    a = normalize_question_text("Which algorithm is used for clustering customers by purchase history?")
+    b = normalize_question_text("Which algorithm is used for clustering customers based on purchase history?")
+    jaccard = len(shingles(a) & shingles(b)) / len(shingles(a) | shingles(b))
+    signatures = minhash_signatures([a, b])
+    assert abs((signatures[0] == signatures[1]).mean() - jaccard) < 0.1
+
+
+@pytest.mark.parametrize("first, second", [
+    ("What is the main goal of Data Mining?", "what is the main goal of data-mining ?"),
+    ("Which algorithm is used for clustering customers by purchase history?",
+     "Which algorithm is used for clustering customers based on purchase history?"),
+    # Harakat and tatweel
+    ("ما هو الهدف الرئيسي من التنقيب عن البيانات؟", "ما هُوَ الهَدَفُ الرَّئِيسِيُّ مِنَ التَّنْقِيبِ عَنِ البَيَانَـــات؟"),
+    # Hamza on alef, alef maqsura and ta marbuta spellings
+    ("أين تستخدم الخوارزمية الأساسية في المعالجة؟", "اين تستخدم الخوارزميه الاساسيه في المعالجه؟"),
+    ("إلى أي مدى تؤثر البيانات على النتيجة؟", "الي اي مدي تؤثر البيانات علي النتيجه؟"),
+    # Eastern Arabic digits
+    ("كم عدد الطبقات في نموذج OSI؟ ٧", "كم عدد الطبقات في نموذج OSI؟ 7"),
+])
+def test_near_duplicates_merge(first, second):
+    # One of the pair goes (the longer text wins the quality tie-break)
+    assert len(duplicate_positions([tf(first), tf(second)])) == 1
+
+
+def test_distinct_questions_stay():
+    questions = [
+        tf("Clustering groups data without predefined labels."),
+        tf("Classification assigns records to predefined classes."),
+        tf("Association rules find items that are bought together."),
+        mcq("What is the main goal of Data Mining?"),
+        mcq("Which layer of the OSI model handles routing?", "C) Network",
+            ["A) Physical", "B) Data link", "C) Network", "D) Transport"]),
+        tf("ما هو الهدف الرئيسي من التنقيب عن البيانات؟"),
+        tf("ما هي الخوارزمية المستخدمة في التصنيف؟"),
+    ]
+    assert duplicate_positions(questions) == set()
+
+
+def test_mcq_and_tf_never_merge():
+    stem = "Data mining extracts useful knowledge from data"
+    assert duplicate_positions([mcq(stem + "?"), tf(stem + "?", "A) Extracting useful knowledge from data")]) == set()
+
+
+def test_option_order_and_letters_do_not_matter():
+    first = mcq("What is the main goal of Data Mining?")
+    second = mcq("What is the main goal of Data Mining?", "B) Extracting useful knowledge from data",
+                 ["A) Storing large datasets", "B) Extracting useful knowledge from data",
+                  "C) Designing databases", "D) Visualizing data only"])
+    assert question_signature_text(first) == question_signature_text(second)
+    assert duplicate_positions([first, second]) == {1}
+
+
+def test_best_formed_variant_is_kept():
+    short = mcq("What is the main goal of Data Mining", options=["A) Extracting useful knowledge from data", "B) Storing large datasets"])
+    full = mcq("What is the main goal of Data Mining?")
+    assert duplicate_positions([short, full]) == {0}
+
+
+def test_dedupe_keeps_order():
+    questions = [tf("Clustering groups data without predefined labels."),
+                 tf("Classification assigns records to predefined classes."),
+                 tf("Clustering groups data without predefined labels!"),
+                 tf("Association rules find items that are bought together.")]
+    kept, removed = dedupe_questions(questions)
+    assert removed == 1
+    assert kept == [questions[0], questions[1], questions[3]]
+
+
+def test_short_and_single_inputs():
+    assert duplicate_positions([]) == set()
+    assert duplicate_positions([tf("Q")]) == set()
+    assert duplicate_positions([tf("Q"), tf("Q")]) == {1}
@@ -0,0 +1,143 @@
+import json
+
+import pytest
+
+from question_parser import ParseStats, merge_reports, parse_questions, parse_stats, split_by_type
+
+MCQ = {
+    "question": "What is the main goal of Data Mining?",
+    "options": ["A) Extracting useful knowledge from data", "B) Storing large datasets", "C) Designing databases"],
+    "answer": "A) Extracting useful knowledge from data",
+}
+TF = {"question": "Clustering groups data without predefined labels.", "answer": "True"}
+
+
+def mcqs(count: int) -> list:
+    return [dict(MCQ, question=f"{MCQ['question']} ({number})") for number in range(count)]
+
+
+def test_clean_json():
+    questions, report = parse_questions(json.dumps(mcqs(3)), "mcq")
+    assert questions == mcqs(3)
+    assert report["clean"] and not report["recovered"] and not report["unrecoverable"]
+
+
+@pytest.mark.parametrize("raw", [
+    "```json\n{}\n```",
+    "Here are your questions:\n```\n{}\n```\nGood luck!",
+    '{{"questions": {}}}',
+])
+def test_fenced_and_wrapped_output(raw):
+    questions, report = parse_questions(raw.format(json.dumps(mcqs(2))), "mcq")
+    assert questions == mcqs(2)
+    assert not report["unrecoverable"]
+
+
+def test_prose_around_json_counts_as_recovered():
+    _, report = parse_questions("Sure!\n" + json.dumps(mcqs(2)) + "\nHope this helps.", "mcq")
+    assert report["wrapped"] and report["recovered"] and not report["clean"]
+
+
+def test_truncated_json_keeps_the_complete_questions():
+    raw = json.dumps(mcqs(3))
+    cut = raw[:raw.rindex('"options"')]  # the third object stops mid-way
+    questions, report = parse_questions(cut, "mcq")
+    assert questions == mcqs(2)
+    assert report["truncated"] and report["recovered"]
+
+
+def test_trailing_commas_are_repaired():
+    raw = json.dumps(mcqs(2), indent=1).replace('"\n  ]', '",\n  ]').replace("}\n]", "},\n]")
+    questions, report = parse_questions(raw, "mcq")
+    assert questions == mcqs(2)
+    assert report["repaired"] and report["recovered"]
+
+
+@pytest.mark.parametrize("obj, answer", [
+    ({"question": "Q?", "choices": ["A) x", "B) y"], "correct_answer": "B"}, "B) y"),
+    ({"question": "Q?", "options": ["A) x", "B) y"], "answer": "(b)"}, "B) y"),
+    ({"question": "Q?", "options": ["A) x", "B) y"], "answer": 1}, "B) y"),
+    ({"question": "Q?", "options": ["A) x", "B) y"], "answer": "y"}, "B) y"),
+    ({"question": "Q?", "options": ["x", "y"], "answer": "B) y"}, "y"),
+])
+def test_mcq_key_and_answer_variants(obj, answer):
+    questions, _ = parse_questions(json.dumps([obj]), "mcq")
+    assert [question["answer"] for question in questions] == [answer]
+
+
+@pytest.mark.parametrize("obj", [
+    {"question": " ", "options": ["A) x", "B) y"], "answer": "A"},  # no question text
+    {"question": "Q?", "options": ["A) x", "B) y"], "answer": "E"},  # no such option
+    {"question": "Q?", "options": ["A) x", "A) x"], "answer": "A"},  # repeated options
+    {"question": "Q?", "answers": ["A) x", "B) y"], "answer": "A"},  # unknown options key
+])
+def test_unusable_mcqs_are_dropped(obj):
+    questions, report = parse_questions(json.dumps([obj, MCQ]), "mcq")
+    assert questions == [MCQ]
+    assert report["dropped"] == 1 and report["recovered"]
+
+
+def test_arabic_mcq_answer():
+    obj = {"question": "ما هو الهدف الرئيسي من التنقيب عن البيانات؟",
+           "options": ["A) استخراج المعرفة من البيانات", "B) تخزين البيانات"],
+           "answer": "استخراج المعرفة من البيانات"}
+    questions, _ = parse_questions(json.dumps([obj], ensure_ascii=False), "mcq")
+    assert questions[0]["answer"] == "A) استخراج المعرفة من البيانات"
+
+
+@pytest.mark.parametrize("answer, expected", [
+    (True, "True"), (False, "False"), ("true", "True"), ("FALSE", "False"), ("T", "True"), ("f", "False"),
+    ("Yes", "True"), ("no", "False"), ("Correct.", "True"), ("Incorrect", "False"),
+    ("صح", "True"), ("صحيح", "True"), ("نعم", "True"), ("خطأ", "False"), ("خطا", "False"), ("غلط", "False"),
+])
+def test_tf_answer_variants(answer, expected):
+    questions, _ = parse_questions(json.dumps([{"question": "Q", "answer": answer}], ensure_ascii=False), "tf")
+    assert [question["answer"] for question in questions] == [expected]
+
+
+def test_tf_without_a_truth_value_is_dropped():
+    questions, report = parse_questions(json.dumps([{"question": "Q", "answer": "maybe"}, TF]), "tf")
+    assert questions == [TF]
+    assert report["dropped"] == 1
+
+
+def test_mixed_output_splits_by_type():
+    questions, _ = parse_questions(json.dumps([MCQ, TF, MCQ]), "mixed")
+    split = split_by_type(questions)
+    assert (len(split["multiple_choice"]), len(split["true_false"])) == (2, 1)
+
+
+def test_unrecoverable_vs_empty_answer():
+    _, prose = parse_questions("I cannot write questions about this text.", "mcq")
+    assert prose["unrecoverable"]
+    _, empty = parse_questions("[]", "mcq")
+    assert not empty["unrecoverable"]
+    _, wrapped_empty = parse_questions('```json\n{"questions": []}\n```', "mcq")
+    assert not wrapped_empty["unrecoverable"]
+
+
+def test_parse_stats_totals():
+    before = parse_stats.stats()
+    parse_questions(json.dumps(mcqs(2)), "mcq")
+    parse_questions(json.dumps(mcqs(3))[:-40], "mcq")
+    parse_questions("no JSON here", "mcq")
+    after = parse_stats.stats()
+    delta = {key: after[key] - before[key] for key in after}
+    assert delta["completions"] == 3
+    assert (delta["clean"], delta["recovered"], delta["unrecoverable"]) == (1, 1, 1)
+    assert delta["truncated"] == 1
+    assert delta["questions_valid"] == 4
+
+
+def test_parse_stats_record_and_merge_reports():
+    stats = ParseStats()
+    reports = [
+        {"found": 3, "valid": 2, "dropped": 1, "repaired": 0, "truncated": False, "clean": False, "recovered": True, "unrecoverable": False},
+        {"found": 0, "valid": 0, "dropped": 0, "repaired": 0, "truncated": True, "clean": False, "recovered": False, "unrecoverable": True},
+    ]
+    for report in reports:
+        stats.record(report)
+    assert stats.stats()["completions"] == 2
+    assert stats.stats()["questions_dropped"] == 1
+    merged = merge_reports(reports)
+    assert (merged["chunks"], merged["valid"], merged["truncated"], merged["unrecoverable"]) == (2, 2, True, False)
@@ -0,0 +1,89 @@
+import asyncio
+
+from question_parser import split_by_type
+from question_planner import QuestionPlan, fill_budget, plan_questions, split_quotas, stream_budget, top_up
+
+
+def collect(plan, counts, stream_chunk):
+    async def main():
+        return [event async for event in stream_budget(plan, counts, stream_chunk)]
+    return asyncio.run(main())
+
+
+def test_split_quotas_gives_each_type_exactly_its_count():
+    quotas = {0: 5, 2: 5, 3: 4, 7: 3}
+    split = split_quotas(quotas, {"multiple_choice": 12, "true_false": 5})
+    assert {index: sum(shares.values()) for index, shares in split.items()} == quotas
+    assert sum(shares["multiple_choice"] for shares in split.values()) == 12
+    assert sum(shares["true_false"] for shares in split.values()) == 5
+
+
+def test_top_up_only_asks_for_the_missing_type():
+    reserve = [4, 5, 6]
+    wave = top_up(reserve, {4: 3, 5: 3, 6: 3}, {"multiple_choice": 0, "true_false": 4})
+    assert wave == {4: {"true_false": 3}, 5: {"true_false": 1}}
+    assert reserve == [6]
+
+
+def mcq(name):
+    return {"question": f"Which {name}?", "options": ["A) a", "B) b"], "answer": "A) a"}
+
+
+def tf(name):
+    return {"question": f"{name} is true.", "answer": "True"}
+
+
+def test_fill_budget_tops_up_the_type_that_came_back_short():
+    # The model ignores the TF share of mixed prompts and writes extra MCQs instead
+    asked = []
+
+    async def generate(index, quotas):
+        asked.append((index, dict(quotas)))
+        questions = [mcq(f"{index}.{number}") for number in range(sum(quotas.values()))]
+        if not quotas.get("multiple_choice"):
+            questions = [tf(f"{index}.{number}") for number in range(quotas["true_false"])]
+        return questions, {"valid": len(questions)}
+
+    plan = plan_questions([600] * 10, 10)
+    found, reports = asyncio.run(fill_budget(plan, generate, counts={"multiple_choice": 6, "true_false": 4}))
+    split = split_by_type([question for index in sorted(found) for question in found[index]])
+    assert len(split["multiple_choice"]) == 6
+    assert len(split["true_false"]) == 4
+    # Top-up waves asked for TF only, from chunks outside the plan
+    top_ups = [quotas for index, quotas in asked if index not in plan.quotas]
+    assert top_ups and all(quotas.get("multiple_choice", 0) == 0 for quotas in top_ups)
+
+
+def test_stream_budget_holds_every_type_to_its_count():
+    # Every chunk writes more than it is asked for, and MCQ-heavy at that
+    def stream_chunk(index, quotas):
+        async def questions():
+            for number in range(8):
+                yield "multiple_choice", f"mcq {index}.{number}"
+            for number in range(2):
+                yield "true_false", f"tf {index}.{number}"
+        return questions()
+
+    plan = plan_questions([600] * 10, 9)
+    events = collect(plan, {"multiple_choice": 3, "true_false": 6}, stream_chunk)
+    kinds = [kind for _, kind, _ in events]
+    assert kinds.count("multiple_choice") == 3
+    assert kinds.count("true_false") == 6
+    # TF came back short in the planned chunks, so reserve chunks made up for it
+    assert {index for index, _, _ in events} - set(plan.quotas)
+
+
+def test_stream_budget_stops_when_every_chunk_fails():
+    asked = []
+
+    def stream_chunk(index, quotas):
+        asked.append(index)
+
+        async def failure():
+            yield "error", "LM Studio unreachable"
+        return failure()
+
+    plan = QuestionPlan(4, {0: 2, 1: 2}, reserve=[2, 3], capacity={index: 2 for index in range(4)})
+    events = collect(plan, {"multiple_choice": 4}, stream_chunk)
+    assert sorted(events) == [(0, "error", "LM Studio unreachable"), (1, "error", "LM Studio unreachable")]
+    assert sorted(asked) == [0, 1]
@@ -0,0 +1,51 @@
+import sqlite3
+
+import quiz_cache
+from quiz_cache import QuizCache
+
+QUESTIONS = [{"question": "Clustering groups data without predefined labels.", "answer": "True"}]
+
+
+def statements(cache: QuizCache) -> list:
+    """Log of the SQL the cache runs from now on."""
+    log = []
+    cache._connect().set_trace_callback(log.append)
+    return log
+
+
+def test_entries_are_counted_without_querying(tmp_path):
+    cache = QuizCache(str(tmp_path / "quiz.sqlite3"), ttl_seconds=3600, max_entries=1000)
+    for number in range(5):
+        cache.put(f"key{number}", QUESTIONS)
+    cache.put("key0", QUESTIONS)  # replaced, not a new entry
+    log = statements(cache)
+    assert cache.stats()["entries"] == 5
+    assert log == []
+    # A new instance on the same file counts what is already there
+    assert QuizCache(cache.path, 3600, 1000).stats()["entries"] == 5
+
+
+def test_hits_write_their_access_times_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(quiz_cache, "QUIZ_CACHE_TOUCH_BATCH", 3)
+    cache = QuizCache(str(tmp_path / "quiz.sqlite3"), ttl_seconds=3600, max_entries=1000)
+    for number in range(3):
+        cache.put(f"key{number}", QUESTIONS)
+    log = statements(cache)
+    assert cache.get("key0") == QUESTIONS and cache.get("key1") == QUESTIONS
+    assert not any(sql.startswith("UPDATE") for sql in log)
+    cache.get("key2")
+    assert sum(sql.startswith("UPDATE") for sql in log) == 3
+    assert cache.stats()["hits"] == 3
+
+
+def test_eviction_keeps_the_recently_read_entries(tmp_path):
+    cache = QuizCache(str(tmp_path / "quiz.sqlite3"), ttl_seconds=3600, max_entries=60)
+    for number in range(99):
+        cache.put(f"key{number}", QUESTIONS)
+    for number in range(10):
+        cache.get(f"key{number}")  # still only in memory when the next put evicts
+    cache.put("key99", QUESTIONS)
+    assert cache.stats()["entries"] == 60
+    assert cache.stats()["evictions"] == 40
+    kept = {key for (key,) in sqlite3.connect(cache.path).execute("SELECT key FROM quiz_cache")}
+    assert {f"key{number}" for number in range(10)} <= kept
@@ -0,0 +1,61 @@
+import asyncio
+import errno
+import io
+import os
+
+import pytest
+from fastapi import UploadFile
+
+import uploads
+from quiz_jobs import JobManager, JobStore
+from uploads import saved_upload
+
+
+async def submit_upload(manager: JobManager, data: bytes):
+    async with saved_upload(UploadFile(io.BytesIO(data), filename="slides.pptx")) as upload:
+        temp_path = upload.path
+        job = await manager.submit("generate_quiz", upload, {"quiz_type": "mcq"})
+    return job, temp_path
+
+
+def make_manager(tmp_path, upload_dir) -> JobManager:
+    manager = JobManager(JobStore(str(tmp_path / "jobs.sqlite3")), workers=1, upload_dir=str(upload_dir))
+    manager.register("generate_quiz", lambda job, emit: None)
+    return manager
+
+
+def check_job(job, temp_path, upload_dir, data):
+    assert os.path.dirname(job.upload_path) == str(upload_dir)
+    with open(job.upload_path, "rb") as f:
+        assert f.read() == data
+    assert not os.path.exists(temp_path)
+
+
+def test_submit_moves_upload_across_filesystems(tmp_path, monkeypatch):
+    # rename() fails with EXDEV when the temp dir is another filesystem (tmpfs /tmp)
+    temp_dir, upload_dir = tmp_path / "tmp", tmp_path / "job_uploads"
+    temp_dir.mkdir()
+    monkeypatch.setattr(uploads, "UPLOAD_TEMP_DIR", str(temp_dir))
+    real_rename = os.rename
+
+    def rename(src, dst, *args, **kwargs):
+        if os.path.dirname(os.path.abspath(src)) != os.path.dirname(os.path.abspath(dst)):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        return real_rename(src, dst, *args, **kwargs)
+
+    monkeypatch.setattr(os, "rename", rename)
+    monkeypatch.setattr(os, "replace", rename)
+    data = os.urandom(3 * 1024 * 1024)
+    job, temp_path = asyncio.run(submit_upload(make_manager(tmp_path, upload_dir), data))
+    check_job(job, temp_path, upload_dir, data)
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="needs a tmpfs at /dev/shm")
+def test_submit_from_tmpfs(tmp_path, monkeypatch):
+    upload_dir = tmp_path / "job_uploads"
+    if os.stat("/dev/shm").st_dev == os.stat(tmp_path).st_dev:
+        pytest.skip("/dev/shm is on the same filesystem as the test dir")
+    monkeypatch.setattr(uploads, "UPLOAD_TEMP_DIR", "/dev/shm")
+    data = b"slide deck" * 1000
+    job, temp_path = asyncio.run(submit_upload(make_manager(tmp_path, upload_dir), data))
+    check_job(job, temp_path, upload_dir, data)
@@ -0,0 +1,152 @@
+# Normalization of extracted segments before chunking, so the LLM is not
+# paid to read the same footer on every slide:
+#   - slide footer / number / date placeholders are dropped
+#   - short lines that repeat across pages or slides (university headers,
+#     course names, "Chapter 1 Introduction", "4-12") are kept once, on the
+#     first page they appear; repeated lines without letters are dropped
+#   - NFKC (Arabic presentation forms), invisible / bidi control characters,
+#     words hyphenated across lines, runs of spaces and blank lines
+#   - Arabic diacritics and tatweel, and Persian letter variants
+# Hamza / ta marbuta spellings are left alone: questions quote the text back.
+# The extraction cache and /extract_text keep the original text; ingest.py
+# stores it with clean_characters only, which this module shares.
+import dataclasses
+import math
+import os
+import re
+import threading
+import unicodedata
+import numpy as np  # if this isn't working, run: pip install numpy
+from question_dedup import ARABIC_MARKS
+
+# ---------------- CONFIG ---------------- #
+TEXT_NORMALIZE = os.getenv("TEXT_NORMALIZE", "1") == "1"
+# A line is boilerplate when it appears on at least this many pages / slides...
+REPEAT_MIN_UNITS = int(os.getenv("REPEAT_MIN_UNITS", "3"))
+# ...and on at least this share of them
+REPEAT_MIN_SHARE = float(os.getenv("REPEAT_MIN_SHARE", "0.5"))
+# Longer lines are content, even when they repeat
+REPEAT_MAX_CHARS = 80
+# PPTX placeholders that never hold lecture content
+BOILERPLATE_KINDS = {"footer", "slide_number", "date", "header"}
+
+INVISIBLE_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\x7f\u00ad\u200b\u200e\u200f\u202a-\u202e\u2066-\u2069\ufeff]")
+HYPHENATED_BREAK = re.compile(r"(?<=[a-z])-[ \t]*\n[ \t]*(?=[a-z])")
+INNER_SPACES = re.compile(r"(?<=\S)[ \t]{2,}")
+TRAILING_SPACES = re.compile(r"[ \t]+(?=\n|$)")
+BLANK_LINES = re.compile(r"\n{3,}")
+DIGITS = re.compile(r"\d+")
+ARABIC_VARIANTS = str.maketrans({"ٱ": "ا", "ک": "ك", "ی": "ي", "ھ": "ه"})
+
+
+def clean_characters(text: str) -> str:
+    """NFKC (folds PDF presentation forms, ligatures and full-width digits), no invisible or
+    control characters, no trailing spaces, at most one blank line in a row; words are untouched."""
+    text = unicodedata.normalize("NFKC", text.replace("\r\n", "\n").replace("\r", "\n"))
+    text = INVISIBLE_CHARS.sub("", text)
+    text = TRAILING_SPACES.sub("", text)
+    return BLANK_LINES.sub("\n\n", text)
+
+
+def clean_text(text: str) -> str:
+    """Character-level cleanup of one segment for the prompt; line breaks are kept."""
+    text = ARABIC_MARKS.sub("", clean_characters(text)).translate(ARABIC_VARIANTS)
+    text = HYPHENATED_BREAK.sub("", text)
+    return INNER_SPACES.sub(" ", text)
+
+
+def line_key(line: str) -> int:
+    # Page numbers and dates differ from page to page: "Page 3 of 20" == "Page 4 of 20"
+    return hash(DIGITS.sub("#", line.casefold()))
+
+
+# ---------------- REPEATED LINES ---------------- #
+def repeated_line_mask(keys: np.ndarray, units: np.ndarray, unit_count: int, has_letters: np.ndarray) -> np.ndarray:
+    """True for each line (key, unit) to drop: its key is on enough units and this is not the first one."""
+    threshold = max(REPEAT_MIN_UNITS, math.ceil(REPEAT_MIN_SHARE * unit_count))
+    order = np.lexsort((units, keys))
+    sorted_keys, sorted_units = keys[order], units[order]
+    # One entry per distinct (key, unit), then the number of units per key
+    distinct = np.ones(len(order), dtype=bool)
+    distinct[1:] = (sorted_keys[1:] != sorted_keys[:-1]) | (sorted_units[1:] != sorted_units[:-1])
+    pair_keys, pair_units = sorted_keys[distinct], sorted_units[distinct]
+    unique_keys, first, counts = np.unique(pair_keys, return_index=True, return_counts=True)
+    position = np.searchsorted(unique_keys, keys)
+    repeated = counts[position] >= threshold
+    first_unit = pair_units[first][position]  # units are sorted within a key
+    return repeated & ((units != first_unit) | ~has_letters)
+
+
+# ---------------- SEGMENTS ---------------- #
+_lock = threading.Lock()
+metrics = {"documents": 0, "chars_in": 0, "chars_out": 0, "lines_removed": 0, "segments_dropped": 0}
+
+
+def normalize_segments(segments) -> list:
+    """Cleaned copy of a document's segments, with boilerplate lines and placeholders removed.
+
+    Needs the whole document (a line is only known to repeat once every page
+    has been seen), so streaming callers pass the list they already built.
+    """
+    segments = list(segments)
+    if not TEXT_NORMALIZE:
+        return segments
+    chars_in = sum(len(segment.text) for segment in segments)
+    kept = [segment for segment in segments if segment.kind not in BOILERPLATE_KINDS]
+    dropped = len(segments) - len(kept)
+    texts = [clean_text(segment.text) for segment in kept]
+
+    # Pages / slides; DOCX paragraphs have neither and are never compared
+    unit_ids = {}
+    for segment in kept:
+        if segment.page is not None or segment.slide is not None:
+            unit_ids.setdefault((segment.page, segment.slide), len(unit_ids))
+
+    removed = 0
+    if len(unit_ids) >= REPEAT_MIN_UNITS:
+        keys, units, has_letters, owners = [], [], [], []
+        for index, (segment, text) in enumerate(zip(kept, texts)):
+            unit = unit_ids.get((segment.page, segment.slide))
+            if unit is None:
+                continue
+            for number, line in enumerate(text.split("\n")):
+                line = line.strip()
+                if line and len(line) <= REPEAT_MAX_CHARS:
+                    keys.append(line_key(line))
+                    units.append(unit)
+                    has_letters.append(any(char.isalpha() for char in line))
+                    owners.append((index, number))
+        if keys:
+            drop = repeated_line_mask(np.array(keys, dtype=np.int64), np.array(units, dtype=np.int64),
+                                      len(unit_ids), np.array(has_letters, dtype=bool))
+            by_segment = {}
+            for position in np.flatnonzero(drop):
+                index, number = owners[position]
+                by_segment.setdefault(index, set()).add(number)
+            for index, numbers in by_segment.items():
+                lines = texts[index].split("\n")
+                texts[index] = BLANK_LINES.sub("\n\n", "\n".join(line for number, line in enumerate(lines) if number not in numbers))
+                removed += len(numbers)
+
+    normalized = []
+    for segment, text in zip(kept, texts):
+        if text.strip():
+            normalized.append(dataclasses.replace(segment, text=text))
+        else:
+            dropped += 1
+    with _lock:
+        metrics["documents"] += 1
+        metrics["chars_in"] += chars_in
+        metrics["chars_out"] += sum(len(segment.text) for segment in normalized)
+        metrics["lines_removed"] += removed
+        metrics["segments_dropped"] += dropped
+    return normalized
+
+
+def normalization_stats() -> dict:
+    with _lock:
+        return {
+            "enabled": TEXT_NORMALIZE,
+            **metrics,
+            "char_reduction": 1 - metrics["chars_out"] / metrics["chars_in"] if metrics["chars_in"] else 0.0,
+        }
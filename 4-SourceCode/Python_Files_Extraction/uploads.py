@@ -0,0 +1,58 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from fastapi import HTTPException, UploadFile
+from telemetry import set_attributes, stage
+
+# ---------------- CONFIG ---------------- #
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_TEMP_DIR = os.getenv("UPLOAD_TEMP_DIR") or None  # None = system temp dir
+
+
+@dataclass
+class SavedUpload:
+    path: str
+    filename: str
+    sha256: str
+    size: int
+
+
+def _write_chunk(f, digest, chunk: bytes):
+    digest.update(chunk)
+    f.write(chunk)
+
+
+@asynccontextmanager
+async def saved_upload(file: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES):
+    """Stream an upload to its own temp file in fixed-size chunks.
+
+    The SHA-256 is computed during the copy, the size limit is enforced
+    while streaming, and the temp file is removed on exit, error or cancel.
+    """
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=file_ext, dir=UPLOAD_TEMP_DIR)
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with stage("upload", filename=file.filename) as span, os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File too large (limit is {max_bytes} bytes)")
+                # Hashing and the disk write release the GIL, keep them off the event loop
+                await asyncio.to_thread(_write_chunk, f, digest, chunk)
+            set_attributes(span, size=size)
+
+        yield SavedUpload(path=path, filename=file.filename, sha256=digest.hexdigest(), size=size)
+
+    finally:
+        if os.path.exists(path):
+            os.remove(path)